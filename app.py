@@ -7,12 +7,12 @@ import traceback
 from PyQt5.QtWidgets import QApplication, QMessageBox
 from PyQt5.QtGui import QIcon, QFont, QFontDatabase, QColor
 from PyQt5.QtCore import QLocale, QTranslator, QLibraryInfo
-import matplotlib
-matplotlib.use('Qt5Agg')  # 设置matplotlib后端为Qt5Agg
 
 from database.db_manager import DatabaseManager
+from database.migrations import start_pending_migrations
 from ui.login import LoginWindow
 from utils.style_helper import refresh_style
+from utils.captcha_pool import get_captcha_pool
 
 def setup_exception_handling():
     """设置全局异常处理"""
@@ -48,33 +48,6 @@ def setup_chinese_fonts(app):
     }}
     """)
     
-    # 设置Matplotlib字体，如果matplotlib被导入
-    try:
-        import matplotlib.font_manager as fm
-        import matplotlib
-        
-        # 尝试查找系统中的中文字体
-        chinese_fonts = ['Microsoft YaHei', 'SimHei', 'SimSun', 'WenQuanYi Micro Hei']
-        font_found = False
-        
-        for font_name in chinese_fonts:
-            try:
-                font_path = fm.findfont(font_name, fallback_to_default=False)
-                if font_path:
-                    matplotlib.rcParams['font.family'] = ['sans-serif']
-                    matplotlib.rcParams['font.sans-serif'] = [font_name] + matplotlib.rcParams['font.sans-serif']
-                    print(f"Matplotlib将使用字体: {font_name}")
-                    font_found = True
-                    break
-            except:
-                continue
-                
-        if not font_found:
-            print("警告: 未找到适合Matplotlib的中文字体")
-            
-    except ImportError:
-        pass
-    
     return True
 
 if __name__ == '__main__':
@@ -130,6 +103,9 @@ if __name__ == '__main__':
         except Exception as e:
             print(f"设置应用图标失败: {e}")
         
+        # 后台预生成验证码，初始化数据库期间即可填满
+        get_captcha_pool()
+        
         # 创建数据库连接
         print("正在初始化数据库...")
         db_path = os.path.join(os.path.dirname(__file__), 'database/health_life.db')
@@ -142,6 +118,11 @@ if __name__ == '__main__':
         db_manager.initialize()
         print(f"数据库初始化完成: {db_path}")
         
+        # 在后台执行未完成的数据库迁移，退出时保存进度
+        migration_worker = start_pending_migrations(db_manager, app)
+        if migration_worker is not None:
+            app.aboutToQuit.connect(migration_worker.stop)
+        
         # 显示登录窗口
         login_window = LoginWindow()
         login_window.db_manager = db_manager  # 注入数据库管理器
@@ -4,7 +4,9 @@ import time
 import json
 import functools
 import logging
-from utils.verification import hash_password, verify_password
+from utils.verification import hash_password, generate_salt
+from utils.password_hasher import PasswordHasher
+from utils.recurrence import minutes_of_day
 import traceback
 
 # 数据库操作重试装饰器
@@ -52,10 +54,16 @@ class DatabaseManager:
         self.db_path = db_path
         self.conn = None
         self.cursor = None
+        # 数据变更监听器，用于让界面缓存在记录写入后失效
+        self.change_listeners = []
         self.initialize()
 
     def initialize(self):
-        """初始化数据库，包括连接数据库、创建表结构、初始化基础数据和升级密码"""
+        """
+        初始化数据库，包括连接数据库、创建表结构和初始化基础数据
+        
+        旧数据的升级（如明文密码）见 database.migrations，由后台线程执行
+        """
         try:
             # 确保连接到数据库
             if not hasattr(self, 'conn') or self.conn is None:
@@ -74,9 +82,6 @@ class DatabaseManager:
             else:
                 print("食物数据库初始化失败或已经初始化过")
             
-            # 升级老用户的明文密码到哈希密码
-            self.upgrade_passwords()
-            
             print("数据库初始化完成")
             return True
         except Exception as e:
@@ -118,6 +123,103 @@ class DatabaseManager:
         """退出上下文时关闭连接"""
         self.close()
 
+    def add_change_listener(self, callback):
+        """
+        注册数据变更监听器
+        
+        参数:
+            callback: 回调函数 callback(kind, user_id, key)，
+                      kind为 "diet"/"exercise"/"sleep"/"profile"/"reminder"，
+                      key对记录类为记录日期，对提醒为提醒ID，
+                      无法确定用户或key时对应参数为None
+        """
+        if callback not in self.change_listeners:
+            self.change_listeners.append(callback)
+
+    def remove_change_listener(self, callback):
+        """移除数据变更监听器"""
+        if callback in self.change_listeners:
+            self.change_listeners.remove(callback)
+
+    def notify_change(self, kind, user_id=None, key=None):
+        """
+        通知所有监听器数据已变更，单个监听器出错不影响其他监听器
+
+        数据版本由写入方法在自己的事务中通过 bump_data_version 更新，这里只负责通知
+        """
+        for callback in list(self.change_listeners):
+            try:
+                callback(kind, user_id, key)
+            except Exception as e:
+                print(f"数据变更回调出错: {str(e)}")
+
+    def bump_data_version(self, user_id, *days):
+        """
+        记录某个用户某些天的数据已变化，供分析结果缓存判断是否过期
+        
+        版本号在每个用户内单调递增；日期为"*"时表示影响所有时段（如用户资料变化）。
+        不单独提交，由调用的写入方法与记录的修改在同一个事务中提交
+        """
+        self.cursor.executemany("""
+        INSERT OR REPLACE INTO data_versions (user_id, day, version)
+        VALUES (?, ?, (SELECT COALESCE(MAX(version), 0) + 1 FROM data_versions WHERE user_id = ?))
+        """, [(user_id, day, user_id) for day in dict.fromkeys(str(day)[:10] for day in days)])
+
+    def bump_record_versions(self, old, new_date=None):
+        """
+        修改或删除记录时更新原日期和新日期的数据版本，参数同 notify_record_moved；
+        记录不存在（old为None）时没有数据变化
+        """
+        if not old:
+            return
+        user_id, old_date = old
+        days = [old_date] if new_date is None else [old_date, new_date]
+        self.bump_data_version(user_id, *days)
+
+    def get_data_version(self, user_id, start_date, end_date):
+        """
+        获取用户在日期范围内的数据版本，范围内任一天的记录或用户资料变化后版本都会增大
+        
+        返回:
+            版本号，没有任何变化记录时为0
+        """
+        try:
+            self.cursor.execute("""
+            SELECT COALESCE(MAX(version), 0) FROM data_versions
+            WHERE user_id = ? AND (day BETWEEN ? AND ? OR day = '*')
+            """, (user_id, str(start_date)[:10], str(end_date)[:10]))
+            return self.cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"读取数据版本出错: {str(e)}")
+            return None
+
+    def get_record_owner(self, table, date_column, record_id):
+        """
+        获取记录所属的用户和日期，修改或删除记录前调用，以便通知变更前的日期
+        
+        返回:
+            (用户ID, 日期)，记录不存在时返回None
+        """
+        self.cursor.execute(f"SELECT user_id, {date_column} FROM {table} WHERE id = ?", (record_id,))
+        return self.cursor.fetchone()
+
+    def notify_record_moved(self, kind, old, new_date=None):
+        """
+        记录修改或删除后通知变更，原日期和新日期不同时两天都通知
+        
+        参数:
+            kind: 变更类型
+            old: get_record_owner 的结果，为None时无法确定用户和日期
+            new_date: 修改后的日期，删除或日期未变时为None
+        """
+        if not old:
+            self.notify_change(kind)
+            return
+        user_id, old_date = old
+        self.notify_change(kind, user_id, old_date)
+        if new_date is not None and str(new_date) != str(old_date):
+            self.notify_change(kind, user_id, new_date)
+
     def create_tables(self):
         """创建数据库表"""
         try:
@@ -270,17 +372,117 @@ class DatabaseManager:
             )
             ''')
 
+            # 创建重复提醒规则表，规则只存一行，由调度器按需展开
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reminder_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                reminder_type TEXT,
+                content TEXT,
+                frequency TEXT NOT NULL,  -- daily/weekdays/weekly/hourly
+                time_of_day TIME NOT NULL,  -- 提醒时间，hourly时为时间窗口起点
+                weekdays TEXT,  -- weekly使用，逗号分隔，0表示周一
+                interval_hours INTEGER,  -- hourly使用
+                window_end TIME,  -- hourly使用，时间窗口终点
+                start_date DATE,
+                end_date DATE,
+                is_active INTEGER DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+            ''')
+
+            # 创建重复提醒例外表，记录某一次提醒的完成或延迟
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reminder_exceptions (
+                rule_id INTEGER NOT NULL,
+                occurrence TEXT NOT NULL,  -- 原定提醒时间 YYYY-MM-DD HH:MM:SS
+                status TEXT NOT NULL,  -- completed/snoozed
+                snoozed_to TEXT,  -- 延迟后的提醒时间
+                PRIMARY KEY (rule_id, occurrence),
+                FOREIGN KEY (rule_id) REFERENCES reminder_rules(id) ON DELETE CASCADE
+            )
+            ''')
+
+            # 应用设置（如本机校准的密码哈希成本）
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS app_settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+            ''')
+
+            # 每个用户每天的汇总，由 RollingStatsStore 在记录变化时逐天维护
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_rollups (
+                user_id INTEGER NOT NULL,
+                day DATE NOT NULL,
+                intake REAL,
+                burned REAL,
+                exercise_minutes REAL,
+                sleep_minutes REAL,
+                sleep_quality REAL,
+                protein REAL,
+                fat REAL,
+                carbs REAL,
+                PRIMARY KEY (user_id, day),
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+            ''')
+
+            # 最近N天滚动统计的状态（天数、合计、Welford均值和M2）
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rolling_stats (
+                user_id INTEGER NOT NULL,
+                window_days INTEGER NOT NULL,
+                field TEXT NOT NULL,
+                anchor DATE NOT NULL,  -- 窗口的最后一天
+                count INTEGER NOT NULL,
+                total REAL NOT NULL,
+                mean REAL NOT NULL,
+                m2 REAL NOT NULL,
+                PRIMARY KEY (user_id, window_days, field),
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+            ''')
+
+            # 每个用户每天数据的版本，记录或资料变化时递增，用于判断缓存的分析结果是否过期
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS data_versions (
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL,  -- YYYY-MM-DD，"*"表示影响所有日期的变化（如用户资料）
+                version INTEGER NOT NULL,
+                PRIMARY KEY (user_id, day)
+            )
+            ''')
+
+            # 按用户和日期查询记录的索引，供按日期范围聚合的查询使用
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_diet_user_date ON diet_records(user_id, record_date)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_exercise_user_date ON exercise_records(user_id, record_date)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_sleep_user_date ON sleep_records(user_id, sleep_date)")
+            # 提醒列表按 (日期, 时间, id) 做键集分页
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_reminders_user_datetime ON reminders(user_id, reminder_date, reminder_time, id)")
+
             self.conn.commit()
             print("数据库表创建/更新成功")
         except Exception as e:
             print(f"创建表错误: {e}")
 
     @db_retry()
-    def add_user(self, username, password):
-        """添加新用户"""
+    def add_user(self, username, password, hashed=None):
+        """
+        添加新用户
+        
+        参数:
+            username: 用户名
+            password: 原始密码
+            hashed: 在后台线程预先计算好的 (哈希, 盐值)，为None时在此计算
+        """
         try:
             # 对密码进行哈希处理
-            hashed_password, salt = hash_password(password)
+            if hashed is None:
+                hashed = hash_password(password, hasher=self.get_password_hasher())
+            hashed_password, salt = hashed
             
             self.cursor.execute(
                 "INSERT INTO users (username, password, salt) VALUES (?, ?, ?)",
@@ -291,115 +493,139 @@ class DatabaseManager:
         except sqlite3.IntegrityError:
             return None
 
-    def verify_user(self, username, password):
-        """验证用户登录"""
+    def username_exists(self, username):
+        """用户名是否已被注册"""
+        self.cursor.execute("SELECT 1 FROM users WHERE username = ?", (username,))
+        return self.cursor.fetchone() is not None
+
+    def get_user_credentials(self, username):
+        """
+        获取用户的密码哈希和盐值
+        
+        返回:
+            (用户ID, 密码哈希, 盐值)，用户不存在时返回None
+        """
+        self.cursor.execute(
+            "SELECT id, password, salt FROM users WHERE username = ?",
+            (username,)
+        )
+        return self.cursor.fetchone()
+
+    def update_password_hash(self, user_id, hashed_password, salt, only_plaintext=False):
+        """
+        保存重新计算的密码哈希
+
+        参数:
+            only_plaintext: 为True时只在密码仍为明文（盐值为空）时更新，
+                            后台迁移已处理过这一行时不再覆盖
+        """
         try:
-            # 获取用户的哈希密码和盐值
+            condition = " AND (salt IS NULL OR salt = '')" if only_plaintext else ""
             self.cursor.execute(
-                "SELECT id, password, salt FROM users WHERE username = ?",
-                (username,)
+                "UPDATE users SET password = ?, salt = ? WHERE id = ?" + condition,
+                (hashed_password, salt, user_id)
             )
-            result = self.cursor.fetchone()
-            
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"更新密码哈希失败: {str(e)}")
+            return False
+
+    def verify_user(self, username, password):
+        """
+        验证用户登录，旧格式或成本较低的哈希验证通过后自动升级
+        
+        会在当前线程计算哈希，界面中应使用 get_user_credentials 加后台线程验证
+        """
+        try:
+            # 获取用户的哈希密码和盐值
+            result = self.get_user_credentials(username)
             if not result:
                 return None
                 
             user_id, stored_hash, salt = result
-            
-            # 兼容老密码（明文存储）
-            if salt is None or salt == "":
-                # 旧版验证方式 - 直接比较密码
-                self.cursor.execute(
-                    "SELECT id FROM users WHERE username = ? AND password = ?",
-                    (username, password)
-                )
-                old_result = self.cursor.fetchone()
-                
-                if old_result:
-                    # 存在旧密码匹配，自动升级到新的哈希密码格式
-                    hashed_password, new_salt = hash_password(password)
-                    self.cursor.execute(
-                        "UPDATE users SET password = ?, salt = ? WHERE id = ?",
-                        (hashed_password, new_salt, old_result[0])
-                    )
-                    self.conn.commit()
-                    return old_result[0]
+            new_salt = generate_salt()
+            matched, new_hash = self.get_password_hasher().check(password, stored_hash, salt, new_salt)
+            if not matched:
                 return None
-            
-            # 新版验证方式 - 验证哈希密码
-            if verify_password(password, stored_hash, salt):
-                return user_id
-            
-            return None
+            if new_hash:
+                self.update_password_hash(user_id, new_hash, new_salt, only_plaintext=not salt)
+            return user_id
         except Exception as e:
             print(f"用户验证出错: {e}")
             return None
 
+    def get_setting(self, key, default=None):
+        """读取应用设置"""
+        try:
+            self.cursor.execute("SELECT value FROM app_settings WHERE key = ?", (key,))
+            row = self.cursor.fetchone()
+            return row[0] if row else default
+        except sqlite3.Error as e:
+            print(f"读取设置失败: {str(e)}")
+            return default
+
+    def set_setting(self, key, value):
+        """保存应用设置"""
+        try:
+            self.cursor.execute(
+                "INSERT OR REPLACE INTO app_settings (key, value) VALUES (?, ?)",
+                (key, str(value))
+            )
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"保存设置失败: {str(e)}")
+            return False
+
+    def get_password_hasher(self):
+        """按保存的算法和成本创建密码哈希器，未校准时使用默认成本"""
+        try:
+            return PasswordHasher(self.get_setting("password_scheme"), self.get_setting("password_cost"))
+        except ValueError as e:
+            print(f"密码哈希设置无效，使用默认设置: {str(e)}")
+            return PasswordHasher()
+
+    def is_password_cost_calibrated(self):
+        """本机是否已校准密码哈希成本"""
+        return self.get_setting("password_cost") is not None
+
     def get_user_profile(self, user_id):
-        """获取用户资料"""
+        """
+        获取用户资料，一次查询完成
+        
+        界面中应通过 utils.profile_service 读取，资料在会话内只查询一次
+        """
+        empty_profile = {
+            "id": user_id,
+            "username": "",
+            "gender": None,
+            "age": None,
+            "height": None,
+            "weight": None,
+            "diet_habit": None,
+            "exercise_habit": None,
+            "sleep_habit": None
+        }
         try:
-            # 打印调试信息
-            print(f"正在获取用户ID为 {user_id} 的资料")
-            
-            # 确保users表有正确的结构
             self.cursor.execute("""
-            SELECT sql FROM sqlite_master 
-            WHERE type='table' AND name='users'
-            """)
-            table_schema = self.cursor.fetchone()
-            print(f"用户表结构: {table_schema}")
-            
-            # 查询用户信息
-            sql = """
             SELECT id, username, gender, age, height, weight, 
                    diet_habit, exercise_habit, sleep_habit
             FROM users WHERE id = ?
-            """
-            print(f"执行SQL: {sql} 参数: {user_id}")
-            
-            self.cursor.execute(sql, (user_id,))
+            """, (user_id,))
             user = self.cursor.fetchone()
             
             if user:
-                # 获取列名
                 columns = [description[0] for description in self.cursor.description]
-                print(f"查询结果列: {columns}")
-                
-                # 创建用户信息字典
-                user_dict = {}
-                for i, col in enumerate(columns):
-                    user_dict[col] = user[i]
-                
-                print(f"用户资料: {user_dict}")
-                return user_dict
-            else:
-                print(f"未找到用户ID: {user_id}")
-                # 返回包含所有必需字段的空字典
-                return {
-                    "id": user_id,
-                    "username": "",
-                    "gender": None,
-                    "age": None,
-                    "height": None,
-                    "weight": None,
-                    "diet_habit": None,
-                    "exercise_habit": None,
-                    "sleep_habit": None
-                }
+                return dict(zip(columns, user))
+            
+            print(f"未找到用户ID: {user_id}")
+            # 返回包含所有必需字段的空字典
+            return empty_profile
         except Exception as e:
             print(f"获取用户资料错误: {str(e)}")
             # 同样返回带有必需字段的空字典
-            return {
-                "id": user_id,
-                "username": "",
-                "gender": None,
-                "age": None,
-                "height": None,
-                "weight": None,
-                "diet_habit": None,
-                "exercise_habit": None,
-                "sleep_habit": None
-            }
+            return empty_profile
 
     @db_retry()
     def update_user_profile(self, user_id, gender, age, height, weight, diet_habit, exercise_habit, sleep_habit):
@@ -414,7 +640,10 @@ class DatabaseManager:
                 """,
                 (gender, age, height, weight, diet_habit, exercise_habit, sleep_habit, user_id)
             )
+            # 资料变化影响所有时段，记为日期"*"
+            self.bump_data_version(user_id, "*")
             self.conn.commit()
+            self.notify_change("profile", user_id)
             return True
         except sqlite3.Error as e:
             print(f"更新用户资料错误: {e}")
@@ -545,8 +774,11 @@ class DatabaseManager:
                 """,
                 (user_id, food_id, food_name, amount, unit, meal_type, record_date, record_time, notes)
             )
+            record_id = self.cursor.lastrowid
+            self.bump_data_version(user_id, record_date)
             self.conn.commit()
-            return self.cursor.lastrowid
+            self.notify_change("diet", user_id, record_date)
+            return record_id
         except sqlite3.Error as e:
             print(f"添加饮食记录错误: {e}")
             return None
@@ -633,6 +865,7 @@ class DatabaseManager:
     def update_diet_record(self, record_id, amount, unit, meal_type, record_date, record_time, notes):
         """更新饮食记录"""
         try:
+            old = self.get_record_owner("diet_records", "record_date", record_id)
             self.cursor.execute(
                 """
                 UPDATE diet_records
@@ -641,7 +874,9 @@ class DatabaseManager:
                 """,
                 (amount, unit, meal_type, record_date, record_time, notes, record_id)
             )
+            self.bump_record_versions(old, record_date)
             self.conn.commit()
+            self.notify_record_moved("diet", old, record_date)
             return True
         except sqlite3.Error as e:
             print(f"更新饮食记录错误: {e}")
@@ -650,8 +885,11 @@ class DatabaseManager:
     def delete_diet_record(self, record_id):
         """删除饮食记录"""
         try:
+            old = self.get_record_owner("diet_records", "record_date", record_id)
             self.cursor.execute("DELETE FROM diet_records WHERE id = ?", (record_id,))
+            self.bump_record_versions(old)
             self.conn.commit()
+            self.notify_record_moved("diet", old)
             return True
         except sqlite3.Error as e:
             print(f"删除饮食记录错误: {e}")
@@ -746,7 +984,9 @@ class DatabaseManager:
                 (user_id, date, time, reminder_type, content)
             )
             self.conn.commit()
-            return self.cursor.lastrowid
+            reminder_id = self.cursor.lastrowid
+            self.notify_change("reminder", user_id, reminder_id)
+            return reminder_id
         except sqlite3.Error as e:
             print(f"添加提醒失败: {str(e)}")
             return None
@@ -785,54 +1025,279 @@ class DatabaseManager:
             print(f"获取提醒失败: {str(e)}")
             return []
 
-    def get_reminders_for_time_range(self, user_id, start_time, end_time):
+    def get_reminders_page(self, user_id, after=None, limit=100, date=None, include_completed=False):
         """
-        获取特定时间范围内的提醒
+        键集分页获取提醒，按 (日期, 时间, id) 排序
+        
+        与OFFSET分页不同，每一页都通过索引直接定位到上一页最后一行之后，
+        翻到多深都只读取limit行
         
         参数:
             user_id: 用户ID
-            start_time: 起始时间 (date_str, time_str)
-            end_time: 结束时间 (date_str, time_str)
+            after: 上一页最后一行的 (reminder_date, reminder_time, id)，为None时从头开始
+            limit: 每页行数
+            date: 只查询指定日期(YYYY-MM-DD)的提醒，此时包含已完成的提醒
+            include_completed: 不指定日期时是否包含已完成的提醒
             
         返回:
-            提醒列表
+            提醒列表，行结构与 get_reminders_by_user_date 相同
         """
         try:
-            start_date, start_time_str = start_time
-            end_date, end_time_str = end_time
+            conditions = ["user_id = ?"]
+            params = [user_id]
+            
+            if date:
+                conditions.append("reminder_date = ?")
+                params.append(date)
+            elif not include_completed:
+                conditions.append("is_completed = 0")
+                
+            if after is not None:
+                conditions.append("(reminder_date, reminder_time, id) > (?, ?, ?)")
+                params.extend(after)
+                
+            params.append(limit)
+            
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+            SELECT * FROM reminders
+            WHERE {' AND '.join(conditions)}
+            ORDER BY reminder_date, reminder_time, id
+            LIMIT ?
+            """, params)
             
-            print(f"查询时间范围内的提醒: {start_date} {start_time_str} - {end_date} {end_time_str}")
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"分页获取提醒失败: {str(e)}")
+            return []
+
+    def get_reminder_by_id(self, reminder_id):
+        """根据ID获取提醒，不存在时返回None"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT * FROM reminders WHERE id = ?", (reminder_id,))
+            return cursor.fetchone()
+        except sqlite3.Error as e:
+            print(f"获取提醒失败: {str(e)}")
+            return None
+
+    def get_pending_reminders(self, user_id, since_date):
+        """
+        获取从指定日期起所有未完成的提醒，供提醒调度器一次性加载
+        
+        参数:
+            user_id: 用户ID
+            since_date: 起始日期(YYYY-MM-DD)
             
+        返回:
+            提醒列表，按 (日期, 时间) 排序
+        """
+        try:
             cursor = self.conn.cursor()
+            cursor.execute("""
+            SELECT * FROM reminders
+            WHERE user_id = ? AND reminder_date >= ? AND is_completed = 0
+            ORDER BY reminder_date, reminder_time, id
+            """, (user_id, since_date))
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"获取待触发提醒失败: {str(e)}")
+            return []
+
+    @db_retry()
+    def add_reminder_rule(self, user_id, reminder_type, content, frequency, time_of_day,
+                          weekdays=None, interval_hours=None, window_end=None,
+                          start_date=None, end_date=None):
+        """
+        添加重复提醒规则
+        
+        参数:
+            user_id: 用户ID
+            reminder_type: 提醒类型
+            content: 提醒内容
+            frequency: 重复类型 daily/weekdays/weekly/hourly
+            time_of_day: 提醒时间(HH:MM)，hourly时为时间窗口起点
+            weekdays: weekly使用的星期列表，0表示周一
+            interval_hours: hourly使用的间隔小时数
+            window_end: hourly使用的时间窗口终点(HH:MM)
+            start_date: 开始日期(YYYY-MM-DD)
+            end_date: 结束日期(YYYY-MM-DD)，为None表示一直重复
             
-            # 构建查询
-            # 简化查询以确保能够捕获到今天所有时间范围内的提醒
+        返回:
+            成功返回规则ID，失败返回None
+        """
+        try:
+            weekdays_text = ",".join(str(day) for day in weekdays) if weekdays else None
+            self.cursor.execute(
+                """
+                INSERT INTO reminder_rules (user_id, reminder_type, content, frequency, time_of_day,
+                                            weekdays, interval_hours, window_end, start_date, end_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (user_id, reminder_type, content, frequency, time_of_day,
+                 weekdays_text, interval_hours, window_end, start_date, end_date)
+            )
+            self.conn.commit()
+            rule_id = self.cursor.lastrowid
+            self.notify_change("reminder_rule", user_id, rule_id)
+            return rule_id
+        except sqlite3.Error as e:
+            print(f"添加重复提醒失败: {str(e)}")
+            return None
+
+    def get_reminder_rules(self, user_id):
+        """获取用户所有启用的重复提醒规则"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT * FROM reminder_rules WHERE user_id = ? AND is_active = 1 ORDER BY time_of_day, id",
+                (user_id,)
+            )
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"获取重复提醒失败: {str(e)}")
+            return []
+
+    def get_reminder_rule_by_id(self, rule_id):
+        """根据ID获取重复提醒规则，不存在时返回None"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT * FROM reminder_rules WHERE id = ?", (rule_id,))
+            return cursor.fetchone()
+        except sqlite3.Error as e:
+            print(f"获取重复提醒失败: {str(e)}")
+            return None
+
+    @db_retry()
+    def update_reminder_rule(self, rule_id, reminder_type, content, frequency, time_of_day,
+                             weekdays=None, interval_hours=None, window_end=None,
+                             start_date=None, end_date=None):
+        """
+        修改重复提醒规则，参数同 add_reminder_rule
+        
+        已记录的完成和延迟按原定时间保存，时间改变后自然不再匹配，无需删除
+        
+        返回:
+            成功返回True，失败返回False
+        """
+        try:
+            weekdays_text = ",".join(str(day) for day in weekdays) if weekdays else None
+            cursor = self.conn.cursor()
             cursor.execute(
                 """
-                SELECT * FROM reminders 
-                WHERE user_id = ? 
-                AND reminder_date = ? 
-                AND reminder_time BETWEEN ? AND ?
-                AND is_completed = 0
-                ORDER BY reminder_time
+                UPDATE reminder_rules
+                SET reminder_type = ?, content = ?, frequency = ?, time_of_day = ?, weekdays = ?,
+                    interval_hours = ?, window_end = ?, start_date = ?, end_date = ?
+                WHERE id = ?
                 """,
-                (user_id, start_date, start_time_str, end_time_str)
+                (reminder_type, content, frequency, time_of_day, weekdays_text,
+                 interval_hours, window_end, start_date, end_date, rule_id)
             )
+            if cursor.rowcount == 0:
+                return False
+            self.conn.commit()
+            cursor.execute("SELECT user_id FROM reminder_rules WHERE id = ?", (rule_id,))
+            self.notify_change("reminder_rule", cursor.fetchone()[0], rule_id)
+            return True
+        except sqlite3.Error as e:
+            print(f"修改重复提醒失败: {str(e)}")
+            return False
+
+    def delete_reminder_rule(self, rule_id):
+        """删除重复提醒规则及其例外记录"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("DELETE FROM reminder_exceptions WHERE rule_id = ?", (rule_id,))
+            cursor.execute("DELETE FROM reminder_rules WHERE id = ?", (rule_id,))
+            self.conn.commit()
+            self.notify_change("reminder_rule", None, rule_id)
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"删除重复提醒失败: {str(e)}")
+            return False
+
+    def get_reminder_exceptions(self, user_id, start, end, rule_id=None):
+        """
+        获取时间窗口内的重复提醒例外
+        
+        包含原定时间在窗口内的例外，以及延迟到窗口内的例外
+        
+        参数:
+            user_id: 用户ID
+            start: 窗口起点(YYYY-MM-DD HH:MM:SS)
+            end: 窗口终点(YYYY-MM-DD HH:MM:SS)
+            rule_id: 只查询指定规则，为None时查询用户全部规则
             
-            reminders = cursor.fetchall()
+        返回:
+            [(规则ID, 原定时间, 状态, 延迟后时间), ...]
+        """
+        try:
+            params = [user_id, start, end, start, end]
+            rule_filter = ""
+            if rule_id is not None:
+                rule_filter = "AND e.rule_id = ?"
+                params.append(rule_id)
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+            SELECT e.rule_id, e.occurrence, e.status, e.snoozed_to
+            FROM reminder_exceptions e
+            JOIN reminder_rules r ON e.rule_id = r.id
+            WHERE r.user_id = ?
+              AND ((e.occurrence >= ? AND e.occurrence < ?)
+                   OR (e.status = 'snoozed' AND e.snoozed_to >= ? AND e.snoozed_to < ?))
+              {rule_filter}
+            """, params)
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"获取重复提醒例外失败: {str(e)}")
+            return []
+
+    @staticmethod
+    def write_reminder_updates(conn, updates):
+        """
+        在一个事务中批量写入提醒的完成和延迟
+        
+        供后台写入线程使用，conn为该线程自己的数据库连接
+        
+        参数:
+            conn: sqlite3连接
+            updates: [(动作, 提醒标识, 延迟到的datetime), ...]，
+                     动作为 "complete" 或 "snooze"，
+                     提醒标识为提醒ID或 ("rule", 规则ID, 原定时间)
             
-            if reminders:
-                print(f"找到{len(reminders)}条时间范围内的提醒")
-                if len(reminders) > 0:
-                    for i, reminder in enumerate(reminders):
-                        print(f"  提醒 {i+1}: ID={reminder[0]}, 日期={reminder[2]}, 时间={reminder[3]}, 内容={reminder[5]}")
-            else:
-                print("未找到时间范围内的提醒")
-                
-            return reminders
+        返回:
+            [(变更类型, key), ...] 去重后的变更列表，可直接用于 notify_change；失败时返回空列表
+        """
+        changes = []
+        try:
+            with conn:
+                for action, key, until in updates:
+                    if isinstance(key, tuple):
+                        _, rule_id, occurrence = key
+                        if action == "complete":
+                            conn.execute(
+                                "INSERT OR REPLACE INTO reminder_exceptions (rule_id, occurrence, status, snoozed_to) VALUES (?, ?, 'completed', NULL)",
+                                (rule_id, occurrence)
+                            )
+                        else:
+                            conn.execute(
+                                "INSERT OR REPLACE INTO reminder_exceptions (rule_id, occurrence, status, snoozed_to) VALUES (?, ?, 'snoozed', ?)",
+                                (rule_id, occurrence, until.strftime("%Y-%m-%d %H:%M:%S"))
+                            )
+                        changes.append(("reminder_rule", rule_id))
+                    else:
+                        if action == "complete":
+                            conn.execute("UPDATE reminders SET is_completed = 1 WHERE id = ?", (key,))
+                        else:
+                            conn.execute(
+                                "UPDATE reminders SET reminder_date = ?, reminder_time = ? WHERE id = ?",
+                                (until.strftime("%Y-%m-%d"), until.strftime("%H:%M:%S"), key)
+                            )
+                        changes.append(("reminder", key))
         except sqlite3.Error as e:
-            print(f"获取时间范围内的提醒失败: {str(e)}")
+            print(f"批量写入提醒状态失败: {str(e)}")
             return []
+        return list(dict.fromkeys(changes))
 
     def update_reminder(self, reminder_id, date=None, time=None, content=None, is_completed=None):
         """更新提醒
@@ -879,6 +1344,7 @@ class DatabaseManager:
             # 执行更新
             self.cursor.execute(sql, params)
             self.conn.commit()
+            self.notify_change("reminder", None, reminder_id)
             
             return True
         except sqlite3.Error as e:
@@ -908,6 +1374,7 @@ class DatabaseManager:
             # 检查是否删除了数据
             if cursor.rowcount > 0:
                 print(f"提醒{reminder_id}已删除")
+                self.notify_change("reminder", None, reminder_id)
                 return True
             else:
                 print(f"未找到提醒{reminder_id}")
@@ -940,6 +1407,7 @@ class DatabaseManager:
                 (reminder_id,)
             )
             self.conn.commit()
+            self.notify_change("reminder", None, reminder_id)
             
             # 验证更新是否成功
             self.cursor.execute("SELECT is_completed FROM reminders WHERE id = ?", (reminder_id,))
@@ -981,7 +1449,9 @@ class DatabaseManager:
             (user_id, exercise_name, category, duration, intensity, calories_burned, record_date, record_time, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (user_id, exercise_name, category, duration, intensity, calories_burned, record_date, record_time, notes))
+            self.bump_data_version(user_id, record_date)
             self.conn.commit()
+            self.notify_change("exercise", user_id, record_date)
             return cursor.lastrowid
         except sqlite3.Error as e:
             logger.error(f"添加运动记录时出错: {str(e)}")
@@ -1077,7 +1547,10 @@ class DatabaseManager:
             values.append(record_id)
 
             cursor.execute(sql, values)
+            # record[1]为用户ID，record[7]为原记录日期
+            self.bump_record_versions((record[1], record[7]), record_date)
             self.conn.commit()
+            self.notify_record_moved("exercise", (record[1], record[7]), record_date)
             return True
         except sqlite3.Error as e:
             logger.error(f"更新运动记录时出错: {str(e)}")
@@ -1094,9 +1567,12 @@ class DatabaseManager:
             成功返回True，失败返回False
         """
         try:
+            old = self.get_record_owner("exercise_records", "record_date", record_id)
             cursor = self.conn.cursor()
             cursor.execute("DELETE FROM exercise_records WHERE id = ?", (record_id,))
+            self.bump_record_versions(old)
             self.conn.commit()
+            self.notify_record_moved("exercise", old)
             return True
         except sqlite3.Error as e:
             logger.error(f"删除运动记录时出错: {str(e)}")
@@ -1178,6 +1654,353 @@ class DatabaseManager:
             print(f"获取每周睡眠摘要出错: {str(e)}")
             return []
             
+    def get_daily_trend_summary(self, user_id, start_date, end_date):
+        """
+        获取日期范围内每天的摄入热量、消耗热量、运动时长和睡眠情况
+        
+        三张记录表先各自按天聚合，再通过一次UNION ALL + GROUP BY合并，
+        无论范围多长都只执行一次查询
+        
+        参数:
+            user_id: 用户ID
+            start_date: 起始日期(YYYY-MM-DD)
+            end_date: 结束日期(YYYY-MM-DD)
+            
+        返回:
+            [(日期, 摄入热量, 消耗热量, 运动分钟, 睡眠分钟, 睡眠质量, 蛋白质, 脂肪, 碳水), ...]，
+            某类数据当天没有记录时对应字段为None
+        """
+        try:
+            self.cursor.execute("""
+            SELECT day, SUM(intake), SUM(burned), SUM(exercise_minutes),
+                   SUM(sleep_minutes), SUM(sleep_quality),
+                   SUM(protein), SUM(fat), SUM(carbs)
+            FROM (
+                SELECT dr.record_date AS day,
+                       SUM(f.calories * dr.amount / f.standard_weight) AS intake,
+                       NULL AS burned, NULL AS exercise_minutes,
+                       NULL AS sleep_minutes, NULL AS sleep_quality,
+                       SUM(f.protein * dr.amount / f.standard_weight) AS protein,
+                       SUM(f.fat * dr.amount / f.standard_weight) AS fat,
+                       SUM(f.carbs * dr.amount / f.standard_weight) AS carbs
+                FROM diet_records dr
+                LEFT JOIN foods f ON dr.food_id = f.id
+                WHERE dr.user_id = ? AND dr.record_date BETWEEN ? AND ?
+                GROUP BY dr.record_date
+                UNION ALL
+                SELECT record_date, NULL, SUM(calories_burned), SUM(duration), NULL, NULL,
+                       NULL, NULL, NULL
+                FROM exercise_records
+                WHERE user_id = ? AND record_date BETWEEN ? AND ?
+                GROUP BY record_date
+                UNION ALL
+                SELECT sleep_date, NULL, NULL, NULL, AVG(duration), AVG(quality),
+                       NULL, NULL, NULL
+                FROM sleep_records
+                WHERE user_id = ? AND sleep_date BETWEEN ? AND ?
+                GROUP BY sleep_date
+            )
+            GROUP BY day
+            ORDER BY day
+            """, (user_id, start_date, end_date) * 3)
+            
+            return self.cursor.fetchall()
+        except Exception as e:
+            print(f"获取每日趋势摘要出错: {str(e)}")
+            return []
+            
+    # 趋势统计的时段粒度 -> (时段起始日期的表达式, 到上一时段的日期偏移)
+    PERIOD_GRAINS = {
+        "week": ("date({}, '-6 days', 'weekday 1')", "-7 days"),
+        "month": ("date({}, 'start of month')", "-1 month"),
+    }
+    
+    def get_period_trend_summary(self, user_id, start_date, end_date, grain="week"):
+        """
+        按周或按月汇总日期范围内的数据，并与上一周/上一月比较
+        
+        每日聚合、按时段分组和环比（LAG窗口函数）在一次查询中完成；
+        范围内第一个时段的上一时段也会一起读取，因此第一行同样有环比
+        
+        参数:
+            user_id: 用户ID
+            start_date: 起始日期(YYYY-MM-DD)
+            end_date: 结束日期(YYYY-MM-DD)
+            grain: "week"（周一开始的自然周）或 "month"（自然月）
+            
+        返回:
+            [(时段起始日期, 有记录的天数, 日均摄入热量, 消耗热量, 运动分钟, 平均睡眠分钟, 平均睡眠质量,
+              日均摄入变化, 运动分钟变化, 平均睡眠分钟变化), ...]，
+            没有记录的时段不返回；上一时段没有记录时变化为None
+        """
+        if grain not in self.PERIOD_GRAINS:
+            raise ValueError(f"不支持的时段粒度: {grain}")
+        bucket, step = self.PERIOD_GRAINS[grain]
+        try:
+            self.cursor.execute(f"""
+            WITH bounds AS (
+                SELECT {bucket.format("?")} AS first_period,
+                       date({bucket.format("?")}, '{step}') AS first_day,
+                       ? AS last_day
+            ),
+            daily AS (
+                SELECT day, SUM(intake) AS intake, SUM(burned) AS burned,
+                       SUM(exercise_minutes) AS exercise_minutes,
+                       SUM(sleep_minutes) AS sleep_minutes, SUM(sleep_quality) AS sleep_quality
+                FROM (
+                    SELECT dr.record_date AS day,
+                           SUM(f.calories * dr.amount / f.standard_weight) AS intake,
+                           NULL AS burned, NULL AS exercise_minutes,
+                           NULL AS sleep_minutes, NULL AS sleep_quality
+                    FROM diet_records dr
+                    LEFT JOIN foods f ON dr.food_id = f.id, bounds
+                    WHERE dr.user_id = ? AND dr.record_date BETWEEN bounds.first_day AND bounds.last_day
+                    GROUP BY dr.record_date
+                    UNION ALL
+                    SELECT record_date, NULL, SUM(calories_burned), SUM(duration), NULL, NULL
+                    FROM exercise_records, bounds
+                    WHERE user_id = ? AND record_date BETWEEN bounds.first_day AND bounds.last_day
+                    GROUP BY record_date
+                    UNION ALL
+                    SELECT sleep_date, NULL, NULL, NULL, AVG(duration), AVG(quality)
+                    FROM sleep_records, bounds
+                    WHERE user_id = ? AND sleep_date BETWEEN bounds.first_day AND bounds.last_day
+                    GROUP BY sleep_date
+                )
+                GROUP BY day
+            ),
+            periods AS (
+                SELECT {bucket.format("day")} AS period, COUNT(*) AS days,
+                       AVG(intake) AS intake, SUM(burned) AS burned,
+                       COALESCE(SUM(exercise_minutes), 0) AS exercise,
+                       AVG(sleep_minutes) AS sleep, AVG(sleep_quality) AS quality
+                FROM daily
+                GROUP BY period
+            ),
+            trend AS (
+                SELECT *,
+                       LAG(period) OVER w AS previous_period,
+                       LAG(intake) OVER w AS previous_intake,
+                       LAG(exercise) OVER w AS previous_exercise,
+                       LAG(sleep) OVER w AS previous_sleep
+                FROM periods
+                WINDOW w AS (ORDER BY period)
+            )
+            SELECT period, days, intake, burned, exercise, sleep, quality,
+                   CASE WHEN previous_period = date(period, '{step}') THEN intake - previous_intake END,
+                   CASE WHEN previous_period = date(period, '{step}') THEN exercise - previous_exercise END,
+                   CASE WHEN previous_period = date(period, '{step}') THEN sleep - previous_sleep END
+            FROM trend
+            WHERE period >= (SELECT first_period FROM bounds)
+            ORDER BY period
+            """, (start_date, start_date, end_date, user_id, user_id, user_id))
+            
+            return self.cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"获取时段趋势汇总出错: {str(e)}")
+            return []
+            
+    def get_cohort_daily_summary(self, start_date, end_date):
+        """
+        获取日期范围内所有用户每天的汇总，用于群体统计
+        
+        与 get_daily_trend_summary 的聚合方式相同，只是按 (用户, 日期) 分组，一次查询完成
+        
+        返回:
+            [(用户ID, 日期, 摄入热量, 消耗热量, 运动分钟, 睡眠分钟, 睡眠质量, 蛋白质, 脂肪, 碳水), ...]，
+            按用户ID和日期排序
+        """
+        try:
+            self.cursor.execute("""
+            SELECT user_id, day, SUM(intake), SUM(burned), SUM(exercise_minutes),
+                   SUM(sleep_minutes), SUM(sleep_quality),
+                   SUM(protein), SUM(fat), SUM(carbs)
+            FROM (
+                SELECT dr.user_id, dr.record_date AS day,
+                       SUM(f.calories * dr.amount / f.standard_weight) AS intake,
+                       NULL AS burned, NULL AS exercise_minutes,
+                       NULL AS sleep_minutes, NULL AS sleep_quality,
+                       SUM(f.protein * dr.amount / f.standard_weight) AS protein,
+                       SUM(f.fat * dr.amount / f.standard_weight) AS fat,
+                       SUM(f.carbs * dr.amount / f.standard_weight) AS carbs
+                FROM diet_records dr
+                LEFT JOIN foods f ON dr.food_id = f.id
+                WHERE dr.record_date BETWEEN ? AND ?
+                GROUP BY dr.user_id, dr.record_date
+                UNION ALL
+                SELECT user_id, record_date, NULL, SUM(calories_burned), SUM(duration), NULL, NULL,
+                       NULL, NULL, NULL
+                FROM exercise_records
+                WHERE record_date BETWEEN ? AND ?
+                GROUP BY user_id, record_date
+                UNION ALL
+                SELECT user_id, sleep_date, NULL, NULL, NULL, AVG(duration), AVG(quality),
+                       NULL, NULL, NULL
+                FROM sleep_records
+                WHERE sleep_date BETWEEN ? AND ?
+                GROUP BY user_id, sleep_date
+            )
+            GROUP BY user_id, day
+            ORDER BY user_id, day
+            """, (start_date, end_date) * 3)
+            
+            return self.cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"获取群体每日汇总出错: {str(e)}")
+            return []
+            
+    def get_all_user_profiles(self):
+        """
+        获取所有用户用于健康分析和报告的资料
+        
+        返回:
+            {用户ID: {"username", "gender", "age", "height", "weight", "diet_habit", "exercise_habit", "sleep_habit"}}
+        """
+        try:
+            self.cursor.execute("""
+            SELECT id, username, gender, age, height, weight, diet_habit, exercise_habit, sleep_habit
+            FROM users
+            """)
+            columns = [description[0] for description in self.cursor.description][1:]
+            return {row[0]: dict(zip(columns, row[1:])) for row in self.cursor.fetchall()}
+        except sqlite3.Error as e:
+            print(f"获取所有用户资料出错: {str(e)}")
+            return {}
+            
+    def get_daily_rollups(self, user_id, start_date, end_date):
+        """
+        读取保存的每日汇总
+        
+        返回:
+            与 get_daily_trend_summary 相同格式的列表
+        """
+        try:
+            self.cursor.execute("""
+            SELECT day, intake, burned, exercise_minutes, sleep_minutes, sleep_quality,
+                   protein, fat, carbs
+            FROM daily_rollups
+            WHERE user_id = ? AND day BETWEEN ? AND ?
+            ORDER BY day
+            """, (user_id, start_date, end_date))
+            return self.cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"读取每日汇总出错: {str(e)}")
+            return []
+            
+    def replace_daily_rollups(self, user_id, rows):
+        """用 get_daily_trend_summary 的结果整体替换用户的每日汇总"""
+        try:
+            self.cursor.execute("DELETE FROM daily_rollups WHERE user_id = ?", (user_id,))
+            self.cursor.executemany(
+                "INSERT INTO daily_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(user_id,) + tuple(row) for row in rows]
+            )
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"重建每日汇总出错: {str(e)}")
+            return False
+            
+    def get_rolling_stats(self, user_id):
+        """
+        读取保存的滚动统计状态
+        
+        返回:
+            [(窗口天数, 字段, 窗口最后一天, 天数, 合计, 均值, M2), ...]
+        """
+        try:
+            self.cursor.execute("""
+            SELECT window_days, field, anchor, count, total, mean, m2
+            FROM rolling_stats
+            WHERE user_id = ?
+            """, (user_id,))
+            return self.cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"读取滚动统计出错: {str(e)}")
+            return []
+            
+    def save_rolling_stats(self, user_id, anchor, stats, rollups=()):
+        """
+        在一个事务中保存滚动统计和变化的每日汇总
+        
+        参数:
+            user_id: 用户ID
+            anchor: 窗口的最后一天(YYYY-MM-DD)
+            stats: [(窗口天数, 字段, 天数, 合计, 均值, M2), ...]
+            rollups: [(日期, 摄入热量, 消耗热量, 运动分钟, 睡眠分钟, 睡眠质量, 蛋白质, 脂肪, 碳水), ...]，
+                     除日期外全为None的行表示当天已没有记录
+        """
+        try:
+            for row in rollups:
+                if all(value is None for value in row[1:]):
+                    self.cursor.execute(
+                        "DELETE FROM daily_rollups WHERE user_id = ? AND day = ?", (user_id, row[0])
+                    )
+                else:
+                    self.cursor.execute(
+                        "INSERT OR REPLACE INTO daily_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (user_id,) + tuple(row)
+                    )
+            self.cursor.executemany(
+                "INSERT OR REPLACE INTO rolling_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(user_id, window, field, anchor) + tuple(values) for window, field, *values in stats]
+            )
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"保存滚动统计出错: {str(e)}")
+            return False
+            
+    def get_activity_times(self, user_id, start_date, end_date):
+        """
+        获取日期范围内每条饮食、运动和睡眠记录发生的时刻，用于分析作息习惯
+        
+        时刻读出后由 minutes_of_day 换算为当天的分钟数，兼容不补零的时间和完整时间戳；
+        同一餐的多种食物只取最早的一条
+        
+        参数:
+            user_id: 用户ID
+            start_date: 起始日期(YYYY-MM-DD)
+            end_date: 结束日期(YYYY-MM-DD)
+            
+        返回:
+            [(类别, 名称, 星期(0为周日), 当天分钟数), ...]，
+            类别为 diet/exercise/sleep，饮食的名称为餐次
+        """
+        try:
+            self.cursor.execute("""
+            SELECT 'diet', meal_type, CAST(strftime('%w', record_date) AS INTEGER), record_date, record_time
+            FROM diet_records
+            WHERE user_id = ? AND record_date BETWEEN ? AND ? AND record_time IS NOT NULL
+            UNION ALL
+            SELECT 'exercise', '运动', CAST(strftime('%w', record_date) AS INTEGER), record_date, record_time
+            FROM exercise_records
+            WHERE user_id = ? AND record_date BETWEEN ? AND ? AND record_time IS NOT NULL
+            UNION ALL
+            SELECT 'sleep', '睡眠', CAST(strftime('%w', sleep_date) AS INTEGER), sleep_date, sleep_time
+            FROM sleep_records
+            WHERE user_id = ? AND sleep_date BETWEEN ? AND ? AND sleep_time IS NOT NULL
+            """, (user_id, start_date, end_date) * 3)
+            
+            rows = []
+            meals = {}
+            for category, name, weekday, day, time_value in self.cursor.fetchall():
+                minutes = minutes_of_day(time_value)
+                # 无法解析的日期或时间直接丢弃
+                if weekday is None or minutes is None:
+                    continue
+                if category == "diet":
+                    key = (day, name)
+                    meals[key] = (category, name, weekday, min(minutes, meals[key][3]) if key in meals else minutes)
+                else:
+                    rows.append((category, name, weekday, minutes))
+            return list(meals.values()) + rows
+        except Exception as e:
+            print(f"获取记录时刻出错: {str(e)}")
+            return []
+            
     def get_user_profile_for_analysis(self, user_id):
         """获取用户资料用于分析"""
         try:
@@ -1214,7 +2037,9 @@ class DatabaseManager:
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (user_id, sleep_date, sleep_time, wake_date, wake_time, duration, quality, notes))
             
+            self.bump_data_version(user_id, sleep_date)
             self.conn.commit()
+            self.notify_change("sleep", user_id, sleep_date)
             return True
         except Exception as e:
             print(f"添加睡眠记录出错: {str(e)}")
@@ -1278,7 +2103,9 @@ class DatabaseManager:
             WHERE id = ?
             """, (sleep_date, sleep_time, wake_date, wake_time, duration, quality, notes, record_id))
             
+            self.bump_record_versions((record[1], record[3]), sleep_date)
             self.conn.commit()
+            self.notify_record_moved("sleep", (record[1], record[3]), sleep_date)
             return True
         except Exception as e:
             print(f"更新睡眠记录出错: {str(e)}")
@@ -1287,41 +2114,11 @@ class DatabaseManager:
     def delete_sleep_record(self, record_id):
         """删除睡眠记录"""
         try:
+            old = self.get_record_owner("sleep_records", "sleep_date", record_id)
             self.cursor.execute("DELETE FROM sleep_records WHERE id = ?", (record_id,))
             self.conn.commit()
+            self.notify_record_moved("sleep", old)
             return True
         except Exception as e:
             print(f"删除睡眠记录出错: {str(e)}")
             return False
-
-    def upgrade_passwords(self):
-        """升级数据库中的明文密码到哈希密码"""
-        try:
-            # 检查是否有用户的salt为空，表示是明文密码
-            self.cursor.execute("SELECT id, username, password FROM users WHERE salt IS NULL OR salt = ''")
-            users_to_upgrade = self.cursor.fetchall()
-            
-            if not users_to_upgrade:
-                # print("所有用户密码已经是哈希格式，不需要升级")
-                return
-                
-            print(f"需要升级密码的用户数: {len(users_to_upgrade)}")
-            
-            for user_id, username, plain_password in users_to_upgrade:
-                try:
-                    # 对明文密码进行哈希处理
-                    hashed_password, salt = hash_password(plain_password)
-                    
-                    # 更新用户的密码和盐值
-                    self.cursor.execute(
-                        "UPDATE users SET password = ?, salt = ? WHERE id = ?",
-                        (hashed_password, salt, user_id)
-                    )
-                    print(f"已升级用户 {username} (ID: {user_id}) 的密码")
-                except Exception as e:
-                    print(f"升级用户 {username} (ID: {user_id}) 的密码时出错: {e}")
-            
-            self.conn.commit()
-            print("密码升级完成")
-        except Exception as e:
-            print(f"升级密码过程出错: {e}") 
\ No newline at end of file
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据库迁移
+已完成的迁移版本记录在 PRAGMA user_version 中，启动时只读取这一个数字；
+需要执行的迁移在后台线程中分批完成，每批单独提交，中断后下次启动从剩余的行继续
+"""
+
+import sqlite3
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+def get_schema_version(conn):
+    """读取已完成的迁移版本"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_schema_version(conn, version):
+    """记录已完成的迁移版本"""
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+    conn.commit()
+
+
+def migrate_legacy_passwords(conn, hasher, should_stop, progress, chunk_size=20):
+    """
+    版本1：把明文存储的旧密码（盐值为空）改为当前算法的哈希
+
+    按ID分批处理，每批在一个事务中提交；已处理的行不再满足查询条件，中断后重新执行即可继续
+
+    返回:
+        全部处理完返回True，被中断返回False
+    """
+    from utils.verification import generate_salt
+
+    done = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, password FROM users WHERE (salt IS NULL OR salt = '') AND id > ? ORDER BY id LIMIT ?",
+            (last_id, chunk_size)
+        ).fetchall()
+        if not rows:
+            return True
+
+        updates = []
+        for user_id, plain_password in rows:
+            if should_stop():
+                break
+            salt = generate_salt()
+            updates.append((hasher.hash(plain_password or "", salt), salt, user_id))
+            last_id = user_id
+
+        # 只更新仍为明文的行，期间修改过密码的用户不受影响
+        with conn:
+            conn.executemany(
+                "UPDATE users SET password = ?, salt = ? WHERE id = ? AND (salt IS NULL OR salt = '')",
+                updates
+            )
+        done += len(updates)
+        progress(f"已升级{done}个用户的密码")
+
+        if should_stop():
+            return False
+
+
+# (版本号, 说明, 迁移函数)，按版本号递增执行
+MIGRATIONS = [
+    (1, "升级明文存储的旧密码", migrate_legacy_passwords),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+class MigrationWorker(QThread):
+    """
+    在后台线程依次执行未完成的迁移
+
+    使用独立的数据库连接；每个迁移全部完成后才更新 user_version
+    """
+
+    progress = pyqtSignal(str)
+    completed = pyqtSignal(int)
+
+    def __init__(self, db_path, hasher, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.hasher = hasher
+        self.stopping = False
+
+    def stop(self):
+        """当前批次写完后停止，剩余部分下次启动时继续"""
+        self.stopping = True
+        self.wait()
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            version = get_schema_version(conn)
+            for target, description, migrate in MIGRATIONS:
+                if target <= version:
+                    continue
+                print(f"开始数据库迁移 {target}: {description}")
+                if not migrate(conn, self.hasher, lambda: self.stopping, self.progress.emit):
+                    print(f"数据库迁移 {target} 已中断，下次启动时继续")
+                    return
+                set_schema_version(conn, target)
+                version = target
+                print(f"数据库迁移 {target} 完成")
+            self.completed.emit(version)
+        except sqlite3.Error as e:
+            print(f"数据库迁移出错: {str(e)}")
+        finally:
+            conn.close()
+
+
+def start_pending_migrations(db_manager, parent=None):
+    """
+    有未完成的迁移时启动后台线程
+
+    返回:
+        MigrationWorker，已是最新版本时返回None
+    """
+    if get_schema_version(db_manager.conn) >= SCHEMA_VERSION:
+        return None
+    worker = MigrationWorker(db_manager.db_path, db_manager.get_password_hasher(), parent)
+    worker.start()
+    return worker
@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+轻量图表组件
+直接使用QPainter绘制柱状图、折线图和堆叠面积图，用于应用内的交互图表，
+避免在界面路径上加载matplotlib
+"""
+
+import math
+
+import numpy as np
+from PyQt5.QtWidgets import QWidget, QToolTip, QSizePolicy
+from PyQt5.QtCore import Qt, QRectF, QPointF
+from PyQt5.QtGui import QPainter, QPainterPath, QPen, QColor, QFont, QPolygonF
+
+
+class ChartWidget(QWidget):
+    """
+    原生图表组件
+
+    支持三种图表类型:
+        bar:  柱状图，多个序列并排显示
+        line: 折线图，NaN会使折线断开
+        area: 堆叠面积图，NaN按0处理
+
+    绘制路径在数据或尺寸变化时才重新生成，其余重绘直接复用缓存的路径；
+    折线按连续片段缓存为QPolygonF，用drawPolyline绘制，比描边一整条QPainterPath快得多
+    """
+
+    MARGIN_LEFT = 52
+    MARGIN_RIGHT = 16
+    MARGIN_RIGHT_SECONDARY = 44
+    MARGIN_TOP = 30
+    MARGIN_BOTTOM = 28
+    HIT_DISTANCE = 12  # 悬停提示的最大像素距离
+
+    def __init__(self, kind="line", parent=None):
+        super().__init__(parent)
+        self.kind = kind
+        self.title = ""
+        self.y_label = ""
+        self.empty_text = "暂无数据"
+        self.x = np.zeros(0)
+        self.series = []          # [{"name", "values", "color", "secondary"}]
+        self.bar_labels = []      # 柱形上方的标注文字
+        self.bar_width = None     # 柱宽（横轴单位），None表示自动
+        self.x_formatter = lambda value: f"{value:g}"
+        self.y_formatter = lambda value: f"{value:g}"
+
+        # 缓存的绘制结果
+        self.paths_dirty = True
+        self.plot_rect = QRectF()
+        self.series_paths = []    # 与series一一对应：折线为QPolygonF片段列表，其余为QPainterPath
+        self.bar_rects = []       # [(QRectF, 序列下标, 点下标)]
+        self.pixel_x = np.zeros(0)
+        self.x_range = (0.0, 1.0)
+        self.y_range = (0.0, 1.0)
+        self.y2_range = (0.0, 1.0)
+
+        self.setMouseTracking(True)
+        self.setMinimumHeight(200)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+    def set_title(self, title, y_label=""):
+        """设置标题和纵轴说明"""
+        self.title = title
+        self.y_label = y_label
+        self.update()
+
+    def set_formatters(self, x_formatter=None, y_formatter=None):
+        """设置坐标轴刻度的格式化函数"""
+        if x_formatter:
+            self.x_formatter = x_formatter
+        if y_formatter:
+            self.y_formatter = y_formatter
+        self.paths_dirty = True
+        self.update()
+
+    def set_data(self, x, series, bar_labels=None, bar_width=None):
+        """
+        设置图表数据
+
+        参数:
+            x: 横坐标序列
+            series: 序列列表，每项为字典 {"name", "values", "color", "secondary"(可选)}
+            bar_labels: 柱状图每根柱子上方的文字（可选）
+            bar_width: 柱宽，横轴单位（可选）
+        """
+        self.x = np.asarray(x, dtype=float)
+        self.series = []
+        for item in series:
+            self.series.append({
+                "name": item["name"],
+                "values": np.asarray(item["values"], dtype=float),
+                "color": QColor(item.get("color", "#3498DB")),
+                "secondary": bool(item.get("secondary", False)),
+            })
+        self.bar_labels = list(bar_labels or [])
+        self.bar_width = bar_width
+        self.paths_dirty = True
+        self.update()
+
+    def clear(self):
+        """清空数据"""
+        self.set_data([], [])
+
+    def has_data(self):
+        """是否有可绘制的数据"""
+        return len(self.x) > 0 and any(np.any(~np.isnan(s["values"])) for s in self.series)
+
+    def resizeEvent(self, event):
+        """尺寸变化后需要重新生成路径"""
+        super().resizeEvent(event)
+        self.paths_dirty = True
+
+    # ---------- 坐标换算 ----------
+
+    def has_secondary(self):
+        return any(s["secondary"] for s in self.series)
+
+    def compute_ranges(self):
+        """计算横纵坐标范围"""
+        xmin, xmax = float(self.x.min()), float(self.x.max())
+        if self.kind == "bar":
+            half = (self.effective_bar_width() * max(len(self.series), 1)) / 2
+            xmin, xmax = xmin - half * 2, xmax + half * 2
+        if xmax <= xmin:
+            xmin, xmax = xmin - 1, xmax + 1
+        self.x_range = (xmin, xmax)
+
+        if self.kind == "area":
+            stacked = np.nansum([np.nan_to_num(s["values"]) for s in self.series], axis=0)
+            primary_max = float(np.max(stacked)) if len(stacked) else 0.0
+        else:
+            primary_max = self.series_max([s for s in self.series if not s["secondary"]])
+        secondary_max = self.series_max([s for s in self.series if s["secondary"]])
+
+        self.y_range = (0.0, self.nice_ceiling(primary_max * (1.25 if self.bar_labels else 1.05)))
+        self.y2_range = (0.0, self.nice_ceiling(secondary_max * 1.05))
+
+    @staticmethod
+    def series_max(series):
+        values = [np.nanmax(s["values"]) for s in series if np.any(~np.isnan(s["values"]))]
+        return float(max(values)) if values else 0.0
+
+    @staticmethod
+    def nice_ceiling(value):
+        """把最大值向上取整到便于阅读的刻度"""
+        if value <= 0:
+            return 1.0
+        magnitude = 10 ** math.floor(math.log10(value))
+        for step in (1, 2, 2.5, 5, 10):
+            if value <= step * magnitude:
+                return step * magnitude
+        return 10 * magnitude
+
+    def effective_bar_width(self):
+        """柱宽：未指定时取最小间距的60%"""
+        if self.bar_width:
+            return self.bar_width
+        if len(self.x) > 1:
+            spacing = float(np.min(np.diff(np.unique(self.x)))) if len(np.unique(self.x)) > 1 else 1.0
+            return spacing * 0.6 / max(len(self.series), 1)
+        return 0.6
+
+    def map_x(self, values):
+        xmin, xmax = self.x_range
+        return self.plot_rect.left() + (np.asarray(values) - xmin) / (xmax - xmin) * self.plot_rect.width()
+
+    def map_y(self, values, secondary=False):
+        ymin, ymax = self.y2_range if secondary else self.y_range
+        return self.plot_rect.bottom() - (np.asarray(values) - ymin) / (ymax - ymin) * self.plot_rect.height()
+
+    # ---------- 路径生成 ----------
+
+    def rebuild_paths(self):
+        """根据当前数据和尺寸生成绘制路径"""
+        right = self.MARGIN_RIGHT_SECONDARY if self.has_secondary() else self.MARGIN_RIGHT
+        self.plot_rect = QRectF(
+            self.MARGIN_LEFT, self.MARGIN_TOP,
+            max(self.width() - self.MARGIN_LEFT - right, 10),
+            max(self.height() - self.MARGIN_TOP - self.MARGIN_BOTTOM, 10)
+        )
+        self.series_paths = []
+        self.bar_rects = []
+        self.paths_dirty = False
+
+        if not self.has_data():
+            self.pixel_x = np.zeros(0)
+            return
+
+        self.compute_ranges()
+        self.pixel_x = self.map_x(self.x)
+
+        if self.kind == "bar":
+            self.build_bar_paths()
+        elif self.kind == "area":
+            self.build_area_paths()
+        else:
+            self.build_line_paths()
+
+    def build_line_paths(self):
+        for s in self.series:
+            ys = self.map_y(s["values"], s["secondary"])
+            segments = []
+            segment = QPolygonF()
+            for px, py in zip(self.pixel_x, ys):
+                if math.isnan(py):
+                    if segment.size():
+                        segments.append(segment)
+                        segment = QPolygonF()
+                    continue
+                segment.append(QPointF(px, py))
+            if segment.size():
+                segments.append(segment)
+            self.series_paths.append(segments)
+
+    def build_area_paths(self):
+        baseline = np.zeros(len(self.x))
+        for s in self.series:
+            top = baseline + np.nan_to_num(s["values"])
+            upper = self.map_y(top)
+            lower = self.map_y(baseline)
+            path = QPainterPath()
+            path.moveTo(self.pixel_x[0], lower[0])
+            for px, py in zip(self.pixel_x, upper):
+                path.lineTo(px, py)
+            for px, py in zip(self.pixel_x[::-1], lower[::-1]):
+                path.lineTo(px, py)
+            path.closeSubpath()
+            self.series_paths.append(path)
+            baseline = top
+
+    def build_bar_paths(self):
+        width = self.effective_bar_width()
+        count = len(self.series)
+        zero = float(self.map_y(0.0))
+        for series_index, s in enumerate(self.series):
+            path = QPainterPath()
+            offset = (series_index - (count - 1) / 2) * width
+            left = self.map_x(self.x + offset - width / 2)
+            right = self.map_x(self.x + offset + width / 2)
+            tops = self.map_y(np.nan_to_num(s["values"]), s["secondary"])
+            for point_index, (x1, x2, top) in enumerate(zip(left, right, tops)):
+                rect = QRectF(QPointF(x1, top), QPointF(x2, zero)).normalized()
+                path.addRect(rect)
+                self.bar_rects.append((rect, series_index, point_index))
+            self.series_paths.append(path)
+
+    # ---------- 绘制 ----------
+
+    def paintEvent(self, event):
+        if self.paths_dirty:
+            self.rebuild_paths()
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QColor(255, 255, 255))
+
+        if self.title:
+            title_font = QFont(self.font())
+            title_font.setBold(True)
+            painter.setFont(title_font)
+            painter.setPen(QColor(44, 62, 80))
+            painter.drawText(QRectF(0, 4, self.width(), self.MARGIN_TOP - 6), Qt.AlignCenter, self.title)
+            painter.setFont(self.font())
+
+        if not self.has_data():
+            painter.setPen(QColor(127, 140, 141))
+            painter.drawText(self.rect(), Qt.AlignCenter, self.empty_text)
+            painter.end()
+            return
+
+        self.draw_axes(painter)
+
+        for s, path in zip(self.series, self.series_paths):
+            if self.kind == "line":
+                painter.setPen(QPen(s["color"], 1.6))
+                painter.setBrush(Qt.NoBrush)
+                for segment in path:
+                    if segment.size() == 1:
+                        painter.drawPoint(segment[0])
+                    else:
+                        painter.drawPolyline(segment)
+            else:
+                fill = QColor(s["color"])
+                fill.setAlpha(180)
+                painter.setPen(QPen(s["color"], 1))
+                painter.setBrush(fill)
+                painter.drawPath(path)
+
+        if self.kind == "bar" and self.bar_labels:
+            self.draw_bar_labels(painter)
+
+        self.draw_legend(painter)
+        painter.end()
+
+    def draw_axes(self, painter):
+        """绘制网格线和刻度"""
+        rect = self.plot_rect
+        small_font = QFont(self.font())
+        small_font.setPointSizeF(max(small_font.pointSizeF() - 1, 7))
+        painter.setFont(small_font)
+
+        grid_pen = QPen(QColor(230, 230, 230), 1)
+        text_color = QColor(100, 110, 120)
+        ticks = 5
+        for i in range(ticks + 1):
+            ratio = i / ticks
+            y = rect.bottom() - ratio * rect.height()
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(rect.left(), y), QPointF(rect.right(), y))
+            painter.setPen(text_color)
+            value = self.y_range[0] + ratio * (self.y_range[1] - self.y_range[0])
+            painter.drawText(QRectF(0, y - 8, self.MARGIN_LEFT - 6, 16),
+                             Qt.AlignRight | Qt.AlignVCenter, self.y_formatter(value))
+            if self.has_secondary():
+                value2 = self.y2_range[0] + ratio * (self.y2_range[1] - self.y2_range[0])
+                painter.drawText(QRectF(rect.right() + 6, y - 8, self.MARGIN_RIGHT_SECONDARY - 6, 16),
+                                 Qt.AlignLeft | Qt.AlignVCenter, f"{value2:g}")
+
+        # 横轴刻度：柱状图标注每个数据点，其余均匀取6个
+        if self.kind == "bar" and len(self.x) <= 12:
+            tick_values = np.unique(self.x)
+        else:
+            tick_values = np.linspace(self.x_range[0], self.x_range[1], 6)
+        for value in tick_values:
+            x = float(self.map_x(value))
+            painter.drawText(QRectF(x - 40, rect.bottom() + 4, 80, 18),
+                             Qt.AlignHCenter | Qt.AlignTop, self.x_formatter(value))
+
+        painter.setPen(QPen(QColor(180, 180, 180), 1))
+        painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+
+        if self.y_label:
+            painter.save()
+            painter.translate(10, rect.center().y())
+            painter.rotate(-90)
+            painter.setPen(text_color)
+            painter.drawText(QRectF(-rect.height() / 2, -8, rect.height(), 16), Qt.AlignCenter, self.y_label)
+            painter.restore()
+        painter.setFont(self.font())
+
+    def draw_bar_labels(self, painter):
+        painter.setPen(QColor(44, 62, 80))
+        for rect, series_index, point_index in self.bar_rects:
+            if series_index == 0 and point_index < len(self.bar_labels):
+                painter.drawText(QRectF(rect.center().x() - 50, rect.top() - 18, 100, 16),
+                                 Qt.AlignHCenter | Qt.AlignBottom, str(self.bar_labels[point_index]))
+
+    def draw_legend(self, painter):
+        if len(self.series) < 2:
+            return
+        x = self.plot_rect.left() + 6
+        y = self.plot_rect.top() + 4
+        for s in self.series:
+            painter.fillRect(QRectF(x, y + 3, 10, 10), s["color"])
+            painter.setPen(QColor(44, 62, 80))
+            text_width = painter.fontMetrics().width(s["name"])
+            painter.drawText(QRectF(x + 14, y, text_width + 4, 16), Qt.AlignLeft | Qt.AlignVCenter, s["name"])
+            x += text_width + 28
+
+    # ---------- 悬停提示 ----------
+
+    def hit_test(self, pos):
+        """返回鼠标位置对应的数据点下标，没有命中时返回None"""
+        if self.paths_dirty or not len(self.pixel_x):
+            return None
+        if self.kind == "bar":
+            for rect, _, point_index in self.bar_rects:
+                if rect.adjusted(-2, -2, 2, 2).contains(pos):
+                    return point_index
+            return None
+        index = int(np.searchsorted(self.pixel_x, pos.x()))
+        candidates = [i for i in (index - 1, index) if 0 <= i < len(self.pixel_x)]
+        best = min(candidates, key=lambda i: abs(self.pixel_x[i] - pos.x()))
+        if abs(self.pixel_x[best] - pos.x()) <= self.HIT_DISTANCE:
+            return best
+        return None
+
+    def mouseMoveEvent(self, event):
+        index = self.hit_test(QPointF(event.pos()))
+        if index is None:
+            QToolTip.hideText()
+            return
+        lines = [self.x_formatter(self.x[index])]
+        if self.kind == "bar" and index < len(self.bar_labels):
+            lines.append(str(self.bar_labels[index]))
+        for s in self.series:
+            value = s["values"][index]
+            if not math.isnan(value):
+                lines.append(f"{s['name']}: {self.y_formatter(value)}")
+        QToolTip.showText(event.globalPos(), "\n".join(lines), self)
+
+    def leaveEvent(self, event):
+        QToolTip.hideText()
+        super().leaveEvent(event)
@@ -7,10 +7,14 @@ from PyQt5.QtGui import QFont, QColor
 
 from ui.diet_record import DietRecordDialog
 from ui.meal_batch_edit import MealBatchEditDialog
+from ui.chart_widget import ChartWidget
 
 class DietView(QWidget):
     """饮食记录查看界面"""
     
+    # 热量分布图中的餐食顺序
+    MEAL_TYPES = ["早餐", "午餐", "晚餐", "加餐"]
+    
     def __init__(self, user_id, db_manager, parent=None):
         super().__init__(parent)
         self.user_id = user_id
@@ -102,12 +106,25 @@ class DietView(QWidget):
         
         summary_group.setLayout(summary_layout)
         
+        # 各餐热量分布图
+        self.meal_chart = ChartWidget("bar")
+        self.meal_chart.set_title("各餐热量分布", "kcal")
+        self.meal_chart.empty_text = "今日暂无饮食记录"
+        self.meal_chart.set_formatters(
+            x_formatter=lambda value: self.MEAL_TYPES[int(round(value))] if 0 <= round(value) < len(self.MEAL_TYPES) else "",
+            y_formatter=lambda value: f"{value:.0f}"
+        )
+        
+        summary_row = QHBoxLayout()
+        summary_row.addWidget(summary_group, 1)
+        summary_row.addWidget(self.meal_chart, 2)
+        
         # 将所有组件添加到主布局
         main_layout.addLayout(controls_layout)
         main_layout.addWidget(separator)
         main_layout.addWidget(self.records_table)
         main_layout.addLayout(record_buttons_layout)
-        main_layout.addWidget(summary_group)
+        main_layout.addLayout(summary_row)
         
         self.setLayout(main_layout)
         
@@ -140,6 +157,7 @@ class DietView(QWidget):
             total_fat = 0
             total_carbs = 0
             total_fiber = 0
+            meal_calories = {meal: 0 for meal in self.MEAL_TYPES}
             
             for row, record in enumerate(records):
                 # 添加调试信息
@@ -227,6 +245,8 @@ class DietView(QWidget):
                     total_fat += actual_fat
                     total_carbs += actual_carbs
                     total_fiber += actual_fiber
+                    if meal_type in meal_calories:
+                        meal_calories[meal_type] += actual_calories
                     
                     print(f"  计算结果: 实际热量={actual_calories:.1f}, 实际蛋白质={actual_protein:.1f}, 实际脂肪={actual_fat:.1f}, 实际碳水={actual_carbs:.1f}, 实际纤维={actual_fiber:.1f}")
                     
@@ -294,6 +314,15 @@ class DietView(QWidget):
             self.total_carbs_label.setText(f"{total_carbs:.1f} g")
             self.total_fiber_label.setText(f"{total_fiber:.1f} g")
             
+            # 更新各餐热量图
+            if records:
+                self.meal_chart.set_data(
+                    range(len(self.MEAL_TYPES)),
+                    [{"name": "热量", "values": [meal_calories[meal] for meal in self.MEAL_TYPES], "color": "#E67E22"}]
+                )
+            else:
+                self.meal_chart.clear()
+            
         except Exception as e:
             print(f"加载饮食记录出错: {str(e)}")
             import traceback
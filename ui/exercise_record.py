@@ -12,6 +12,8 @@ from data.exercise_data import (load_exercise_data, get_exercise_categories,
                               calculate_calories)
 import datetime
 
+from utils.profile_service import get_profile_service
+
 class ExerciseRecordDialog(QDialog):
     """运动记录对话框"""
     
@@ -41,20 +43,8 @@ class ExerciseRecordDialog(QDialog):
     def get_user_weight(self):
         """获取用户体重，用于卡路里计算"""
         try:
-            # 获取用户资料
-            user_profile = self.db_manager.get_user_profile(self.user_id)
-            print(f"获取用户体重: user_profile = {user_profile}")
-            
-            # 安全地获取体重值
-            if user_profile and isinstance(user_profile, dict) and "weight" in user_profile:
-                weight = user_profile.get("weight")
-                if weight and isinstance(weight, (int, float)):
-                    print(f"用户体重: {weight} kg")
-                    return weight
-            
-            # 如果无法获取体重，使用默认值
-            print("未能获取用户体重，使用默认值: 60 kg")
-            return 60  # 默认体重60kg
+            # 从会话内缓存的资料读取，未填写时为默认值60kg
+            return get_profile_service(self.db_manager).get_weight(self.user_id)
         except Exception as e:
             print(f"获取用户体重时出错: {str(e)}")
             return 60  # 发生异常时返回默认值
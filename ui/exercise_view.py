@@ -6,12 +6,8 @@ from PyQt5.QtCore import Qt, QDate, QTime, QDateTime, pyqtSignal
 from PyQt5.QtGui import QIcon, QFont, QColor
 
 from ui.exercise_record import ExerciseRecordDialog
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.dates as mdates
-from matplotlib.figure import Figure
-import numpy as np
-import pandas as pd
+from ui.chart_widget import ChartWidget
+from utils.recurrence import minutes_of_day
 from datetime import datetime, timedelta
 import logging
 import os
@@ -126,9 +122,14 @@ class ExerciseView(QWidget):
         chart_layout = QVBoxLayout(self.chart_widget)
         
         # 创建图表
-        self.figure = Figure(figsize=(5, 3), dpi=100)
-        self.canvas = FigureCanvas(self.figure)
-        chart_layout.addWidget(self.canvas)
+        self.chart = ChartWidget("bar")
+        self.chart.set_title("今日运动消耗卡路里分布", "卡路里 (kcal)")
+        self.chart.empty_text = "没有运动记录"
+        self.chart.set_formatters(
+            x_formatter=lambda value: f"{int(value) % 24:02d}:{int(round(value % 1 * 60)) % 60:02d}",
+            y_formatter=lambda value: f"{value:.0f}"
+        )
+        chart_layout.addWidget(self.chart)
         
         main_layout.addWidget(self.chart_widget)
         
@@ -215,47 +216,24 @@ class ExerciseView(QWidget):
         # 计算运动次数
         self.count_value.setText(f"{len(self.exercise_records)}")
     
+    @staticmethod
+    def record_hour(time_value):
+        """把记录时间字符串转换为当天的小时数（浮点）"""
+        minutes = minutes_of_day(time_value)
+        return minutes / 60 if minutes is not None else 0.0
+    
     def update_chart(self):
         """更新图表"""
-        self.figure.clear()
-        
-        # 如果没有记录，显示提示
-        if not self.exercise_records:
-            ax = self.figure.add_subplot(111)
-            ax.text(0.5, 0.5, "没有运动记录", horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
-            ax.axis('off')
-            self.canvas.draw()
-            return
-            
-        # 准备数据
-        times = []
-        calories = []
-        exercise_names = []
-        
-        for record in self.exercise_records:
-            time_str = record[8].split()[1] if ' ' in record[8] else record[8]
-            times.append(datetime.strptime(time_str[:5], "%H:%M"))
-            calories.append(record[6])
-            exercise_names.append(record[2])
-        
-        # 绘制卡路里消耗图表
-        ax = self.figure.add_subplot(111)
-        bars = ax.bar(times, calories, width=0.02, alpha=0.7)
-        
-        # 设置样式
-        ax.set_title("今日运动消耗卡路里分布")
-        ax.set_xlabel("时间")
-        ax.set_ylabel("卡路里 (kcal)")
-        ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
-        
-        # 添加标签
-        for i, (bar, name) in enumerate(zip(bars, exercise_names)):
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 5,
-                    name, ha='center', va='bottom', rotation=45, fontsize=8)
-        
-        self.figure.tight_layout()
-        self.canvas.draw()
+        hours = [self.record_hour(record[8]) for record in self.exercise_records]
+        calories = [record[6] or 0 for record in self.exercise_records]
+        names = [record[2] for record in self.exercise_records]
+        
+        self.chart.set_data(
+            hours,
+            [{"name": "消耗卡路里", "values": calories, "color": "#3498DB"}],
+            bar_labels=names,
+            bar_width=0.5
+        )
     
     def add_exercise_record(self):
         """添加运动记录"""
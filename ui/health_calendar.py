@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+健康日历控件
+在日历格子上标注每天的热量摄入达标情况、运动时长和睡眠记录
+"""
+
+import datetime
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import QCalendarWidget
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QColor, QPainter
+
+from utils.health_analyzer import HealthAnalyzer
+from utils.profile_service import get_profile_service
+
+
+class HealthCalendarWidget(QCalendarWidget):
+    """
+    带数据标注的日历
+
+    每个可见月份只执行一次按天聚合的查询，结果按月份缓存；
+    格子绘制时只查字典，不访问数据库
+    """
+
+    # 缓存的月份数量上限
+    CACHE_SIZE = 12
+
+    # 摄入热量占目标的比例区间对应的颜色
+    INTAKE_LOW = QColor(52, 152, 219)     # 低于目标80%
+    INTAKE_OK = QColor(46, 204, 113)      # 目标的80%~110%
+    INTAKE_HIGH = QColor(231, 76, 60)     # 超过目标110%
+    EXERCISE_COLOR = QColor(39, 174, 96)
+    SLEEP_COLOR = QColor(142, 68, 173)
+
+    def __init__(self, user_id, db_manager, parent=None):
+        super().__init__(parent)
+        self.user_id = user_id
+        self.db_manager = db_manager
+
+        # (年, 月) -> {日期字符串: (摄入热量, 运动分钟, 睡眠分钟)}
+        self.month_cache = OrderedDict()
+        self.calorie_target = None
+
+        self.currentPageChanged.connect(self.load_month)
+        # 控件销毁时注销监听器
+        callback = self.on_data_changed
+        db_manager.add_change_listener(callback)
+        self.destroyed.connect(lambda *args: db_manager.remove_change_listener(callback))
+
+        self.load_month(self.yearShown(), self.monthShown())
+
+    def get_calorie_target(self):
+        """每日推荐摄入热量，按用户资料计算后缓存"""
+        if self.calorie_target is None:
+            profile = get_profile_service(self.db_manager).get_analysis_profile(self.user_id)
+            self.calorie_target = HealthAnalyzer(profile).get_recommended_calories()
+        return self.calorie_target
+
+    def load_month(self, year, month):
+        """加载指定月份的标注数据，已缓存的月份不再查询"""
+        key = (year, month)
+        if key in self.month_cache:
+            self.month_cache.move_to_end(key)
+            return
+
+        # 日历会同时显示上月末和下月初的几天，查询范围一并覆盖
+        first = datetime.date(year, month, 1)
+        start = first - datetime.timedelta(days=7)
+        end = first + datetime.timedelta(days=31 + 14)
+
+        days = {}
+        rows = self.db_manager.get_daily_trend_summary(
+            self.user_id, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+        )
+        for row in rows:
+            days[row[0]] = (row[1], row[3], row[4])
+
+        self.month_cache[key] = days
+        if len(self.month_cache) > self.CACHE_SIZE:
+            self.month_cache.popitem(last=False)
+        self.updateCells()
+
+    def invalidate(self, date=None):
+        """
+        让缓存失效并重新加载当前月份
+
+        参数:
+            date: 发生变化的日期(YYYY-MM-DD)，为None时清空全部缓存
+        """
+        if date is None:
+            self.month_cache.clear()
+        else:
+            # 相邻月份的缓存也包含这一天
+            changed = datetime.datetime.strptime(date, '%Y-%m-%d').date()
+            for key in list(self.month_cache):
+                first = datetime.date(key[0], key[1], 1)
+                if first - datetime.timedelta(days=7) <= changed <= first + datetime.timedelta(days=45):
+                    del self.month_cache[key]
+        self.load_month(self.yearShown(), self.monthShown())
+
+    def on_data_changed(self, kind, user_id, date):
+        """数据库记录变化的回调"""
+        if user_id is not None and user_id != self.user_id:
+            return
+        if kind == "profile":
+            self.calorie_target = None
+            self.updateCells()
+        elif kind in ("diet", "exercise", "sleep"):
+            self.invalidate(date)
+
+    def paintCell(self, painter, rect, date):
+        """在默认格子上叠加摄入热量条、运动和睡眠标记"""
+        super().paintCell(painter, rect, date)
+
+        days = self.month_cache.get((self.yearShown(), self.monthShown()))
+        if not days:
+            return
+        info = days.get(date.toString("yyyy-MM-dd"))
+        if not info:
+            return
+        intake, exercise_minutes, sleep_minutes = info
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+
+        # 底部横条：长度表示摄入热量占目标的比例，颜色表示是否达标
+        if intake:
+            ratio = intake / max(self.get_calorie_target(), 1)
+            if ratio < 0.8:
+                color = QColor(self.INTAKE_LOW)
+            elif ratio <= 1.1:
+                color = QColor(self.INTAKE_OK)
+            else:
+                color = QColor(self.INTAKE_HIGH)
+            color.setAlpha(200)
+            painter.setBrush(color)
+            bar_width = (rect.width() - 4) * min(ratio, 1.0)
+            painter.drawRect(QRectF(rect.left() + 2, rect.bottom() - 4, bar_width, 3))
+
+        # 右上角圆点：运动（颜色深浅表示时长，60分钟为满）和睡眠
+        dot = 5
+        x = rect.right() - dot - 2
+        y = rect.top() + 2
+        if exercise_minutes:
+            color = QColor(self.EXERCISE_COLOR)
+            color.setAlpha(int(80 + 175 * min(exercise_minutes / 60, 1.0)))
+            painter.setBrush(color)
+            painter.drawEllipse(QRectF(x, y, dot, dot))
+            x -= dot + 2
+        if sleep_minutes:
+            painter.setBrush(self.SLEEP_COLOR)
+            painter.drawEllipse(QRectF(x, y, dot, dot))
+
+        painter.restore()
@@ -7,15 +7,53 @@ from PyQt5.QtGui import QFont, QPixmap
 from database.db_manager import DatabaseManager
 from ui.main_window import MainWindow
 from ui.profile import ProfileWindow
-from utils.verification import validate_password_strength, generate_captcha_text, generate_captcha_image
+from utils.verification import validate_password_strength, generate_salt, hash_password
+from utils.captcha_pool import get_captcha_pool
+from utils.password_hasher import PasswordTask, calibrate_cost, DEFAULT_SCHEME
+from utils.profile_service import get_profile_service
 import time
 
 class LoginWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.db_manager = DatabaseManager()
+        # 正在后台执行的密码计算
+        self.password_task = None
+        self.calibration_task = None
         self.init_ui()
         
+        # 窗口显示后在后台校准本机的密码哈希成本（只在首次运行时执行）
+        QTimer.singleShot(0, self.calibrate_password_cost)
+        
+    def calibrate_password_cost(self):
+        """首次运行时测量本机速度，确定密码哈希的成本参数"""
+        if self.db_manager.is_password_cost_calibrated():
+            return
+        self.calibration_task = PasswordTask(calibrate_cost, DEFAULT_SCHEME, parent=self)
+        self.calibration_task.done.connect(self.on_cost_calibrated)
+        self.calibration_task.start()
+        
+    def on_cost_calibrated(self, cost):
+        """保存校准得到的成本，之后登录的旧哈希会自动升级"""
+        if isinstance(cost, Exception):
+            return
+        self.db_manager.set_setting("password_scheme", DEFAULT_SCHEME)
+        self.db_manager.set_setting("password_cost", cost)
+        print(f"密码哈希成本已校准: {DEFAULT_SCHEME} {cost}")
+        
+    def run_password_task(self, callback, func, *args):
+        """在后台线程执行密码计算，完成后在界面线程调用 callback(result)"""
+        task = PasswordTask(func, *args, parent=self)
+        task.done.connect(callback)
+        task.finished.connect(task.deleteLater)
+        self.password_task = task
+        task.start()
+        
+    def set_busy(self, button, busy, text):
+        """后台计算期间禁用按钮，防止重复提交"""
+        button.setEnabled(not busy)
+        button.setText(text)
+        
     def init_ui(self):
         """初始化用户界面"""
         self.setWindowTitle('长期舒适 - 登录/注册')
@@ -230,12 +268,12 @@ class LoginWindow(QWidget):
         self.register_tab.setLayout(layout)
         
         # 初始生成验证码
-        self.refresh_captcha(None)
         self.captcha_text = ""  # 存储当前验证码文本
+        self.refresh_captcha(None)
     
     def refresh_captcha(self, event):
         """刷新验证码"""
-        pixmap, self.captcha_text = generate_captcha_image(generate_captcha_text())
+        pixmap, self.captcha_text = get_captcha_pool().pop()
         self.captcha_image.setPixmap(pixmap)
     
     def register(self):
@@ -267,8 +305,26 @@ class LoginWindow(QWidget):
             self.refresh_captcha(None)  # 刷新验证码
             return
         
+        if self.db_manager.username_exists(username):
+            QMessageBox.warning(self, "注册失败", "用户名已存在!")
+            return
+        
+        # 在后台线程计算密码哈希
+        self.set_busy(self.register_button, True, "正在注册...")
+        self.run_password_task(
+            lambda result: self.on_register_hashed(result, username, password),
+            hash_password, password, generate_salt(), self.db_manager.get_password_hasher()
+        )
+    
+    def on_register_hashed(self, result, username, password):
+        """密码哈希计算完成后添加用户"""
+        self.set_busy(self.register_button, False, "注册")
+        if isinstance(result, Exception):
+            QMessageBox.critical(self, "错误", f"注册过程中发生错误: {str(result)}")
+            return
+        
         # 添加用户
-        user_id = self.db_manager.add_user(username, password)
+        user_id = self.db_manager.add_user(username, password, hashed=result)
         if user_id:
             QMessageBox.information(self, "注册成功", "注册成功，请登录!")
             self.tab_widget.setCurrentIndex(0)  # 切换到登录页
@@ -282,7 +338,7 @@ class LoginWindow(QWidget):
             
     def refresh_login_captcha(self, event):
         """刷新登录验证码"""
-        pixmap, self.login_captcha_text = generate_captcha_image(generate_captcha_text())
+        pixmap, self.login_captcha_text = get_captcha_pool().pop()
         self.login_captcha_image.setPixmap(pixmap)
     
     def login(self):
@@ -319,13 +375,44 @@ class LoginWindow(QWidget):
                     QMessageBox.critical(self, "错误", f"无法连接数据库: {str(e)}")
                     return
             
-            user_id = self.db_manager.verify_user(username, password)
+            credentials = self.db_manager.get_user_credentials(username)
+            hasher = self.db_manager.get_password_hasher()
+            if credentials is None:
+                # 用户不存在时同样计算一次哈希，避免通过响应时间判断用户名是否存在
+                stored_hash, salt = f"{hasher.scheme}${hasher.cost}$", generate_salt()
+            else:
+                stored_hash, salt = credentials[1], credentials[2]
+            new_salt = generate_salt()
+            
+            # 在后台线程验证密码，需要升级时一并计算新哈希
+            self.set_busy(self.login_button, True, "正在验证...")
+            self.run_password_task(
+                lambda result: self.on_password_checked(result, username, credentials, new_salt),
+                hasher.check, password, stored_hash, salt, new_salt
+            )
+        except Exception as e:
+            print(f"登录过程发生异常: {str(e)}")
+            QMessageBox.critical(self, "错误", f"登录过程中发生错误: {str(e)}")
+            self.refresh_login_captcha(None)
+    
+    def on_password_checked(self, result, username, credentials, new_salt):
+        """密码验证完成后继续登录流程"""
+        self.set_busy(self.login_button, False, "登录")
+        try:
+            if isinstance(result, Exception):
+                raise result
+            matched, new_hash = result
+            user_id = credentials[0] if matched and credentials else None
+            if user_id and new_hash:
+                # 旧格式、成本较低的哈希或后台迁移尚未处理的明文密码，升级到当前设置
+                self.db_manager.update_password_hash(user_id, new_hash, new_salt, only_plaintext=not credentials[2])
+            
             if user_id:
                 print(f"用户登录成功: {username}, ID: {user_id}")
                 
                 # 检查用户资料是否完整
                 try:
-                    user_data = self.db_manager.get_user_profile(user_id)
+                    user_data = get_profile_service(self.db_manager).get_profile(user_id)
                     print(f"获取到用户资料: {user_data}")
                     
                     # 防止None值导致的错误
@@ -373,7 +460,7 @@ class LoginWindow(QWidget):
         from ui.main_window import MainWindow
         
         # 检查用户资料是否完整
-        profile_complete = self.db_manager.is_profile_complete(user_id)
+        profile_complete = get_profile_service(self.db_manager).is_profile_complete(user_id)
         print(f"用户资料是否完整: {profile_complete}")
         
         if not profile_complete:
@@ -6,9 +6,14 @@ from PyQt5.QtCore import Qt, QDate, pyqtSignal, QTimer, QUrl
 from PyQt5.QtGui import QIcon, QFont, QColor, QPalette, QCursor, QDesktopServices
 from ui.diet_view import DietView
 from ui.exercise_view import ExerciseView
+from ui.trend_view import TrendView
+from ui.health_calendar import HealthCalendarWidget
 from ui.custom_widgets import HealthyLifeComboBox
-from utils.health_analyzer import HealthAnalyzer
-from utils.report_generator import WeeklyReportGenerator
+from utils.profile_service import get_profile_service
+from utils.analysis_cache import get_analysis_cache
+from utils.report_charts import ChartRenderTask, CHARTS
+from utils.report_periods import PERIODS, current_range, trend_start, analyze_period
+from utils.report_text import build_summary_text, build_detailed_text
 from utils.style_helper import refresh_style
 import os
 
@@ -95,6 +100,14 @@ class SleepView(BaseView):
         
         self.content_layout.addWidget(self.sleep_table)
         
+        # 最近7天睡眠时长图
+        from ui.chart_widget import ChartWidget
+        self.sleep_chart = ChartWidget("bar")
+        self.sleep_chart.set_title("最近7天睡眠时长", "小时")
+        self.sleep_chart.empty_text = "最近7天暂无睡眠记录"
+        self.sleep_chart.set_formatters(y_formatter=lambda value: f"{value:.1f}")
+        self.content_layout.addWidget(self.sleep_chart)
+        
         # 添加一个添加按钮
         self.add_button = QPushButton("添加睡眠记录")
         self.add_button.setObjectName("primaryButton")
@@ -142,6 +155,9 @@ class SleepView(BaseView):
             # 清空表格
             self.sleep_table.setRowCount(0)
             
+            # 更新最近7天睡眠图
+            self.load_sleep_chart(date_str)
+            
             # 如果没有记录
             if not records or len(records) == 0:
                 self.title_label.setText(f"睡眠记录 ({date_str}) - 暂无数据")
@@ -189,6 +205,38 @@ class SleepView(BaseView):
             print(f"加载睡眠记录时出错: {str(e)}")
             import traceback
             traceback.print_exc()
+    
+    def load_sleep_chart(self, date_str):
+        """加载截至指定日期的最近7天睡眠时长"""
+        try:
+            import datetime
+            end = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+            start = end - datetime.timedelta(days=6)
+            rows = self.db_manager.get_daily_trend_summary(
+                self.user_id, start.strftime("%Y-%m-%d"), date_str
+            )
+            
+            # 按天对齐，没有记录的日期为0
+            hours = [0.0] * 7
+            for row in rows:
+                index = (datetime.datetime.strptime(row[0], "%Y-%m-%d").date() - start).days
+                if 0 <= index < 7 and row[4]:
+                    hours[index] = row[4] / 60
+            
+            if not any(hours):
+                self.sleep_chart.clear()
+                return
+            
+            self.sleep_chart.set_formatters(
+                x_formatter=lambda value: (start + datetime.timedelta(days=int(round(value)))).strftime("%m-%d")
+            )
+            self.sleep_chart.set_data(
+                range(7),
+                [{"name": "睡眠时长", "values": hours, "color": "#2980B9"}],
+                bar_width=0.6
+            )
+        except Exception as e:
+            print(f"加载睡眠图表时出错: {str(e)}")
             
     def add_sleep_record(self):
         """添加睡眠记录"""
@@ -273,12 +321,37 @@ class PlanView(BaseView):
         # 创建一个布局来显示提醒列表
         layout = self.layout()
         
-        # 添加一个标签用于显示提醒列表
-        self.reminder_label = QLabel("暂无提醒计划")
-        self.reminder_label.setWordWrap(True)
-        self.reminder_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
-        self.reminder_label.setObjectName("reminderLabel")
-        layout.addWidget(self.reminder_label)
+        # 提醒列表（按需分页加载）
+        from PyQt5.QtWidgets import QTableView, QHeaderView
+        from ui.reminder import ReminderTableModel
+        self.reminder_model = ReminderTableModel(self.db_manager, self.user_id, self)
+        self.reminder_table = QTableView()
+        self.reminder_table.setObjectName("reminderTable")
+        self.reminder_table.setModel(self.reminder_model)
+        self.reminder_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.reminder_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.reminder_table.verticalHeader().setVisible(False)
+        self.reminder_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.reminder_table.setSelectionBehavior(QTableView.SelectRows)
+        # 只显示当天的提醒，隐藏ID和日期列
+        self.reminder_table.hideColumn(0)
+        self.reminder_table.hideColumn(2)
+        layout.addWidget(self.reminder_table)
+        
+        # 当天生效的重复提醒，右键可编辑或删除规则
+        from PyQt5.QtWidgets import QListWidget
+        self.rule_list = QListWidget()
+        self.rule_list.setObjectName("ruleList")
+        self.rule_list.setMaximumHeight(120)
+        self.rule_list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.rule_list.customContextMenuRequested.connect(self.show_rule_menu)
+        layout.addWidget(self.rule_list)
+        
+        # 提醒在后台写入或在其他窗口修改后自动刷新，控件销毁时注销监听器
+        callback = self.on_data_changed
+        db_manager = self.db_manager
+        db_manager.add_change_listener(callback)
+        self.destroyed.connect(lambda *args: db_manager.remove_change_listener(callback))
         
         # 替换原有的默认内容标签
         layout.removeWidget(self.content_label)
@@ -308,37 +381,67 @@ class PlanView(BaseView):
             if not hasattr(self, 'current_date'):
                 self.current_date = QDate.currentDate().toString('yyyy-MM-dd')
             
-            # 从数据库加载提醒
-            reminders = self.db_manager.get_reminders_by_user_date(self.user_id, self.current_date)
-            
-            if not reminders or len(reminders) == 0:
-                self.reminder_label.setText(f"日期: {self.current_date}\n\n暂无提醒计划")
-                return
-            
-            # 构建提醒文本
-            reminder_text = f"<h3>日期: {self.current_date}</h3>"
-            reminder_text += "<ul>"
-            
-            for reminder in reminders:
-                # 获取提醒数据
-                reminder_id = reminder[0]
-                reminder_time = reminder[3]  # 时间
-                reminder_type = reminder[4]  # 类型
-                reminder_content = reminder[5]  # 内容
-                is_completed = reminder[6]  # 是否完成
-                
-                # 根据完成状态设置样式
-                status = "✓" if is_completed else "○"
-                style = "text-decoration: line-through; color: gray;" if is_completed else ""
-                
-                reminder_text += f'<li style="{style}"><b>{reminder_time}</b> - {reminder_type}: {reminder_content} {status}</li>'
+            # 从数据库加载第一页提醒，其余在滚动时加载
+            self.reminder_model.set_query(date=self.current_date)
+            self.load_rules()
             
-            reminder_text += "</ul>"
-            self.reminder_label.setText(reminder_text)
+            if self.reminder_model.rowCount() == 0 and self.rule_list.count() == 0:
+                self.title_label.setText(f"计划安排 - {self.current_date} - 暂无提醒计划")
+            else:
+                self.title_label.setText(f"计划安排 - {self.current_date}")
             
         except Exception as e:
             print(f"加载提醒数据出错: {str(e)}")
-            self.reminder_label.setText(f"日期: {self.current_date}\n\n加载提醒数据出错")
+            self.title_label.setText(f"计划安排 - {self.current_date} - 加载提醒数据出错")
+    
+    def on_data_changed(self, kind, user_id, key):
+        """数据库提醒变化的回调，视图可见时重新加载"""
+        if kind not in ("reminder", "reminder_rule") or user_id not in (None, self.user_id):
+            return
+        if self.isVisible() and hasattr(self, 'current_date'):
+            self.load_reminders()
+    
+    def load_rules(self):
+        """列出当天会触发的重复提醒"""
+        from PyQt5.QtWidgets import QListWidgetItem
+        from utils.recurrence import RecurrenceRule
+        
+        self.rule_list.clear()
+        day = datetime.datetime.strptime(self.current_date, '%Y-%m-%d')
+        for row in self.db_manager.get_reminder_rules(self.user_id):
+            try:
+                rule = RecurrenceRule.from_row(row)
+            except ValueError:
+                continue
+            if next(rule.occurrences(day, day + datetime.timedelta(days=1)), None) is None:
+                continue
+            item = QListWidgetItem(f"🔁 {rule.describe()} - {row[2]}: {row[3]}")
+            item.setData(Qt.UserRole, row[0])
+            self.rule_list.addItem(item)
+        self.rule_list.setVisible(self.rule_list.count() > 0)
+    
+    def show_rule_menu(self, position):
+        """重复提醒的右键菜单"""
+        item = self.rule_list.itemAt(position)
+        if item is None:
+            return
+        menu = QMenu(self)
+        edit_action = menu.addAction("编辑重复提醒")
+        delete_action = menu.addAction("删除重复提醒")
+        action = menu.exec_(self.rule_list.mapToGlobal(position))
+        if action == edit_action:
+            row = self.db_manager.get_reminder_rule_by_id(item.data(Qt.UserRole))
+            if row is not None:
+                from ui.reminder import ReminderDialog
+                dialog = ReminderDialog(self.db_manager, self.user_id, self, rule_row=row)
+                dialog.reminder_updated.connect(self.load_reminders)
+                dialog.exec_()
+        elif action == delete_action:
+            reply = QMessageBox.question(self, "确认删除", "确定要删除这个重复提醒吗？以后将不再提醒。",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply == QMessageBox.Yes:
+                self.db_manager.delete_reminder_rule(item.data(Qt.UserRole))
+                self.load_reminders()
     
     def load_data(self):
         """加载数据"""
@@ -354,11 +457,16 @@ class MainWindow(QMainWindow):
         self.db_manager = db_manager
         print(f"正在创建主窗口实例...")
         
-        # 初始化提醒管理器
-        from utils.reminder import ReminderManager, show_reminder
-        self.reminder_manager = ReminderManager(db_manager, user_id, self)
-        self.reminder_manager.reminder_triggered.connect(self.on_reminder_triggered)
-        print("提醒管理器已连接到主窗口")
+        # 近7/30/90天的滚动统计，记录变化时增量更新
+        from utils.rolling_stats import get_rolling_stats_store
+        self.rolling_stats = get_rolling_stats_store(db_manager)
+        
+        # 注册到进程内共享的提醒服务
+        from utils.reminder import get_reminder_service
+        self.reminder_dialog = None
+        self.reminder_service = get_reminder_service(db_manager)
+        self.reminder_service.register(user_id, self.on_reminder_triggered)
+        print("提醒服务已连接到主窗口")
         
         self.setWindowTitle(f"长期舒适 - {username}")
         self.resize(1280, 800)
@@ -399,7 +507,7 @@ class MainWindow(QMainWindow):
         left_layout.addWidget(welcome_label)
         
         # 日历控件
-        self.calendar = QCalendarWidget()
+        self.calendar = HealthCalendarWidget(self.user_id, self.db_manager)
         self.calendar.setGridVisible(True)
         self.calendar.setVerticalHeaderFormat(QCalendarWidget.NoVerticalHeader)
         self.calendar.setHorizontalHeaderFormat(QCalendarWidget.SingleLetterDayNames)
@@ -455,7 +563,7 @@ class MainWindow(QMainWindow):
         # 使用自定义下拉框组件
         self.mode_combo = HealthyLifeComboBox()
         self.mode_combo.setObjectName("modeCombo")
-        self.mode_combo.addItems(["饮食", "运动", "睡眠", "计划"])
+        self.mode_combo.addItems(["饮食", "运动", "睡眠", "计划", "趋势"])
         self.mode_combo.currentIndexChanged.connect(self.mode_changed)
         self.mode_combo.setMinimumHeight(30)
         
@@ -473,12 +581,14 @@ class MainWindow(QMainWindow):
         self.exercise_view = ExerciseView(self.user_id, self.db_manager)
         self.sleep_view = SleepView(self.user_id, self.db_manager)
         self.plan_view = PlanView(self.user_id, self.db_manager)
+        self.trend_view = TrendView(self.user_id, self.db_manager)
         
         # 添加视图到堆叠部件
         self.content_stack.addWidget(self.diet_view)
         self.content_stack.addWidget(self.exercise_view)
         self.content_stack.addWidget(self.sleep_view)
         self.content_stack.addWidget(self.plan_view)
+        self.content_stack.addWidget(self.trend_view)
         
         right_layout.addWidget(self.content_stack)
         
@@ -505,6 +615,18 @@ class MainWindow(QMainWindow):
         weekly_report_action.triggered.connect(self.show_weekly_report)
         toolbar.addAction(weekly_report_action)
         
+        # 月报、季报和年报
+        period_report_menu = QMenu(self)
+        for kind, (report_name, _, _, _) in PERIODS.items():
+            if kind == "weekly":
+                continue
+            action = period_report_menu.addAction(f"{report_name}摘要")
+            action.triggered.connect(lambda checked=False, kind=kind: self.show_period_report(kind))
+        period_report_action = QAction("更多报告", self)
+        period_report_action.setMenu(period_report_menu)
+        period_report_action.triggered.connect(lambda: self.show_period_report("monthly"))
+        toolbar.addAction(period_report_action)
+        
         # 添加查看提醒按钮到工具栏
         view_reminders_action = QAction("查看提醒", self)
         view_reminders_action.triggered.connect(self.view_reminders)
@@ -704,71 +826,53 @@ class MainWindow(QMainWindow):
         
     def show_weekly_report(self):
         """显示周报告，包含运动、饮食、睡眠分析及健康建议，并支持导出为PDF"""
-        # 获取当前周的起止日期
-        today = datetime.datetime.now()
-        # 计算本周的第一天（周一）
-        week_start = today - datetime.timedelta(days=today.weekday())
-        week_start = datetime.datetime(week_start.year, week_start.month, week_start.day)
-        # 计算本周的最后一天（周日）
-        week_end = week_start + datetime.timedelta(days=6)
+        self.show_period_report("weekly")
+        
+    def show_period_report(self, kind):
+        """显示当前周期（本周、本月、本季度或本年）的报告，并支持导出为PDF
+        
+        参数:
+            kind: 报告类型，见 utils.report_periods.PERIODS
+        """
+        # 当前周期的起止日期
+        period_start, period_end = current_range(kind)
+        report_name = PERIODS[kind][0]
         
         # 获取用户信息
         try:
-            user_info = self.db_manager.get_user_profile_for_analysis(self.user_id)
+            user_info = get_profile_service(self.db_manager).get_analysis_profile(self.user_id)
         except Exception as e:
             user_info = {}
             print(f"获取用户信息失败: {e}")
         
-        # 获取本周的运动、饮食、睡眠数据
+        def analyze():
+            # 一次查询每天的运动、饮食、睡眠数据并分析，另一次查询按周或按月的环比
+            return analyze_period(self.db_manager, self.user_id, kind, period_start, period_end, user_info)
+        
+        # 数据和资料未变化时直接使用缓存的分析结果；缓存范围包含环比用到的上一时段
         try:
-            # 运动数据
-            exercise_summary = self.db_manager.get_weekly_exercise_summary(
-                self.user_id,
-                week_start.strftime('%Y-%m-%d'), 
-                week_end.strftime('%Y-%m-%d')
-            )
-            
-            # 饮食数据
-            diet_summary = self.db_manager.get_weekly_diet_summary(
-                self.user_id,
-                week_start.strftime('%Y-%m-%d'), 
-                week_end.strftime('%Y-%m-%d')
-            )
-            
-            # 睡眠数据
-            sleep_summary = self.db_manager.get_weekly_sleep_summary(
-                self.user_id,
-                week_start.strftime('%Y-%m-%d'), 
-                week_end.strftime('%Y-%m-%d')
+            analysis_results = get_analysis_cache(self.db_manager).get_or_compute(
+                self.user_id, trend_start(kind, period_start).isoformat(), period_end.isoformat(), analyze, kind=kind
             )
         except Exception as e:
-            QMessageBox.warning(self, "数据获取错误", f"获取周数据失败: {e}")
+            QMessageBox.warning(self, "数据获取错误", f"获取{report_name}数据失败: {e}")
             return
         
-        # 分析健康数据并生成建议
-        analyzer = HealthAnalyzer()
-        analysis_results = analyzer.analyze_weekly_data(
-            exercise_summary, 
-            diet_summary, 
-            sleep_summary, 
-            user_info
-        )
-        
-        # 创建周报摘要文本
-        summary_text = self._generate_weekly_summary_text(analysis_results, week_start, week_end)
-        detailed_text = self._generate_detailed_report_text(analysis_results)
+        # 创建报告摘要文本
+        summary_text = build_summary_text(analysis_results, period_start, period_end, kind)
+        detailed_text = build_detailed_text(analysis_results)
         
         # 创建自定义对话框，左右分栏显示摘要和详情
-        self._show_report_dialog(summary_text, detailed_text, analysis_results, user_info, week_start, week_end)
+        self._show_report_dialog(summary_text, detailed_text, analysis_results, user_info, period_start, period_end, kind)
 
-    def _show_report_dialog(self, summary_text, detailed_text, analysis_results, user_info, week_start, week_end):
+    def _show_report_dialog(self, summary_text, detailed_text, analysis_results, user_info, week_start, week_end, kind="weekly"):
         """显示优化的报告对话框"""
         from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QLabel, QScrollArea, QSplitter, QFrame
-        from PyQt5.QtGui import QFont, QColor, QPalette
+        from PyQt5.QtGui import QFont, QColor, QPalette, QPixmap
         
         # 创建对话框
         dialog = QDialog(self)
-        dialog.setWindowTitle("健康周报")
+        dialog.setWindowTitle(f"健康{PERIODS[kind][0]}")
         dialog.resize(1500, 1000)  # 设置更大的默认尺寸
         
         # 主布局
@@ -786,7 +890,7 @@ class MainWindow(QMainWindow):
         title_container_layout = QVBoxLayout(title_container)
         title_container_layout.setContentsMargins(0, 0, 0, 0)
         
-        title_label = QLabel(f"健康周报 ({week_start.strftime('%Y-%m-%d')} 至 {week_end.strftime('%Y-%m-%d')})")
+        title_label = QLabel(f"健康{PERIODS[kind][0]} ({week_start.strftime('%Y-%m-%d')} 至 {week_end.strftime('%Y-%m-%d')})")
         title_font = QFont("Arial", 18)
         title_font.setBold(True)
         title_label.setFont(title_font)
@@ -837,7 +941,38 @@ class MainWindow(QMainWindow):
             }
         """)
         left_layout.addWidget(summary_edit)
-        
+
+        # 每日趋势图表，在后台线程绘制，与PDF导出共用缓存的图像
+        chart_title = QLabel("每日趋势")
+        chart_title.setFont(QFont("Arial", 14, QFont.Bold))
+        chart_title.setStyleSheet("color: #27AE60; padding: 5px 0;")
+        left_layout.addWidget(chart_title)
+
+        chart_labels = []
+        for _ in CHARTS:
+            chart_label = QLabel("正在绘制图表...")
+            chart_label.setAlignment(Qt.AlignCenter)
+            chart_label.setMinimumHeight(150)
+            chart_label.setStyleSheet("color: #7F8C8D; background-color: #FFFFFF; border: 1px solid #E0E0E0;")
+            left_layout.addWidget(chart_label)
+            chart_labels.append(chart_label)
+
+        def on_charts_ready(images):
+            if not images:
+                chart_labels[0].setText(f"{PERIODS[kind][2]}暂无可绘制的数据")
+                for chart_label in chart_labels[1:]:
+                    chart_label.hide()
+                return
+            for chart_label, image_data in zip(chart_labels, images.values()):
+                pixmap = QPixmap()
+                pixmap.loadFromData(image_data, "PNG")
+                chart_label.setPixmap(pixmap.scaledToWidth(440, Qt.SmoothTransformation))
+
+        chart_task = ChartRenderTask(analysis_results, self)
+        chart_task.done.connect(on_charts_ready)
+        chart_task.finished.connect(chart_task.deleteLater)
+        chart_task.start()
+
         # 右侧详情部分
         right_widget = QWidget()
         right_layout = QVBoxLayout(right_widget)
@@ -900,7 +1035,29 @@ class MainWindow(QMainWindow):
                 background-color: #1C6EA4;
             }
         """)
-        export_btn.clicked.connect(lambda: self._export_weekly_report_pdf(analysis_results, user_info, week_start, week_end))
+        export_btn.clicked.connect(lambda: self._export_weekly_report_pdf(analysis_results, user_info, week_start, week_end, kind))
+        
+        # 导出HTML按钮，使用同一份分析结果，不需要后台任务
+        html_btn = QPushButton("导出HTML报告")
+        html_btn.setMinimumHeight(40)
+        html_btn.setMinimumWidth(150)
+        html_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #27AE60;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                font-size: 12pt;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #2ECC71;
+            }
+            QPushButton:pressed {
+                background-color: #1E8449;
+            }
+        """)
+        html_btn.clicked.connect(lambda: self._export_report_html(analysis_results, user_info, week_start, week_end, kind))
         
         # 关闭按钮
         close_btn = QPushButton("关闭")
@@ -925,6 +1082,7 @@ class MainWindow(QMainWindow):
         close_btn.clicked.connect(dialog.accept)
         
         button_layout.addWidget(export_btn)
+        button_layout.addWidget(html_btn)
         button_layout.addStretch()
         button_layout.addWidget(close_btn)
         
@@ -933,143 +1091,146 @@ class MainWindow(QMainWindow):
         # 显示对话框
         dialog.exec_()
 
-    def _generate_weekly_summary_text(self, analysis_results, week_start, week_end):
-        """生成周报摘要文本"""
-        exercise_stats = analysis_results.get("exercise_stats", {})
-        diet_stats = analysis_results.get("diet_stats", {})
-        sleep_stats = analysis_results.get("sleep_stats", {})
-        
-        summary = f"健康周报 ({week_start.strftime('%Y-%m-%d')} 至 {week_end.strftime('%Y-%m-%d')})\n\n"
-        
-        # 运动摘要
-        summary += "【运动情况】\n"
-        summary += f"- 运动天数: {exercise_stats.get('exercise_days', 0)}/7天\n"
-        summary += f"- 总运动时间: {exercise_stats.get('total_duration', 0)}分钟\n"
-        summary += f"- 总消耗卡路里: {exercise_stats.get('total_calories', 0)}卡路里\n"
-        
-        # 饮食摘要
-        summary += "\n【饮食情况】\n"
-        summary += f"- 平均每日摄入热量: {diet_stats.get('avg_calories_per_day', 0):.1f}卡路里\n"
-        summary += f"- 蛋白质摄入比例: {diet_stats.get('protein_ratio', 0):.1f}%\n"
-        summary += f"- 脂肪摄入比例: {diet_stats.get('fat_ratio', 0):.1f}%\n"
-        summary += f"- 碳水摄入比例: {diet_stats.get('carbs_ratio', 0):.1f}%\n"
-        
-        # 睡眠摘要
-        summary += "\n【睡眠情况】\n"
-        summary += f"- 睡眠记录天数: {sleep_stats.get('sleep_days', 0)}/7天\n"
-        summary += f"- 平均睡眠时长: {sleep_stats.get('avg_duration_per_day', 0) / 60:.1f}小时\n"
-        summary += f"- 平均睡眠质量: {sleep_stats.get('avg_quality', 0):.1f}/5分\n"
-        
-        # 主要健康建议
-        summary += "\n【主要健康建议】\n"
-        if analysis_results.get("overall_advice"):
-            for i, advice in enumerate(analysis_results.get("overall_advice")[:3], 1):
-                summary += f"{i}. {advice}\n"
-        else:
-            summary += "暂无建议\n"
+    def _export_weekly_report_pdf(self, analysis_results, user_info, week_start, week_end, kind="weekly"):
+        """在后台导出报告为PDF文件，导出期间显示可取消的进度"""
+        from PyQt5.QtWidgets import QProgressDialog
+        from utils.report_jobs import get_report_job_service
         
-        summary += "\n点击\"显示详情\"查看完整分析，或导出PDF报告获取更详细的内容。"
-        return summary
+        try:
+            service = get_report_job_service()
+            if not hasattr(self, 'report_jobs'):
+                # 本窗口提交的任务ID -> 进度对话框（对话框已随父窗口关闭时为None）
+                self.report_jobs = {}
+                service.job_progress.connect(self._on_report_progress)
+                service.job_finished.connect(self._on_report_finished)
+                service.job_failed.connect(self._on_report_failed)
+                service.job_cancelled.connect(self._on_report_cancelled)
+            
+            report_name, title, period_name, _ = PERIODS[kind]
+            filename = f"健康{report_name}_{week_start.strftime('%Y%m%d')}-{week_end.strftime('%Y%m%d')}.pdf"
+            options = {"period": (week_start, week_end), "title": title, "period_name": period_name}
+            job_id = service.submit(analysis_results, user_info, filename, options=options)
+            if self.report_jobs.get(job_id) is not None:
+                # 同一份报告已在导出
+                self.report_jobs[job_id].show()
+                self.report_jobs[job_id].raise_()
+                return
+            
+            # 从模态的报告对话框中导出时，进度对话框属于报告对话框，否则无法点击取消
+            progress_dialog = QProgressDialog("等待导出...", "取消", 0, 100, QApplication.activeModalWidget() or self)
+            progress_dialog.setWindowTitle(f"导出 {filename}")
+            progress_dialog.setWindowModality(Qt.NonModal)
+            progress_dialog.setAutoClose(False)
+            progress_dialog.setAutoReset(False)
+            progress_dialog.setMinimumDuration(0)
+            progress_dialog.canceled.connect(lambda job_id=job_id: service.cancel(job_id))
+            progress_dialog.destroyed.connect(lambda *args, job_id=job_id: self._forget_report_progress(job_id))
+            progress_dialog.show()
+            self.report_jobs[job_id] = progress_dialog
+        except Exception as e:
+            QMessageBox.warning(self, "导出失败", f"准备导出PDF报告时出错: {e}")
 
-    def _generate_detailed_report_text(self, analysis_results):
-        """生成详细报告文本"""
-        detailed_text = "详细健康分析报告\n\n"
-        
-        # 运动建议
-        detailed_text += "【运动建议】\n"
-        if analysis_results.get("exercise_advice"):
-            for advice in analysis_results.get("exercise_advice"):
-                detailed_text += f"- {advice}\n"
-        else:
-            detailed_text += "暂无运动建议\n"
-        
-        # 饮食建议
-        detailed_text += "\n【饮食建议】\n"
-        if analysis_results.get("diet_advice"):
-            for advice in analysis_results.get("diet_advice"):
-                detailed_text += f"- {advice}\n"
-        else:
-            detailed_text += "暂无饮食建议\n"
+    def _export_report_html(self, analysis_results, user_info, week_start, week_end, kind="weekly"):
+        """导出报告为HTML文件，只需几毫秒，直接在界面线程中完成"""
+        from utils.html_report import HtmlReportGenerator
         
-        # 睡眠建议
-        detailed_text += "\n【睡眠建议】\n"
-        if analysis_results.get("sleep_advice"):
-            for advice in analysis_results.get("sleep_advice"):
-                detailed_text += f"- {advice}\n"
-        else:
-            detailed_text += "暂无睡眠建议\n"
+        report_name, title, period_name, _ = PERIODS[kind]
+        filename = f"健康{report_name}_{week_start.strftime('%Y%m%d')}-{week_end.strftime('%Y%m%d')}.html"
+        try:
+            generator = HtmlReportGenerator(analysis_results, user_info, period=(week_start, week_end),
+                                            title=title, period_name=period_name)
+            html_path = generator.generate_html(filename)
+        except Exception as e:
+            QMessageBox.warning(self, "导出失败", f"导出HTML报告失败: {e}")
+            return
+        self._ask_open_report(html_path)
+
+    def _ask_open_report(self, report_path):
+        """提示报告已导出，并询问是否打开文件"""
+        response = QMessageBox.information(
+            self, 
+            "导出成功", 
+            f"健康报告已成功导出到:\n{report_path}\n\n是否打开文件?", 
+            QMessageBox.Yes | QMessageBox.No
+        )
         
-        # 整体健康建议
-        detailed_text += "\n【整体健康建议】\n"
-        if analysis_results.get("overall_advice"):
-            for advice in analysis_results.get("overall_advice"):
-                detailed_text += f"- {advice}\n"
-        else:
-            detailed_text += "暂无整体健康建议\n"
+        # 如果用户选择打开文件
+        if response == QMessageBox.Yes:
+            # 使用系统默认程序打开报告文件
+            import platform
+            import subprocess
+            
+            if platform.system() == 'Windows':
+                os.startfile(report_path)
+            elif platform.system() == 'Darwin':  # macOS
+                subprocess.call(('open', report_path))
+            else:  # Linux
+                subprocess.call(('xdg-open', report_path))
+
+    def _forget_report_progress(self, job_id):
+        """进度对话框随报告对话框关闭后，任务继续在后台运行，完成时仍然提示"""
+        if job_id in getattr(self, 'report_jobs', {}):
+            self.report_jobs[job_id] = None
+
+    def _close_report_progress(self, job_id):
+        """关闭任务的进度对话框，不是本窗口提交的任务返回False"""
+        jobs = getattr(self, 'report_jobs', {})
+        if job_id not in jobs:
+            return False
+        progress_dialog = jobs.pop(job_id)
+        if progress_dialog is not None:
+            progress_dialog.canceled.disconnect()
+            progress_dialog.close()
+            progress_dialog.deleteLater()
+        return True
+
+    def _on_report_progress(self, job_id, percent, message):
+        """报告导出进度"""
+        progress_dialog = getattr(self, 'report_jobs', {}).get(job_id)
+        if progress_dialog is not None:
+            progress_dialog.setValue(percent)
+            progress_dialog.setLabelText(message)
+
+    def _on_report_cancelled(self, job_id):
+        """报告导出已取消"""
+        self._close_report_progress(job_id)
+
+    def _on_report_finished(self, job_id, pdf_path):
+        """报告导出完成"""
+        if not self._close_report_progress(job_id):
+            return
         
-        return detailed_text
+        # 显示成功消息
+        self._ask_open_report(pdf_path)
 
-    def _export_weekly_report_pdf(self, analysis_results, user_info, week_start, week_end):
-        """导出周报告为PDF文件"""
-        try:
-            # 创建报告生成器
-            report_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
-            report_generator = WeeklyReportGenerator(analysis_results, user_info, output_dir=report_dir)
-            
-            # 生成PDF文件
-            filename = f"健康周报_{week_start.strftime('%Y%m%d')}-{week_end.strftime('%Y%m%d')}.pdf"
+    def _on_report_failed(self, job_id, error_msg):
+        """报告导出失败"""
+        if not self._close_report_progress(job_id):
+            return
+        
+        detailed_msg = ""
+        
+        # 检查特定错误
+        if "SimSun" in error_msg:
+            detailed_msg = (
+                "系统中可能缺少所需的字体文件。尝试以下解决方案:\n\n"
+                "1. 安装pypinyin库以启用拼音模式:\n"
+                "   pip install pypinyin\n\n"
+                "2. 确保系统中安装了常见中文字体(如宋体、微软雅黑等)\n\n"
+                "3. 如果是Windows系统，重启应用后再试"
+            )
+        
+        # 显示详细的错误信息
+        error_dialog = QMessageBox(self)
+        error_dialog.setIcon(QMessageBox.Warning)
+        error_dialog.setWindowTitle("导出失败")
+        error_dialog.setText(f"导出PDF报告失败: {error_msg}")
+        
+        if detailed_msg:
+            error_dialog.setInformativeText(detailed_msg)
             
-            try:
-                pdf_path = report_generator.generate_pdf(filename)
-                
-                # 显示成功消息
-                response = QMessageBox.information(
-                    self, 
-                    "导出成功", 
-                    f"健康周报已成功导出到:\n{pdf_path}\n\n是否打开文件?", 
-                    QMessageBox.Yes | QMessageBox.No
-                )
-                
-                # 如果用户选择打开文件
-                if response == QMessageBox.Yes:
-                    # 使用系统默认程序打开PDF文件
-                    import platform
-                    import subprocess
-                    
-                    if platform.system() == 'Windows':
-                        os.startfile(pdf_path)
-                    elif platform.system() == 'Darwin':  # macOS
-                        subprocess.call(('open', pdf_path))
-                    else:  # Linux
-                        subprocess.call(('xdg-open', pdf_path))
-            except Exception as e:
-                error_msg = str(e)
-                detailed_msg = ""
-                
-                # 检查特定错误
-                if "SimSun" in error_msg:
-                    detailed_msg = (
-                        "系统中可能缺少所需的字体文件。尝试以下解决方案:\n\n"
-                        "1. 安装pypinyin库以启用拼音模式:\n"
-                        "   pip install pypinyin\n\n"
-                        "2. 确保系统中安装了常见中文字体(如宋体、微软雅黑等)\n\n"
-                        "3. 如果是Windows系统，重启应用后再试"
-                    )
-                
-                # 显示详细的错误信息
-                error_dialog = QMessageBox(self)
-                error_dialog.setIcon(QMessageBox.Warning)
-                error_dialog.setWindowTitle("导出失败")
-                error_dialog.setText(f"导出PDF报告失败: {error_msg}")
-                
-                if detailed_msg:
-                    error_dialog.setInformativeText(detailed_msg)
-                    
-                error_dialog.setStandardButtons(QMessageBox.Ok)
-                error_dialog.exec_()
-                
-        except Exception as e:
-            QMessageBox.warning(self, "导出失败", f"准备导出PDF报告时出错: {e}")
+        error_dialog.setStandardButtons(QMessageBox.Ok)
+        error_dialog.exec_()
 
     def view_reminders(self):
         """查看所有提醒"""
@@ -1091,73 +1252,45 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "错误", f"查看提醒时发生错误: {str(e)}")
 
     def update_weekly_summary(self):
-        """更新周摘要信息"""
+        """更新周摘要信息，直接读取增量维护的近7天统计"""
         try:
-            import datetime
-            
             print("更新每周运动摘要...")
-            
-            # 获取当前周的起止日期
-            today = datetime.date.today()
-            start_of_week = today - datetime.timedelta(days=today.weekday())
-            end_of_week = start_of_week + datetime.timedelta(days=6)
-            
-            # 格式化日期为字符串
-            start_date = start_of_week.strftime('%Y-%m-%d')
-            end_date = end_of_week.strftime('%Y-%m-%d')
-            
-            # 从数据库获取本周的运动数据
-            try:
-                weekly_exercise = self.db_manager.get_weekly_exercise_summary(
-                    self.user_id, start_date, end_date
-                )
-                print(f"获取到周运动数据: {len(weekly_exercise) if weekly_exercise else 0}条记录")
-            except Exception as e:
-                print(f"获取周运动数据时出错: {str(e)}")
-                weekly_exercise = []  # 确保不会因空值报错
+            summary = self.rolling_stats.get_summary(self.user_id, 7)
             
             # 生成摘要文本
-            summary_text = self.generate_summary_text(weekly_exercise)
+            summary_text = self.generate_summary_text(summary)
             
             # 更新UI显示
             # 注意：不再使用all_view显示摘要，可以考虑在状态栏或其他地方显示
             status_bar = self.statusBar()
-            status_bar.showMessage(f"本周摘要: {summary_text}")
+            status_bar.showMessage(f"近7天摘要: {summary_text}")
         except Exception as e:
             print(f"更新周摘要时出错: {str(e)}")
             import traceback
             traceback.print_exc()
 
-    def generate_summary_text(self, weekly_exercise):
-        """生成摘要文本"""
-        try:
-            if not weekly_exercise or len(weekly_exercise) == 0:
-                return "本周暂无运动记录"
-            
-            # 安全地尝试生成总结
-            total_days = len(set([ex[0] for ex in weekly_exercise if ex and len(ex) > 0]))
-            total_duration = sum([ex[1] for ex in weekly_exercise if ex and len(ex) > 1])
-            total_calories = sum([ex[2] for ex in weekly_exercise if ex and len(ex) > 2])
-            
-            return f"本周运动: {total_days}天, 总时长: {total_duration}分钟, 消耗: {total_calories}卡路里"
-        except Exception as e:
-            print(f"生成总结文本时出错: {str(e)}")
-            return "无法生成运动总结"
+    def generate_summary_text(self, summary):
+        """根据 RollingStatsStore.get_summary 的结果生成摘要文本"""
+        exercise_days = summary["days"]["exercise"]
+        if exercise_days == 0:
+            return "近7天暂无运动记录"
+        
+        total_duration = round(summary["totals"]["exercise"])
+        total_calories = round(summary["totals"]["burned"])
+        return f"近7天运动: {exercise_days}天, 总时长: {total_duration}分钟, 消耗: {total_calories}卡路里"
 
-    def on_reminder_triggered(self, title, content, reminder_id):
-        """处理提醒触发事件"""
+    def on_reminder_triggered(self, events):
+        """处理提醒触发事件，events为同一批到期的 [(标题, 内容, 提醒标识), ...]"""
         try:
             from utils.reminder import show_reminder
-            print(f"MainWindow接收到提醒触发事件: {title}")
+            print(f"MainWindow接收到{len(events)}条提醒")
             
-            # 调用弹出提醒对话框的函数
-            result = show_reminder(self, self.db_manager, title, content, reminder_id)
-            print(f"提醒对话框结果: {result}")
-            
-            # 刷新计划视图，显示更新后的提醒状态
-            if hasattr(self, 'plan_view') and hasattr(self.plan_view, 'load_reminders'):
-                self.plan_view.load_reminders()
-                print("已刷新计划视图")
+            # 已有提醒对话框打开时追加到其中，不再弹出新的窗口
+            if self.reminder_dialog is not None and self.reminder_dialog.isVisible():
+                self.reminder_dialog.add_events(events)
+            else:
+                self.reminder_dialog = show_reminder(self, self.reminder_service.writer, events)
+                self.reminder_dialog.destroyed.connect(self.on_reminder_dialog_closed)
             
         except Exception as e:
             print(f"处理提醒触发时出错: {str(e)}")
@@ -1167,11 +1300,20 @@ class MainWindow(QMainWindow):
             # 出错时尝试直接显示一个基本的消息框
             try:
                 from PyQt5.QtWidgets import QMessageBox
-                QMessageBox.information(self, title, content)
+                QMessageBox.information(self, events[0][0], "\n\n".join(event[1] for event in events))
                 print("使用基本消息框显示提醒")
             except Exception as e2:
                 print(f"显示基本消息框也失败: {str(e2)}")
 
+    def on_reminder_dialog_closed(self, *args):
+        """提醒对话框关闭后清除引用"""
+        self.reminder_dialog = None
+
+    def closeEvent(self, event):
+        """关闭窗口时注销提醒接收"""
+        self.reminder_service.unregister(self.user_id, self.on_reminder_triggered)
+        super().closeEvent(event)
+
     def refresh_styles(self):
         """刷新应用样式"""
         if QApplication.instance():
@@ -18,6 +18,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont
 
+from utils.profile_service import get_profile_service
+
 
 class ProfileWindow(QDialog):
     # 定义信号用于通知主窗口用户信息已更新
@@ -206,7 +208,7 @@ class ProfileWindow(QDialog):
     def load_user_data(self):
         """加载用户数据"""
         if not self.is_first_login:
-            user_data = self.db_manager.get_user_profile(self.user_id)
+            user_data = get_profile_service(self.db_manager).get_profile(self.user_id)
             if user_data:
                 # 设置性别
                 if user_data.get("gender") == "男":
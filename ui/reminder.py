@@ -7,29 +7,44 @@
 """
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-                           QComboBox, QDateEdit, QTimeEdit, QLineEdit, QTableWidget,
-                           QTableWidgetItem, QMessageBox, QHeaderView, QGridLayout,
-                           QDialog, QFrame, QTextEdit, QGroupBox, QFormLayout)
-from PyQt5.QtCore import Qt, QDate, QTime, pyqtSignal, QDateTime
-from PyQt5.QtGui import QIcon, QFont
+                           QComboBox, QDateEdit, QTimeEdit, QLineEdit, QTableView,
+                           QMessageBox, QHeaderView, QGridLayout, QCheckBox, QSpinBox,
+                           QDialog, QFrame, QTextEdit, QGroupBox, QFormLayout,
+                           QListWidget, QListWidgetItem)
+from PyQt5.QtCore import (Qt, QDate, QTime, pyqtSignal, QDateTime,
+                          QAbstractTableModel, QModelIndex)
+from PyQt5.QtGui import QIcon, QFont, QColor
 
 import datetime
 
+from utils.habit_miner import HabitMiner
+from utils.recurrence import FREQUENCIES, WEEKDAY_NAMES, RecurrenceRule
+
 class ReminderDialog(QDialog):
     """创建或编辑提醒的对话框"""
     
     # 信号
     reminder_updated = pyqtSignal()
     
-    def __init__(self, db_manager, user_id, parent=None):
+    def __init__(self, db_manager, user_id, parent=None, rule_row=None):
+        """
+        参数:
+            db_manager: 数据库管理器
+            user_id: 用户ID
+            parent: 父窗口
+            rule_row: 要编辑的重复提醒规则（get_reminder_rule_by_id 的结果），为None时添加新提醒
+        """
         super().__init__(parent)
         self.db_manager = db_manager
         self.user_id = user_id
+        self.rule_row = rule_row
         
-        self.setWindowTitle("添加提醒")
+        self.setWindowTitle("编辑重复提醒" if rule_row else "添加提醒")
         self.resize(500, 400)
         
         self.init_ui()
+        if rule_row:
+            self.load_rule(rule_row)
         
     def init_ui(self):
         """初始化用户界面"""
@@ -51,6 +66,45 @@ class ReminderDialog(QDialog):
         self.time_edit.setDisplayFormat("HH:mm")
         reminder_layout.addRow(QLabel("时间:"), self.time_edit)
         
+        # 重复方式
+        self.repeat_combo = QComboBox()
+        self.repeat_combo.addItem("不重复", None)
+        for frequency, name in FREQUENCIES:
+            self.repeat_combo.addItem(name, frequency)
+        self.repeat_combo.currentIndexChanged.connect(self.update_repeat_options)
+        reminder_layout.addRow(QLabel("重复:"), self.repeat_combo)
+        
+        # 每周重复的星期选择
+        self.weekday_widget = QWidget()
+        weekday_layout = QHBoxLayout()
+        weekday_layout.setContentsMargins(0, 0, 0, 0)
+        self.weekday_checks = []
+        for name in WEEKDAY_NAMES:
+            check = QCheckBox(name)
+            self.weekday_checks.append(check)
+            weekday_layout.addWidget(check)
+        self.weekday_widget.setLayout(weekday_layout)
+        self.weekday_label = QLabel("星期:")
+        reminder_layout.addRow(self.weekday_label, self.weekday_widget)
+        
+        # 每隔N小时重复的间隔和截止时间
+        self.interval_widget = QWidget()
+        interval_layout = QHBoxLayout()
+        interval_layout.setContentsMargins(0, 0, 0, 0)
+        self.interval_spin = QSpinBox()
+        self.interval_spin.setRange(1, 12)
+        self.interval_spin.setValue(2)
+        self.interval_spin.setSuffix(" 小时")
+        self.window_end_edit = QTimeEdit(QTime(21, 0))
+        self.window_end_edit.setDisplayFormat("HH:mm")
+        interval_layout.addWidget(QLabel("每隔"))
+        interval_layout.addWidget(self.interval_spin)
+        interval_layout.addWidget(QLabel("直到"))
+        interval_layout.addWidget(self.window_end_edit)
+        self.interval_widget.setLayout(interval_layout)
+        self.interval_label = QLabel("间隔:")
+        reminder_layout.addRow(self.interval_label, self.interval_widget)
+        
         # 提醒类型
         self.reminder_type = QComboBox()
         self.reminder_type.addItems(["饮食", "运动", "睡眠", "学习", "其他"])
@@ -66,6 +120,11 @@ class ReminderDialog(QDialog):
         # 按钮区域
         button_layout = QHBoxLayout()
         
+        self.suggest_button = QPushButton("根据记录推荐...")
+        self.suggest_button.setObjectName("secondaryButton")
+        self.suggest_button.clicked.connect(self.show_suggestions)
+        button_layout.addWidget(self.suggest_button)
+        
         self.save_button = QPushButton("保存")
         self.save_button.setObjectName("primaryButton")
         self.save_button.clicked.connect(self.save_reminder)
@@ -80,6 +139,37 @@ class ReminderDialog(QDialog):
         main_layout.addLayout(button_layout)
         self.setLayout(main_layout)
         
+        self.update_repeat_options()
+        
+    def load_rule(self, row):
+        """编辑规则时填入规则的当前设置，规则不能改为不重复"""
+        rule = RecurrenceRule.from_row(row)
+        self.repeat_combo.removeItem(0)
+        self.repeat_combo.setCurrentIndex(self.repeat_combo.findData(rule.frequency))
+        if rule.start_date:
+            self.date_edit.setDate(QDate(rule.start_date.year, rule.start_date.month, rule.start_date.day))
+        self.time_edit.setTime(QTime(rule.time_of_day.hour, rule.time_of_day.minute))
+        for day, check in enumerate(self.weekday_checks):
+            check.setChecked(day in rule.weekdays)
+        self.interval_spin.setValue(rule.interval_hours)
+        if row[8]:
+            self.window_end_edit.setTime(QTime(rule.window_end.hour, rule.window_end.minute))
+        index = self.reminder_type.findText(row[2])
+        if index < 0:
+            self.reminder_type.addItem(row[2])
+            index = self.reminder_type.count() - 1
+        self.reminder_type.setCurrentIndex(index)
+        self.content_edit.setPlainText(row[3])
+        self.suggest_button.hide()
+        
+    def update_repeat_options(self):
+        """根据重复方式显示对应的选项"""
+        frequency = self.repeat_combo.currentData()
+        for widget in (self.weekday_label, self.weekday_widget):
+            widget.setVisible(frequency == "weekly")
+        for widget in (self.interval_label, self.interval_widget):
+            widget.setVisible(frequency == "hourly")
+        
     def save_reminder(self):
         """保存提醒"""
         try:
@@ -94,6 +184,12 @@ class ReminderDialog(QDialog):
                 QMessageBox.warning(self, "警告", "请输入提醒内容")
                 return
             
+            # 重复提醒只保存一条规则
+            frequency = self.repeat_combo.currentData()
+            if frequency:
+                self.save_rule(frequency, date, time, reminder_type, content)
+                return
+            
             # 将数据保存到数据库
             print(f"保存提醒: 日期={date}, 时间={time}, 类型={reminder_type}, 内容={content}")
             reminder_id = self.db_manager.add_reminder(self.user_id, date, time, reminder_type, content)
@@ -110,11 +206,243 @@ class ReminderDialog(QDialog):
             print(f"保存提醒时出错: {str(e)}")
             QMessageBox.critical(self, "错误", f"发生错误: {str(e)}")
             
+    def save_rule(self, frequency, start_date, time, reminder_type, content):
+        """保存重复提醒规则"""
+        weekdays = [day for day, check in enumerate(self.weekday_checks) if check.isChecked()]
+        if frequency == "weekly" and not weekdays:
+            QMessageBox.warning(self, "警告", "请选择每周重复的日期")
+            return
+        
+        window_end = self.window_end_edit.time().toString("HH:mm")
+        if frequency == "hourly" and window_end < time:
+            QMessageBox.warning(self, "警告", "截止时间不能早于提醒时间")
+            return
+        
+        print(f"保存重复提醒: 方式={frequency}, 开始日期={start_date}, 时间={time}, 类型={reminder_type}")
+        options = {
+            "weekdays": weekdays if frequency == "weekly" else None,
+            "interval_hours": self.interval_spin.value() if frequency == "hourly" else None,
+            "window_end": window_end if frequency == "hourly" else None,
+            "start_date": start_date,
+        }
+        if self.rule_row:
+            # 保留原有的结束日期
+            rule_id = self.rule_row[0] if self.db_manager.update_reminder_rule(
+                self.rule_row[0], reminder_type, content, frequency, time, end_date=self.rule_row[10], **options
+            ) else None
+        else:
+            rule_id = self.db_manager.add_reminder_rule(self.user_id, reminder_type, content, frequency, time, **options)
+        
+        if rule_id:
+            print(f"重复提醒已保存，ID={rule_id}")
+            QMessageBox.information(self, "成功", "重复提醒已保存！" if self.rule_row else "重复提醒已成功添加！")
+            self.reminder_updated.emit()
+            self.accept()
+        else:
+            QMessageBox.warning(self, "错误", "保存提醒失败，请重试")
+            
+    def show_suggestions(self):
+        """根据饮食、运动和睡眠记录推荐重复提醒"""
+        dialog = HabitSuggestionDialog(self.db_manager, self.user_id, self)
+        if dialog.exec_() == QDialog.Accepted and dialog.created:
+            self.reminder_updated.emit()
+            self.accept()
+            
     def closeEvent(self, event):
         """处理关闭事件"""
         super().closeEvent(event)
 
 
+class HabitSuggestionDialog(QDialog):
+    """展示根据作息习惯推荐的重复提醒，勾选后批量创建"""
+    
+    def __init__(self, db_manager, user_id, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.user_id = user_id
+        self.miner = HabitMiner(db_manager)
+        self.suggestions = []
+        self.created = []
+        
+        self.setWindowTitle("推荐提醒")
+        self.resize(520, 320)
+        
+        self.init_ui()
+        self.load_suggestions()
+        
+    def init_ui(self):
+        """初始化用户界面"""
+        layout = QVBoxLayout()
+        
+        self.hint_label = QLabel("根据最近90天的记录，您通常在以下时间用餐、运动和休息：")
+        self.hint_label.setWordWrap(True)
+        layout.addWidget(self.hint_label)
+        
+        self.suggestion_list = QListWidget()
+        layout.addWidget(self.suggestion_list)
+        
+        button_layout = QHBoxLayout()
+        self.create_button = QPushButton("创建选中的提醒")
+        self.create_button.setObjectName("primaryButton")
+        self.create_button.clicked.connect(self.create_selected)
+        cancel_button = QPushButton("取消")
+        cancel_button.clicked.connect(self.reject)
+        button_layout.addStretch()
+        button_layout.addWidget(self.create_button)
+        button_layout.addWidget(cancel_button)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+        
+    def load_suggestions(self):
+        """分析记录并列出与已有规则不重复的推荐"""
+        try:
+            self.suggestions = self.miner.filter_new(self.user_id, self.miner.analyze(self.user_id))
+        except Exception as e:
+            print(f"分析作息习惯时出错: {str(e)}")
+            self.suggestions = []
+        
+        for index, suggestion in enumerate(self.suggestions):
+            item = QListWidgetItem(suggestion.describe())
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+            item.setData(Qt.UserRole, index)
+            self.suggestion_list.addItem(item)
+        
+        if not self.suggestions:
+            self.hint_label.setText("记录还不够多或作息不够规律，暂时没有可推荐的提醒。")
+            self.create_button.setEnabled(False)
+            
+    def create_selected(self):
+        """创建勾选的推荐"""
+        selected = []
+        for row in range(self.suggestion_list.count()):
+            item = self.suggestion_list.item(row)
+            if item.checkState() == Qt.Checked:
+                selected.append(self.suggestions[item.data(Qt.UserRole)])
+        if not selected:
+            QMessageBox.warning(self, "警告", "请至少选择一条推荐")
+            return
+        
+        self.created = self.miner.apply(self.user_id, selected)
+        if self.created:
+            QMessageBox.information(self, "成功", f"已创建{len(self.created)}条重复提醒！")
+            self.accept()
+        else:
+            QMessageBox.warning(self, "错误", "保存提醒失败，请重试")
+
+
+class ReminderTableModel(QAbstractTableModel):
+    """
+    提醒列表模型
+
+    按页从数据库读取提醒，视图滚动到底部时通过 canFetchMore/fetchMore 加载下一页，
+    打开列表的开销与提醒总数无关
+    """
+    
+    COLUMNS = ["ID", "类型", "日期", "时间", "内容", "状态"]
+    PAGE_SIZE = 100
+    
+    def __init__(self, db_manager, user_id, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.user_id = user_id
+        self.rows = []
+        self.has_more = False
+        self.date = None
+        self.include_completed = False
+    
+    def set_query(self, date=None, include_completed=False):
+        """
+        设置查询条件并重新加载第一页
+        
+        参数:
+            date: 只显示指定日期的提醒，为None时显示全部日期
+            include_completed: 不指定日期时是否显示已完成的提醒
+        """
+        self.date = date
+        self.include_completed = include_completed
+        self.reload()
+    
+    def reload(self):
+        """丢弃已加载的行，从第一页重新开始"""
+        self.beginResetModel()
+        self.rows = self.fetch_page(None)
+        self.has_more = len(self.rows) == self.PAGE_SIZE
+        self.endResetModel()
+    
+    def fetch_page(self, after):
+        return self.db_manager.get_reminders_page(
+            self.user_id, after=after, limit=self.PAGE_SIZE,
+            date=self.date, include_completed=self.include_completed
+        )
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self.has_more
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.rows:
+            return
+        # 以已加载的最后一行作为下一页的起点
+        last = self.rows[-1]
+        page = self.fetch_page((last[2], last[3], last[0]))
+        self.has_more = len(page) == self.PAGE_SIZE
+        if not page:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        # 数据库提醒表结构: (id, user_id, reminder_date, reminder_time, reminder_type, content, is_completed, created_at)
+        reminder = self.rows[index.row()]
+        column = index.column()
+        is_completed = bool(reminder[6])
+        
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return str(reminder[0])
+            if column == 1:
+                return reminder[4]
+            if column == 2:
+                return reminder[2]
+            if column == 3:
+                return reminder[3]
+            if column == 4:
+                return reminder[5]
+            if column == 5:
+                return "✓" if is_completed else "○"
+        elif role == Qt.BackgroundRole and is_completed:
+            return QColor(Qt.lightGray)
+        elif role == Qt.ForegroundRole and is_completed:
+            return QColor(Qt.gray)
+        elif role == Qt.UserRole:
+            return reminder[0]
+        return None
+    
+    def reminder_id(self, row):
+        """获取指定行的提醒ID"""
+        if 0 <= row < len(self.rows):
+            return self.rows[row][0]
+        return None
+
+
 class ReminderView(QWidget):
     """提醒管理视图"""
     
@@ -163,64 +491,113 @@ class ReminderView(QWidget):
         self.refresh_btn.clicked.connect(self.load_reminders)
         btn_layout.addWidget(self.refresh_btn)
         
+        # 是否显示历史（已完成）提醒
+        self.history_check = QCheckBox("显示已完成")
+        self.history_check.toggled.connect(self.load_reminders)
+        btn_layout.addWidget(self.history_check)
+        
         layout.addLayout(btn_layout)
         
-        # 提醒列表
-        self.reminder_table = QTableWidget()
-        self.reminder_table.setColumnCount(5)
-        self.reminder_table.setHorizontalHeaderLabels(["ID", "类型", "日期", "时间", "内容"])
+        # 提醒列表（按需分页加载）
+        self.reminder_model = ReminderTableModel(self.db_manager, self.user_id, self)
+        self.reminder_table = QTableView()
+        self.reminder_table.setModel(self.reminder_model)
+        self.reminder_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
         self.reminder_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
         self.reminder_table.verticalHeader().setVisible(False)
-        self.reminder_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.reminder_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.reminder_table.setSelectionMode(QTableWidget.SingleSelection)
-        layout.addWidget(self.reminder_table)
+        self.reminder_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.reminder_table.setSelectionBehavior(QTableView.SelectRows)
+        self.reminder_table.setSelectionMode(QTableView.SingleSelection)
+        # 隐藏ID列，但保留数据
+        self.reminder_table.hideColumn(0)
+        layout.addWidget(self.reminder_table, 3)
+        
+        # 重复提醒规则列表，不论哪天触发都可以在这里修改和删除
+        rule_group = QGroupBox("重复提醒")
+        rule_layout = QVBoxLayout()
+        self.rule_list = QListWidget()
+        self.rule_list.itemDoubleClicked.connect(lambda item: self.edit_rule())
+        rule_layout.addWidget(self.rule_list)
+        
+        rule_btn_layout = QHBoxLayout()
+        self.edit_rule_btn = QPushButton("编辑规则")
+        self.edit_rule_btn.clicked.connect(self.edit_rule)
+        rule_btn_layout.addWidget(self.edit_rule_btn)
+        self.delete_rule_btn = QPushButton("删除规则")
+        self.delete_rule_btn.clicked.connect(self.delete_rule)
+        rule_btn_layout.addWidget(self.delete_rule_btn)
+        rule_btn_layout.addStretch()
+        rule_layout.addLayout(rule_btn_layout)
+        rule_group.setLayout(rule_layout)
+        layout.addWidget(rule_group, 1)
         
         self.setLayout(layout)
     
     def load_reminders(self):
-        """加载用户的提醒列表"""
-        # 清空表格
-        self.reminder_table.setRowCount(0)
-        
-        # 获取提醒数据
-        reminders = self.db_manager.get_reminders_by_user_date(self.user_id)
-        
-        # 填充表格
-        for row, reminder in enumerate(reminders):
-            self.reminder_table.insertRow(row)
-            
-            # 数据库提醒表结构: (id, user_id, reminder_date, reminder_time, reminder_type, content, is_completed, created_at)
-            # 隐藏ID列，但保留数据
-            id_item = QTableWidgetItem(str(reminder[0]))  # ID
-            self.reminder_table.setItem(row, 0, id_item)
-            
-            # 类型
-            type_item = QTableWidgetItem(reminder[4])  # reminder_type
-            self.reminder_table.setItem(row, 1, type_item)
-            
-            # 日期
-            date_item = QTableWidgetItem(reminder[2])  # reminder_date
-            self.reminder_table.setItem(row, 2, date_item)
-            
-            # 时间
-            time_item = QTableWidgetItem(reminder[3])  # reminder_time
-            self.reminder_table.setItem(row, 3, time_item)
-            
-            # 内容
-            content_item = QTableWidgetItem(reminder[5])  # content
-            self.reminder_table.setItem(row, 4, content_item)
-            
-            # 如果已完成，设置灰色
-            if reminder[6]:  # is_completed
-                for col in range(5):
-                    self.reminder_table.item(row, col).setBackground(Qt.lightGray)
-        
-        # 隐藏ID列
-        self.reminder_table.hideColumn(0)
-        
-        # 调整列宽
-        self.reminder_table.resizeColumnsToContents()
+        """加载用户的提醒列表和重复提醒规则"""
+        self.reminder_model.set_query(include_completed=self.history_check.isChecked())
+        self.load_rules()
+    
+    def load_rules(self):
+        """列出用户全部重复提醒规则"""
+        self.rule_list.clear()
+        for row in self.db_manager.get_reminder_rules(self.user_id):
+            try:
+                description = RecurrenceRule.from_row(row).describe()
+            except ValueError:
+                description = "规则无效"
+            period = ""
+            if row[9] or row[10]:
+                period = f"（{row[9] or ''} 至 {row[10] or '长期'}）"
+            item = QListWidgetItem(f"🔁 {description} - {row[2]}: {row[3]}{period}")
+            item.setData(Qt.UserRole, row[0])
+            self.rule_list.addItem(item)
+    
+    def selected_rule_id(self):
+        """获取选中的规则ID，未选中时返回None"""
+        item = self.rule_list.currentItem()
+        return item.data(Qt.UserRole) if item is not None else None
+    
+    def edit_rule(self):
+        """编辑选中的重复提醒规则"""
+        rule_id = self.selected_rule_id()
+        if rule_id is None:
+            QMessageBox.warning(self, "提示", "请先选择一个重复提醒")
+            return
+        row = self.db_manager.get_reminder_rule_by_id(rule_id)
+        if row is None:
+            self.load_rules()
+            return
+        try:
+            dialog = ReminderDialog(self.db_manager, self.user_id, self, rule_row=row)
+        except ValueError as e:
+            QMessageBox.warning(self, "错误", f"无法编辑该规则: {str(e)}")
+            return
+        dialog.reminder_updated.connect(self.load_reminders)
+        dialog.exec_()
+    
+    def delete_rule(self):
+        """删除选中的重复提醒规则"""
+        rule_id = self.selected_rule_id()
+        if rule_id is None:
+            QMessageBox.warning(self, "提示", "请先选择一个重复提醒")
+            return
+        response = QMessageBox.question(
+            self, "确认删除", "确定要删除这个重复提醒吗？以后将不再提醒。",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if response == QMessageBox.Yes:
+            if self.db_manager.delete_reminder_rule(rule_id):
+                self.load_rules()
+            else:
+                QMessageBox.critical(self, "错误", "删除重复提醒失败")
+    
+    def selected_reminder_id(self):
+        """获取选中行的提醒ID，未选中时返回None"""
+        selected_rows = self.reminder_table.selectionModel().selectedRows()
+        if not selected_rows:
+            return None
+        return self.reminder_model.reminder_id(selected_rows[0].row())
     
     def add_reminder(self):
         """添加新提醒"""
@@ -230,28 +607,22 @@ class ReminderView(QWidget):
     
     def edit_reminder(self):
         """编辑选中的提醒"""
-        selected_rows = self.reminder_table.selectedItems()
-        if not selected_rows:
+        reminder_id = self.selected_reminder_id()
+        if reminder_id is None:
             QMessageBox.warning(self, "提示", "请先选择一个提醒")
             return
         
-        row = selected_rows[0].row()
-        reminder_id = int(self.reminder_table.item(row, 0).text())
-        
         dialog = ReminderDialog(self.db_manager, self.user_id, self)
         dialog.reminder_updated.connect(self.load_reminders)
         dialog.exec_()
     
     def delete_reminder(self):
         """删除选中的提醒"""
-        selected_rows = self.reminder_table.selectedItems()
-        if not selected_rows:
+        reminder_id = self.selected_reminder_id()
+        if reminder_id is None:
             QMessageBox.warning(self, "提示", "请先选择一个提醒")
             return
         
-        row = selected_rows[0].row()
-        reminder_id = int(self.reminder_table.item(row, 0).text())
-        
         print(f"准备删除提醒ID: {reminder_id}")
         
         response = QMessageBox.question(
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+健康趋势视图
+展示任意时间范围内摄入热量、消耗热量、睡眠时长和睡眠质量的变化趋势
+"""
+
+import datetime
+from collections import OrderedDict
+
+import numpy as np
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox
+from PyQt5.QtCore import QDate, QTimer
+
+from ui.chart_widget import ChartWidget
+from utils.downsample import lttb
+
+
+class TrendView(QWidget):
+    """长期趋势视图"""
+
+    # 可选的时间范围（显示名称, 天数）
+    RANGES = [
+        ("最近一周", 7),
+        ("最近一月", 30),
+        ("最近三月", 90),
+        ("最近一年", 365),
+        ("最近三年", 365 * 3),
+    ]
+
+    # 缓存条目上限
+    CACHE_SIZE = 8
+
+    def __init__(self, user_id, db_manager, parent=None):
+        super().__init__(parent)
+        self.user_id = user_id
+        self.db_manager = db_manager
+        self.end_date = QDate.currentDate()
+
+        # 按 (天数, 结束日期) 缓存聚合后的每日数据
+        self.series_cache = OrderedDict()
+        # 按 (天数, 结束日期, 像素宽度) 缓存降采样结果
+        self.sampled_cache = OrderedDict()
+
+        # 尺寸变化时延迟重绘，避免拖动窗口时反复渲染
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(150)
+        self.resize_timer.timeout.connect(self.render_chart)
+
+        # 记录写入后自动让缓存失效，控件销毁时注销监听器
+        callback = self.on_data_changed
+        db_manager.add_change_listener(callback)
+        self.destroyed.connect(lambda *args: db_manager.remove_change_listener(callback))
+
+        self.init_ui()
+
+    def init_ui(self):
+        """初始化界面"""
+        layout = QVBoxLayout()
+
+        # 控制区域
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("时间范围:"))
+
+        self.range_combo = QComboBox()
+        for name, _ in self.RANGES:
+            self.range_combo.addItem(name)
+        self.range_combo.currentIndexChanged.connect(self.load_data)
+        control_layout.addWidget(self.range_combo)
+
+        self.refresh_button = QPushButton("刷新")
+        self.refresh_button.setObjectName("secondaryButton")
+        self.refresh_button.clicked.connect(self.refresh)
+        control_layout.addWidget(self.refresh_button)
+        control_layout.addStretch()
+
+        layout.addLayout(control_layout)
+
+        # 统计摘要
+        self.summary_label = QLabel("")
+        self.summary_label.setObjectName("trendSummary")
+        layout.addWidget(self.summary_label)
+
+        # 图表区域
+        self.calories_chart = ChartWidget("line")
+        self.calories_chart.set_title("热量摄入与消耗", "kcal")
+        layout.addWidget(self.calories_chart, 1)
+
+        self.macros_chart = ChartWidget("area")
+        self.macros_chart.set_title("营养素热量构成", "kcal")
+        layout.addWidget(self.macros_chart, 1)
+
+        self.sleep_chart = ChartWidget("line")
+        self.sleep_chart.set_title("睡眠时长与质量", "小时")
+        layout.addWidget(self.sleep_chart, 1)
+
+        self.setLayout(layout)
+
+    def current_days(self):
+        """当前选择的范围天数"""
+        return self.RANGES[max(self.range_combo.currentIndex(), 0)][1]
+
+    def update_date(self, selected_date):
+        """以选中的日期作为趋势范围的结束日期"""
+        try:
+            if isinstance(selected_date, str):
+                selected_date = QDate.fromString(selected_date, "yyyy-MM-dd")
+            if selected_date and selected_date.isValid():
+                self.end_date = selected_date
+            self.load_data()
+        except Exception as e:
+            print(f"更新趋势视图日期时出错: {str(e)}")
+
+    def refresh(self):
+        """丢弃缓存并重新加载"""
+        self.invalidate()
+        self.load_data()
+
+    def invalidate(self):
+        """记录发生变化后清空缓存"""
+        self.series_cache.clear()
+        self.sampled_cache.clear()
+
+    def on_data_changed(self, kind, user_id, date):
+        """数据库记录变化的回调"""
+        if kind in ("diet", "exercise", "sleep") and user_id in (None, self.user_id):
+            self.invalidate()
+
+    def load_data(self):
+        """加载当前范围的数据并绘制"""
+        try:
+            series = self.get_series(self.current_days())
+            self.update_summary(series)
+            self.render_chart()
+        except Exception as e:
+            print(f"加载趋势数据时出错: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def get_series(self, days):
+        """获取范围内按天对齐的数据，一个范围只查询一次数据库"""
+        end = self.end_date.toPyDate()
+        key = (days, end)
+        if key in self.series_cache:
+            self.series_cache.move_to_end(key)
+            return self.series_cache[key]
+
+        start = end - datetime.timedelta(days=days - 1)
+        rows = self.db_manager.get_daily_trend_summary(
+            self.user_id, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+        )
+
+        # 每天一个槽位，没有记录的日期保持为NaN
+        intake = np.full(days, np.nan)
+        burned = np.full(days, np.nan)
+        sleep_hours = np.full(days, np.nan)
+        quality = np.full(days, np.nan)
+        macros = np.full((days, 3), np.nan)
+
+        if rows:
+            dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+            index = (dates - np.datetime64(start, 'D')).astype(int)
+            values = np.array([row[1:] for row in rows], dtype=float)  # None会被转换为NaN
+            intake[index] = values[:, 0]
+            burned[index] = values[:, 1]
+            sleep_hours[index] = values[:, 3] / 60
+            quality[index] = values[:, 4]
+            # 蛋白质、碳水每克4千卡，脂肪每克9千卡
+            macros[index] = values[:, 5:8] * np.array([4, 9, 4])
+
+        series = {
+            "start": start,
+            "end": end,
+            "x": np.arange(days, dtype=float),
+            "intake": intake,
+            "burned": burned,
+            "sleep_hours": sleep_hours,
+            "quality": quality,
+            "protein_kcal": macros[:, 0],
+            "fat_kcal": macros[:, 1],
+            "carbs_kcal": macros[:, 2],
+        }
+
+        self.series_cache[key] = series
+        if len(self.series_cache) > self.CACHE_SIZE:
+            self.series_cache.popitem(last=False)
+        return series
+
+    def update_summary(self, series):
+        """更新范围内的平均值摘要"""
+        def average(values):
+            return float(np.nanmean(values)) if np.any(~np.isnan(values)) else 0.0
+
+        self.summary_label.setText(
+            f"{series['start'].strftime('%Y-%m-%d')} 至 {series['end'].strftime('%Y-%m-%d')}    "
+            f"日均摄入: {average(series['intake']):.0f} kcal    "
+            f"日均消耗: {average(series['burned']):.0f} kcal    "
+            f"平均睡眠: {average(series['sleep_hours']):.1f} 小时    "
+            f"平均睡眠质量: {average(series['quality']):.1f}/5"
+        )
+
+    def resizeEvent(self, event):
+        """尺寸变化后重新渲染（带防抖）"""
+        super().resizeEvent(event)
+        self.resize_timer.start()
+
+    def render_chart(self):
+        """把降采样后的数据交给图表组件，同一范围和宽度的结果直接复用"""
+        days = self.current_days()
+        width = max(self.calories_chart.width(), 200)
+        key = (days, self.end_date.toPyDate(), width)
+
+        sampled = self.sampled_cache.get(key)
+        if sampled is None:
+            sampled = self.downsample(self.get_series(days), width)
+            self.sampled_cache[key] = sampled
+            if len(self.sampled_cache) > self.CACHE_SIZE:
+                self.sampled_cache.popitem(last=False)
+        else:
+            self.sampled_cache.move_to_end(key)
+
+        start = sampled["start"]
+        long_range = days > 120
+
+        def format_day(value):
+            day = start + datetime.timedelta(days=int(round(value)))
+            return day.strftime('%Y-%m') if long_range else day.strftime('%m-%d')
+
+        for chart in (self.calories_chart, self.macros_chart, self.sleep_chart):
+            chart.set_formatters(x_formatter=format_day, y_formatter=lambda value: f"{value:.0f}")
+        self.sleep_chart.set_formatters(y_formatter=lambda value: f"{value:.1f}")
+
+        self.calories_chart.set_data(*sampled["calories"])
+        self.macros_chart.set_data(*sampled["macros"])
+        self.sleep_chart.set_data(*sampled["sleep"])
+
+    @staticmethod
+    def downsample(series, width):
+        """按像素宽度做LTTB降采样，每个像素最多保留一个点"""
+        threshold = max(int(width * 0.9), 3)
+        x = series["x"]
+
+        def lines(*items):
+            """
+            同一张图的折线共享采样点，否则各自的采样点对齐后中间会出现空缺，折线被拆成碎段。
+            按各折线相对自身最大值的和选取采样点，量纲不同的两条折线同样起作用
+            """
+            values = np.array([series[key] for key, *_ in items])
+            peaks = np.nanmax(np.abs(values), axis=1, initial=0)
+            peaks[peaks == 0] = 1
+            driver = np.nansum(values / peaks[:, None], axis=0)
+            driver[np.all(np.isnan(values), axis=0)] = np.nan
+            sx, _ = lttb(x, driver, threshold)
+            index = sx.astype(int)
+            return sx, [
+                {"name": name, "values": series[key][index], "color": color, "secondary": secondary}
+                for key, name, color, secondary in items
+            ]
+
+        calories = lines(
+            ("intake", "摄入热量", "#E67E22", False),
+            ("burned", "消耗热量", "#27AE60", False),
+        )
+        sleep = lines(
+            ("sleep_hours", "睡眠时长", "#2980B9", False),
+            ("quality", "睡眠质量", "#8E44AD", True),
+        )
+
+        # 堆叠面积图需要各层共享横坐标，按总热量选取采样点
+        total = np.nansum([series["protein_kcal"], series["fat_kcal"], series["carbs_kcal"]], axis=0)
+        total[np.all(np.isnan([series["protein_kcal"], series["fat_kcal"], series["carbs_kcal"]]), axis=0)] = np.nan
+        sx, _ = lttb(x, total, threshold)
+        index = sx.astype(int)
+        macros = (sx, [
+            {"name": "蛋白质", "values": series["protein_kcal"][index], "color": "#E74C3C"},
+            {"name": "脂肪", "values": series["fat_kcal"][index], "color": "#F1C40F"},
+            {"name": "碳水", "values": series["carbs_kcal"][index], "color": "#3498DB"},
+        ])
+
+        return {"start": series["start"], "calories": calories, "sleep": sleep, "macros": macros}
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分析结果缓存
+按 (用户, 分析类型, 起始日期, 结束日期, 数据版本) 缓存健康分析结果，
+数据版本由 DatabaseManager 在记录或资料写入时递增，数据未变化时重新打开或导出报告无需重新分析。
+结果保存在内存中，并可选地以JSON文件保存到磁盘，两者都按最近最少使用淘汰
+"""
+
+import copy
+import hashlib
+import json
+import os
+import uuid
+from collections import OrderedDict
+
+
+class AnalysisCache:
+    """
+    健康分析结果的LRU缓存
+
+    键中包含数据版本，数据变化后旧结果不会再被命中，随后被淘汰
+    """
+
+    # 内存和磁盘中最多保留的结果数
+    MEMORY_SIZE = 32
+    DISK_SIZE = 256
+    # 分析结果的结构变化时递增，旧格式的磁盘缓存不再命中
+    FORMAT = 2
+
+    def __init__(self, db_manager, disk_dir=None, memory_size=None, disk_size=None):
+        """
+        参数:
+            db_manager: 数据库管理器实例，用于读取数据版本
+            disk_dir: 磁盘缓存目录，为None时只缓存在内存中
+            memory_size: 内存中保留的结果数，默认为 MEMORY_SIZE
+            disk_size: 磁盘上保留的结果数，默认为 DISK_SIZE
+        """
+        self.db_manager = db_manager
+        self.disk_dir = disk_dir
+        self.memory_size = memory_size or self.MEMORY_SIZE
+        self.disk_size = disk_size or self.DISK_SIZE
+        self.memory = OrderedDict()
+        # 数据库的随机标识，避免不同数据库文件（或删除后重建的数据库）的版本号相互混淆
+        self.namespace = db_manager.get_setting("analysis_cache_id")
+        if not self.namespace:
+            self.namespace = uuid.uuid4().hex
+            db_manager.set_setting("analysis_cache_id", self.namespace)
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def make_key(self, user_id, kind, start_date, end_date):
+        """生成缓存键，无法读取数据版本时返回None"""
+        start_date, end_date = str(start_date)[:10], str(end_date)[:10]
+        version = self.db_manager.get_data_version(user_id, start_date, end_date)
+        if version is None:
+            return None
+        return (self.namespace, self.FORMAT, user_id, kind, start_date, end_date, version)
+
+    def get_or_compute(self, user_id, start_date, end_date, compute, kind="range"):
+        """
+        获取缓存的分析结果，没有时调用 compute() 计算并缓存
+
+        参数:
+            user_id: 用户ID
+            start_date: 起始日期(YYYY-MM-DD 或 datetime)
+            end_date: 结束日期(YYYY-MM-DD 或 datetime)
+            compute: 无参数的函数，返回可序列化为JSON的分析结果
+            kind: 分析类型，同一时段的不同分析使用不同的类型
+
+        返回:
+            分析结果的副本，调用方可以修改
+        """
+        key = self.make_key(user_id, kind, start_date, end_date)
+        if key is None:
+            return compute()
+
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return copy.deepcopy(result)
+
+    def get(self, key):
+        """按键读取，依次查找内存和磁盘，未命中返回None"""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        result = self.read_disk(key)
+        if result is not None:
+            self.remember(key, result)
+        return result
+
+    def put(self, key, result):
+        """保存结果到内存和磁盘"""
+        self.remember(key, result)
+        self.write_disk(key, result)
+
+    def remember(self, key, result):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def disk_path(self, key):
+        digest = hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.json")
+
+    def read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self.disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"读取分析缓存失败: {str(e)}")
+            return None
+        if entry.get("key") != list(key):
+            return None
+        # 更新访问时间，磁盘淘汰按访问时间进行
+        os.utime(path)
+        return entry["result"]
+
+    def write_disk(self, key, result):
+        if not self.disk_dir:
+            return
+        path = self.disk_path(key)
+        try:
+            # 先写临时文件再替换，中途退出不会留下不完整的缓存
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"key": list(key), "result": result}, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+            self.evict_disk()
+        except (OSError, TypeError, ValueError) as e:
+            print(f"写入分析缓存失败: {str(e)}")
+
+    def evict_disk(self):
+        """磁盘上的结果超过上限时删除最久未访问的"""
+        entries = [entry for entry in os.scandir(self.disk_dir) if entry.name.endswith(".json")]
+        if len(entries) <= self.disk_size:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.disk_size]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        self.memory.clear()
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith(".json"):
+                    os.remove(entry.path)
+
+
+# 默认的磁盘缓存目录，位于项目根目录下
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "analysis")
+
+# 每个数据库管理器对应一个缓存
+_analysis_caches = {}
+
+def get_analysis_cache(db_manager):
+    """
+    获取数据库管理器对应的分析结果缓存，同一会话中共用
+
+    参数:
+        db_manager: 数据库管理器实例
+
+    返回:
+        AnalysisCache: 缓存实例，磁盘缓存目录为 DEFAULT_CACHE_DIR
+    """
+    cache = _analysis_caches.get(db_manager)
+    if cache is None:
+        cache = AnalysisCache(db_manager, DEFAULT_CACHE_DIR)
+        _analysis_caches[db_manager] = cache
+    return cache
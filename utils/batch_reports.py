@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量生成健康报告
+不启动界面，为一批用户生成若干周、月、季度或年的PDF或HTML报告，适合定时任务在夜间运行。
+所有数据在主进程中用一次分组查询取出，按周或按月的环比也由这些数据计算，报告由进程池并行生成，
+每个工作进程启动时注册一次字体，PDF先写临时文件再替换。在项目根目录运行：
+
+    python -m utils.batch_reports --period weekly --count 4 --users 1,2,3
+    python -m utils.batch_reports --period monthly --start 2025-01-01 --count 3
+    python -m utils.batch_reports --period yearly --start 2024-01-01
+    python -m utils.batch_reports --period monthly --count 12 --format html
+"""
+
+import argparse
+import contextlib
+import datetime
+import itertools
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.html_report import HtmlReportGenerator
+from utils.report_generator import WeeklyReportGenerator, register_report_font
+from utils.report_periods import (PERIODS, period_ranges, default_start, trend_start, summarize_periods,
+                                  build_period_results)
+
+# 默认输出目录，位于项目根目录下
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports", "batch")
+
+
+def report_filename(username, kind, start, end, fmt="pdf"):
+    """报告文件名，用户名中不能用于文件名的字符替换为下划线"""
+    safe_name = re.sub(r'[\\/:*?"<>|\s]+', "_", username or "user") or "user"
+    return f"{safe_name}_{kind}_{start:%Y%m%d}-{end:%Y%m%d}.{fmt}"
+
+
+def init_worker(fmt="pdf"):
+    """工作进程初始化：生成PDF时注册一次字体，之后生成的所有报告共用"""
+    if fmt == "pdf":
+        register_report_font()
+
+
+def generate_report(task):
+    """
+    在工作进程中分析并生成一份报告
+
+    参数:
+        task: (用户ID, 资料, 报告类型, 起始日期, 结束日期, 每日汇总, 时段汇总, 输出目录, 格式)
+
+    返回:
+        (用户ID, 起始日期, 文件路径, 错误信息)，成功时错误信息为None
+    """
+    user_id, profile, kind, start, end, rows, trend_rows, output_dir, fmt = task
+    _, title, period_name, _ = PERIODS[kind]
+    try:
+        results = build_period_results(kind, start, end, rows, trend_rows, profile)
+        filename = report_filename(profile.get("username"), kind, start, end, fmt)
+        if fmt == "html":
+            generator = HtmlReportGenerator(results, profile, output_dir=output_dir,
+                                            period=(start, end), title=title, period_name=period_name)
+            path = generator.generate_html(filename)
+        else:
+            generator = WeeklyReportGenerator(results, profile, output_dir=output_dir,
+                                              period=(start, end), title=title, period_name=period_name)
+            path = generator.generate_pdf(filename)
+        return user_id, start, path, None
+    except Exception as e:
+        return user_id, start, None, str(e)
+
+
+class BatchReportGenerator:
+    """
+    为多个用户和周期批量生成报告
+
+    数据库只在主进程中访问，工作进程只负责分析和排版
+    """
+
+    def __init__(self, db_manager, output_dir=None, workers=None, fmt="pdf"):
+        """
+        参数:
+            db_manager: 数据库管理器实例
+            output_dir: 输出目录，默认为 DEFAULT_OUTPUT_DIR
+            workers: 进程数，默认为CPU核数，为1时在当前进程中生成
+            fmt: 报告格式，"pdf" 或 "html"
+        """
+        self.db_manager = db_manager
+        self.output_dir = output_dir or DEFAULT_OUTPUT_DIR
+        self.workers = workers or os.cpu_count() or 1
+        self.fmt = fmt
+
+    def build_tasks(self, kind, ranges, user_ids=None):
+        """
+        一次取出所有周期（包括第一个环比时段的上一时段）的每日数据，拆分为每个用户每个周期一个任务，
+        环比用的时段汇总由同一批数据计算
+
+        参数:
+            kind: 报告类型
+            ranges: period_ranges 的结果
+            user_ids: 用户ID列表，为None时为全部用户
+        """
+        profiles = self.db_manager.get_all_user_profiles()
+        if user_ids is not None:
+            profiles = {user_id: profiles[user_id] for user_id in user_ids if user_id in profiles}
+
+        first = trend_start(kind, min(start for start, _ in ranges)).isoformat()
+        last = max(end for _, end in ranges).isoformat()
+        rows = self.db_manager.get_cohort_daily_summary(first, last)
+        daily = {user_id: [row[1:] for row in group]
+                 for user_id, group in itertools.groupby(rows, key=lambda row: row[0])}
+
+        tasks = []
+        for user_id, profile in profiles.items():
+            user_rows = daily.get(user_id, [])
+            for start, end in ranges:
+                period_rows = [row for row in user_rows if start.isoformat() <= str(row[0]) <= end.isoformat()]
+                trend_rows = summarize_periods(user_rows, start, end, PERIODS[kind][3])
+                tasks.append((user_id, profile, kind, start, end, period_rows, trend_rows, self.output_dir, self.fmt))
+        return tasks
+
+    def run(self, kind, ranges, user_ids=None, progress=None):
+        """
+        生成报告
+
+        参数:
+            kind: 报告类型
+            ranges: period_ranges 的结果
+            user_ids: 用户ID列表，为None时为全部用户
+            progress: 每完成一份报告调用一次 progress(已完成数, 总数, 结果)(可选)
+
+        返回:
+            [(用户ID, 起始日期, 文件路径, 错误信息), ...]
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        tasks = self.build_tasks(kind, ranges, user_ids)
+        results = []
+
+        if self.workers == 1 or len(tasks) <= 1:
+            init_worker(self.fmt)
+            outputs = map(generate_report, tasks)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker, initargs=(self.fmt,))
+            outputs = executor.map(generate_report, tasks, chunksize=max(1, len(tasks) // (self.workers * 4)))
+
+        try:
+            for result in outputs:
+                results.append(result)
+                if progress:
+                    progress(len(results), len(tasks), result)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量生成健康报告")
+    parser.add_argument("--db", default="database/health_life.db", help="数据库文件路径")
+    parser.add_argument("--period", choices=list(PERIODS), default="weekly", help="报告类型")
+    parser.add_argument("--start", help="第一个周期中的任一日期 YYYY-MM-DD，默认为上一个完整周期")
+    parser.add_argument("--count", type=int, default=1, help="周期数")
+    parser.add_argument("--users", help="逗号分隔的用户ID，默认为全部用户")
+    parser.add_argument("--format", choices=["pdf", "html"], default="pdf", help="报告格式")
+    parser.add_argument("--out", help="输出目录")
+    parser.add_argument("--workers", type=int, help="进程数，默认为CPU核数")
+    args = parser.parse_args(argv)
+
+    start = datetime.date.fromisoformat(args.start) if args.start else default_start(args.period)
+    ranges = period_ranges(args.period, start, args.count)
+    user_ids = [int(value) for value in args.users.split(",") if value.strip()] if args.users else None
+
+    def report_progress(done, total, result):
+        user_id, period_start, path, error = result
+        status = path if error is None else f"失败: {error}"
+        print(f"[{done}/{total}] 用户{user_id} {period_start}: {status}")
+
+    from database.db_manager import DatabaseManager
+    # 数据库和字体的日志输出到标准错误，标准输出只有生成结果
+    with contextlib.redirect_stdout(sys.stderr):
+        db_manager = DatabaseManager(args.db)
+    try:
+        results = BatchReportGenerator(db_manager, args.out, args.workers, args.format).run(
+            args.period, ranges, user_ids, report_progress
+        )
+    finally:
+        db_manager.close()
+
+    failed = sum(1 for result in results if result[3] is not None)
+    print(f"共生成{len(results) - failed}份报告，失败{failed}份")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+验证码预生成池
+后台线程提前渲染好一批验证码，登录和注册界面刷新时直接取用，
+刷新延迟与渲染耗时无关
+"""
+
+import queue
+import time
+
+from PyQt5.QtCore import QThread
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtWidgets import QApplication
+
+from utils.verification import generate_captcha_text, render_captcha_image
+
+
+class CaptchaPool(QThread):
+    """
+    有界验证码池
+
+    后台线程持续渲染 (QImage, 文本) 放入有界队列，队列满时阻塞等待；
+    每取走一个，线程就补充一个。取用时队列为空（如刚启动）则在当前线程同步生成
+    """
+
+    # 池中保留的验证码数量
+    POOL_SIZE = 8
+
+    def __init__(self, size=None, renderer=None, parent=None):
+        """
+        参数:
+            size: 池大小，默认为 POOL_SIZE
+            renderer: 渲染函数 renderer(text) -> QImage，默认为 render_captcha_image
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.renderer = renderer or render_captcha_image
+        self.pool = queue.Queue(maxsize=size or self.POOL_SIZE)
+        self.running = True
+
+    def run(self):
+        while self.running:
+            text = generate_captcha_text()
+            try:
+                image = self.renderer(text)
+            except Exception as e:
+                print(f"预生成验证码出错: {str(e)}")
+                break
+            # 队列满时定期醒来检查是否需要退出
+            while self.running:
+                try:
+                    self.pool.put((image, text), timeout=0.2)
+                    break
+                except queue.Full:
+                    continue
+
+    def pop(self):
+        """
+        取出一个验证码，必须在界面线程调用
+
+        返回:
+            (QPixmap, 验证码文本)
+        """
+        try:
+            image, text = self.pool.get_nowait()
+        except queue.Empty:
+            text = generate_captcha_text()
+            image = self.renderer(text)
+        return QPixmap.fromImage(image), text
+
+    def stop(self):
+        """停止后台线程"""
+        self.running = False
+        self.wait()
+
+
+# 进程内共享的验证码池
+_captcha_pool_instance = None
+
+def get_captcha_pool():
+    """
+    获取进程内共享的验证码池，首次调用时启动后台线程
+
+    返回:
+        CaptchaPool: 验证码池实例
+    """
+    global _captcha_pool_instance
+    if _captcha_pool_instance is None:
+        app = QApplication.instance()
+        _captcha_pool_instance = CaptchaPool(parent=app)
+        if app is not None:
+            app.aboutToQuit.connect(_captcha_pool_instance.stop)
+        _captcha_pool_instance.start()
+    return _captcha_pool_instance
+
+
+if __name__ == '__main__':
+    # 基准测试（在项目根目录运行 python -m utils.captcha_pool）：
+    # 比较直接渲染和从池中取用的刷新延迟，额外模拟几种更慢的渲染器，池的取用延迟不随渲染耗时变化
+    import os
+    import sys
+    import statistics
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    app = QApplication(sys.argv)
+    refreshes = 20
+    # 用户两次刷新之间的间隔（秒），足够后台线程补充
+    interval = 0.1
+
+    def slow_renderer(delay):
+        def render(text):
+            time.sleep(delay)
+            return render_captcha_image(text)
+        return render
+
+    def measure(callable_):
+        samples = []
+        for _ in range(refreshes):
+            start = time.perf_counter()
+            callable_()
+            samples.append((time.perf_counter() - start) * 1000)
+            time.sleep(interval)
+        return statistics.median(samples), max(samples)
+
+    print(f"{'渲染器':<16}{'直接渲染(中位/最大ms)':<26}{'验证码池(中位/最大ms)'}")
+    for name, delay in (("实际渲染", 0.0), ("慢渲染 20ms", 0.02), ("慢渲染 60ms", 0.06)):
+        renderer = slow_renderer(delay) if delay else render_captcha_image
+        direct = measure(lambda: QPixmap.fromImage(renderer(generate_captcha_text())))
+
+        pool = CaptchaPool(renderer=renderer)
+        pool.start()
+        while not pool.pool.full():
+            time.sleep(0.01)
+        pooled = measure(pool.pop)
+        pool.stop()
+
+        print(f"{name:<16}{direct[0]:>8.2f} / {direct[1]:<14.2f}{pooled[0]:>8.3f} / {pooled[1]:.3f}")
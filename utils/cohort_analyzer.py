@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+群体健康统计
+用一次分组查询取出所有用户在某段时间内的每日汇总，按用户分块交给进程池逐个分析，
+再把每个用户的结果归并为群体的摄入、运动、睡眠分布和达标比例。
+无需界面，在项目根目录运行：
+
+    python -m utils.cohort_analyzer --start 2025-03-03 --end 2025-03-09 --workers 4
+"""
+
+import argparse
+import contextlib
+import datetime
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.health_analyzer import HealthAnalyzer
+
+# 每个用户的指标 -> 显示名称
+METRICS = {
+    "intake": "日均摄入热量(千卡)",
+    "exercise": "每周运动时长(分钟)",
+    "sleep": "平均睡眠时长(小时)",
+    "sleep_quality": "平均睡眠质量",
+}
+
+
+def analyze_user(user_id, profile, rows, start_date, end_date):
+    """
+    分析一个用户，返回群体统计需要的指标
+
+    参数:
+        user_id: 用户ID
+        profile: 用户资料，可为None
+        rows: 该用户的每日汇总，格式同 get_daily_trend_summary
+        start_date: 起始日期(YYYY-MM-DD)
+        end_date: 结束日期(YYYY-MM-DD)
+    """
+    results = HealthAnalyzer().analyze_range(rows, start_date, end_date, profile)
+    exercise = results["exercise_stats"]
+    diet = results["diet_stats"]
+    sleep = results["sleep_stats"]
+    return {
+        "user_id": user_id,
+        "active": exercise["total_days"] > 0,
+        "intake": diet["avg_calories_per_day"] if diet["diet_days"] else None,
+        "exercise": exercise["total_duration"] * 7 / exercise["range_days"],
+        "sleep": sleep["avg_duration_per_sleep_day"] / 60 if sleep["sleep_days"] else None,
+        "sleep_quality": sleep["avg_quality"] if sleep["sleep_days"] else None,
+        "meets_exercise": exercise["meets_recommendation"],
+        "meets_sleep": sleep["meets_recommendation"],
+    }
+
+
+def analyze_partition(partition, start_date, end_date):
+    """
+    在工作进程中分析一块用户
+
+    参数:
+        partition: [(用户ID, 资料, 每日汇总), ...]
+    """
+    return [analyze_user(user_id, profile, rows, start_date, end_date) for user_id, profile, rows in partition]
+
+
+def distribution(values):
+    """数值列表的分布，为空时返回None"""
+    if not values:
+        return None
+    values = np.asarray(values, dtype=float)
+    minimum, p25, median, p75, maximum = np.percentile(values, [0, 25, 50, 75, 100]).tolist()
+    return {
+        "count": int(len(values)),
+        "mean": float(values.mean()),
+        "min": minimum,
+        "p25": p25,
+        "median": median,
+        "p75": p75,
+        "max": maximum,
+    }
+
+
+class CohortAnalyzer:
+    """
+    全体用户的健康统计
+
+    数据在主进程中一次取出，工作进程只做计算，不访问数据库
+    """
+
+    # 每块的用户数
+    CHUNK_SIZE = 200
+
+    def __init__(self, db_manager, workers=None, chunk_size=None):
+        """
+        参数:
+            db_manager: 数据库管理器实例
+            workers: 进程数，默认为CPU核数，为1时在当前进程中计算
+            chunk_size: 每块的用户数，默认为 CHUNK_SIZE
+        """
+        self.db_manager = db_manager
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+    def load(self, start_date, end_date):
+        """
+        取出所有用户的资料和每日汇总
+
+        返回:
+            [(用户ID, 资料, 每日汇总), ...]，没有记录的用户每日汇总为空列表
+        """
+        profiles = self.db_manager.get_all_user_profiles()
+        rows = self.db_manager.get_cohort_daily_summary(start_date, end_date)
+        daily = {user_id: [row[1:] for row in group]
+                 for user_id, group in itertools.groupby(rows, key=lambda row: row[0])}
+        return [(user_id, profile, daily.get(user_id, [])) for user_id, profile in profiles.items()]
+
+    def analyze(self, start_date, end_date):
+        """
+        统计一段时间内的群体数据
+
+        参数:
+            start_date: 起始日期(YYYY-MM-DD)
+            end_date: 结束日期(YYYY-MM-DD)
+
+        返回:
+            reduce 的结果
+        """
+        users = self.load(start_date, end_date)
+        partitions = [users[i:i + self.chunk_size] for i in range(0, len(users), self.chunk_size)]
+
+        if self.workers == 1 or len(partitions) <= 1:
+            per_user = [result for partition in partitions
+                        for result in analyze_partition(partition, start_date, end_date)]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(analyze_partition, partition, start_date, end_date)
+                           for partition in partitions]
+                per_user = [result for future in futures for result in future.result()]
+
+        return self.reduce(per_user, start_date, end_date)
+
+    @staticmethod
+    def reduce(per_user, start_date, end_date):
+        """
+        把每个用户的指标归并为群体统计
+
+        只统计这段时间内有记录的用户；摄入和睡眠只统计有对应记录的用户
+
+        返回:
+            {"start_date", "end_date", "users", "active_users",
+             "distributions": {指标: 分布或None}, "meets_exercise", "meets_sleep", "meets_both"}，
+            达标比例为有记录用户中的百分比
+        """
+        active = [result for result in per_user if result["active"]]
+        count = len(active)
+
+        def share(predicate):
+            return sum(1 for result in active if predicate(result)) / count * 100 if count else 0.0
+
+        return {
+            "start_date": start_date,
+            "end_date": end_date,
+            "users": len(per_user),
+            "active_users": count,
+            "distributions": {
+                metric: distribution([result[metric] for result in active if result[metric] is not None])
+                for metric in METRICS
+            },
+            "meets_exercise": share(lambda result: result["meets_exercise"]),
+            "meets_sleep": share(lambda result: result["meets_sleep"]),
+            "meets_both": share(lambda result: result["meets_exercise"] and result["meets_sleep"]),
+        }
+
+
+def format_cohort(stats):
+    """群体统计的文字报告"""
+    lines = [
+        f"群体健康统计 {stats['start_date']} 至 {stats['end_date']}",
+        f"用户数: {stats['users']}，有记录的用户: {stats['active_users']}",
+        "",
+        f"{'指标':<16}{'人数':>6}{'平均':>10}{'最小':>10}{'25%':>10}{'中位数':>10}{'75%':>10}{'最大':>10}",
+    ]
+    for metric, name in METRICS.items():
+        dist = stats["distributions"][metric]
+        if dist is None:
+            lines.append(f"{name:<16}{0:>6}")
+            continue
+        lines.append(
+            f"{name:<16}{dist['count']:>6}{dist['mean']:>10.1f}{dist['min']:>10.1f}{dist['p25']:>10.1f}"
+            f"{dist['median']:>10.1f}{dist['p75']:>10.1f}{dist['max']:>10.1f}"
+        )
+    lines += [
+        "",
+        f"达到每周150分钟运动推荐: {stats['meets_exercise']:.1f}%",
+        f"达到推荐睡眠时间: {stats['meets_sleep']:.1f}%",
+        f"两项均达到: {stats['meets_both']:.1f}%",
+    ]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    today = datetime.date.today()
+    week_start = today - datetime.timedelta(days=today.weekday())
+
+    parser = argparse.ArgumentParser(description="统计数据库中全体用户的健康数据")
+    parser.add_argument("--db", default="database/health_life.db", help="数据库文件路径")
+    parser.add_argument("--start", default=week_start.isoformat(), help="起始日期 YYYY-MM-DD，默认为本周一")
+    parser.add_argument("--end", help="结束日期 YYYY-MM-DD，默认为起始日期后第6天")
+    parser.add_argument("--workers", type=int, help="进程数，默认为CPU核数")
+    parser.add_argument("--chunk-size", type=int, help="每个任务的用户数")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    args = parser.parse_args(argv)
+
+    end = args.end or (datetime.date.fromisoformat(args.start) + datetime.timedelta(days=6)).isoformat()
+
+    from database.db_manager import DatabaseManager
+    # 数据库的日志输出到标准错误，标准输出只有报告
+    with contextlib.redirect_stdout(sys.stderr):
+        db_manager = DatabaseManager(args.db)
+        try:
+            stats = CohortAnalyzer(db_manager, args.workers, args.chunk_size).analyze(args.start, end)
+        finally:
+            db_manager.close()
+
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+    else:
+        print(format_cohort(stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+时间序列降采样工具
+使用 Largest-Triangle-Three-Buckets (LTTB) 算法把长序列压缩到像素宽度，
+在保留峰谷形状的前提下让图表绘制成本与数据跨度无关
+"""
+
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """
+    LTTB降采样
+
+    参数:
+        x: 横坐标数组（单调递增）
+        y: 纵坐标数组，NaN表示缺失值，会在降采样前被剔除
+        threshold: 目标点数（通常为绘图区域的像素宽度）
+
+    返回:
+        (x, y) 降采样后的两个numpy数组
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # 剔除缺失值
+    valid = ~np.isnan(y)
+    x = x[valid]
+    y = y[valid]
+
+    n = len(x)
+    threshold = int(threshold)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # 首尾两点固定保留，中间的点均分到 threshold-2 个桶中
+    bucket_edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+
+    sampled = np.empty(threshold, dtype=int)
+    sampled[0] = 0
+    sampled[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bucket_edges[i], bucket_edges[i + 1]
+        if end <= start:
+            end = start + 1
+
+        # 下一个桶的平均点作为第三个顶点
+        next_start = bucket_edges[i + 1]
+        next_end = bucket_edges[i + 2] if i + 2 < len(bucket_edges) else n
+        if next_end <= next_start:
+            next_end = next_start + 1
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # 向量化计算当前桶内每个点与前一选中点、下一桶均值构成的三角形面积
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs(
+            (x[a] - avg_x) * (bucket_y - y[a]) - (x[a] - bucket_x) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        sampled[i + 1] = a
+
+    return x[sampled], y[sampled]
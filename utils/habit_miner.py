@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+作息习惯挖掘
+根据饮食、运动和睡眠记录的发生时刻统计用户的习惯时间，并据此推荐重复提醒。
+全部统计用一次 bincount 完成，数月的记录也只需几毫秒
+"""
+
+import datetime
+
+import numpy as np
+
+from utils.recurrence import RecurrenceRule
+
+
+class HabitSuggestion:
+    """一条推荐的重复提醒"""
+
+    def __init__(self, reminder_type, content, frequency, time_of_day, weekdays=None,
+                 habit_time=None, count=0, stability=0.0):
+        self.reminder_type = reminder_type
+        self.content = content
+        self.frequency = frequency
+        self.time_of_day = time_of_day      # 提醒时间 HH:MM
+        self.weekdays = weekdays or []
+        self.habit_time = habit_time        # 习惯发生的时间 HH:MM
+        self.count = count                  # 支持该习惯的记录次数
+        self.stability = stability          # 落在习惯时间附近的记录比例
+
+    def describe(self):
+        """推荐的中文描述"""
+        rule = RecurrenceRule(None, self.frequency, self.time_of_day, self.weekdays)
+        return (f"{rule.describe()} {self.reminder_type}: {self.content}"
+                f"（通常{self.habit_time}，{self.count}次记录，稳定度{self.stability:.0%}）")
+
+
+class HabitMiner:
+    """
+    作息习惯分析器
+
+    每个习惯（饮食按餐次，运动，睡眠）分工作日和周末各建一个一天96格（每格15分钟）的时刻直方图，
+    环形平滑后取峰值作为习惯时间；峰值附近的记录比例足够高时认为习惯稳定。
+    工作日和周末的习惯时间相差较大时分别推荐，否则推荐每天重复
+    """
+
+    BIN_MINUTES = 15
+    BINS = 24 * 60 // BIN_MINUTES
+
+    # 峰值前后该分钟数内的记录视为同一习惯
+    WINDOW_MINUTES = 45
+    # 习惯成立所需的最少记录次数和最低稳定度
+    MIN_COUNT = 5
+    MIN_STABILITY = 0.6
+    # 工作日与周末的习惯时间相差超过该分钟数时分别推荐
+    SPLIT_MINUTES = 60
+
+    # 习惯 -> (提醒类型, 提醒内容, 提前提醒的分钟数)
+    HABITS = {
+        ("diet", "早餐"): ("饮食", "该吃早餐了", 15),
+        ("diet", "午餐"): ("饮食", "该吃午餐了", 15),
+        ("diet", "晚餐"): ("饮食", "该吃晚餐了", 15),
+        ("diet", "加餐"): ("饮食", "可以适当加餐", 0),
+        ("exercise", "运动"): ("运动", "准备开始今天的运动", 30),
+        ("sleep", "睡眠"): ("睡眠", "准备休息，放下手机", 30),
+    }
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def analyze(self, user_id, days=90, end_date=None):
+        """
+        分析最近一段时间的记录
+
+        参数:
+            user_id: 用户ID
+            days: 分析的天数
+            end_date: 结束日期(datetime.date)，默认为今天
+
+        返回:
+            [HabitSuggestion, ...]
+        """
+        end = end_date or datetime.date.today()
+        start = end - datetime.timedelta(days=days - 1)
+        rows = self.db_manager.get_activity_times(
+            user_id, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+        )
+        return self.suggest(rows)
+
+    def suggest(self, rows):
+        """
+        根据记录时刻生成推荐
+
+        参数:
+            rows: [(类别, 名称, 星期(0为周日), 当天分钟数), ...]
+        """
+        habits = list(self.HABITS)
+        habit_index = {habit: index for index, habit in enumerate(habits)}
+        rows = [row for row in rows if (row[0], row[1]) in habit_index]
+        if not rows:
+            return []
+
+        group = np.array([habit_index[(row[0], row[1])] for row in rows])
+        weekday = np.array([row[2] for row in rows])
+        minutes = np.array([row[3] for row in rows]) % (24 * 60)
+        weekend = ((weekday == 0) | (weekday == 6)).astype(int)
+
+        # 直方图形状为 (习惯, 工作日/周末, 时间格)
+        cell = (group * 2 + weekend) * self.BINS + minutes // self.BIN_MINUTES
+        hist = np.bincount(cell, minlength=len(habits) * 2 * self.BINS).astype(float)
+        hist = hist.reshape(len(habits), 2, self.BINS)
+
+        # 环形平滑，午夜前后的记录（如睡眠）不会被切成两段
+        smooth = 2 * hist + np.roll(hist, 1, axis=2) + np.roll(hist, -1, axis=2)
+        peaks = smooth.argmax(axis=2) * self.BIN_MINUTES + self.BIN_MINUTES // 2
+
+        # 每条记录距其所属分组峰值的环形距离
+        peak = peaks[group, weekend]
+        distance = np.abs((minutes - peak + 720) % 1440 - 720)
+        near = distance <= self.WINDOW_MINUTES
+        counts = hist.sum(axis=2)
+        near_counts = np.bincount(group * 2 + weekend, weights=near,
+                                  minlength=len(habits) * 2).reshape(len(habits), 2)
+
+        # 用峰值附近记录的平均时刻细化习惯时间（按相对峰值的偏移求平均，跨午夜也成立）
+        offset = (minutes - peak + 720) % 1440 - 720
+        offset_sums = np.bincount(group * 2 + weekend, weights=np.where(near, offset, 0),
+                                  minlength=len(habits) * 2).reshape(len(habits), 2)
+        habit_minutes = (peaks + offset_sums / np.maximum(near_counts, 1)) % 1440
+
+        suggestions = []
+        for index, habit in enumerate(habits):
+            parts = []
+            for part in (0, 1):
+                total = counts[index, part]
+                stability = near_counts[index, part] / total if total else 0.0
+                parts.append((total, stability, habit_minutes[index, part]))
+            suggestions.extend(self.build(habit, parts))
+        return suggestions
+
+    def build(self, habit, parts):
+        """根据工作日和周末的统计结果生成一个习惯的推荐"""
+        reminder_type, content, lead = self.HABITS[habit]
+        weekday_part, weekend_part = parts
+
+        def stable(part, min_count):
+            return part[0] >= min_count and part[1] >= self.MIN_STABILITY
+
+        def make(frequency, part, total, weekdays=None):
+            habit_minute = int(round(part[2] / 5)) * 5 % 1440
+            remind_minute = (habit_minute - lead) % 1440
+            if habit_minute < lead and frequency != "daily":
+                # 提前提醒跨过午夜，提醒落在习惯发生的前一天
+                days = [0, 1, 2, 3, 4] if frequency == "weekdays" else weekdays
+                frequency, weekdays = "weekly", sorted((day - 1) % 7 for day in days)
+            return HabitSuggestion(
+                reminder_type, content, frequency, self.format_minute(remind_minute), weekdays,
+                habit_time=self.format_minute(habit_minute), count=int(total), stability=float(part[1])
+            )
+
+        # 周末只有两天，所需次数按比例降低
+        weekday_ok = stable(weekday_part, self.MIN_COUNT)
+        weekend_ok = stable(weekend_part, max(2, self.MIN_COUNT * 2 // 5))
+        gap = abs((weekday_part[2] - weekend_part[2] + 720) % 1440 - 720)
+
+        if weekday_ok and weekend_ok and gap >= self.SPLIT_MINUTES:
+            return [
+                make("weekdays", weekday_part, weekday_part[0]),
+                make("weekly", weekend_part, weekend_part[0], [5, 6]),
+            ]
+        if weekday_ok != weekend_ok:
+            if weekday_ok:
+                return [make("weekdays", weekday_part, weekday_part[0])]
+            return [make("weekly", weekend_part, weekend_part[0], [5, 6])]
+
+        # 合并两部分，习惯时间按记录数加权
+        total = weekday_part[0] + weekend_part[0]
+        if total < self.MIN_COUNT:
+            return []
+        stability = (weekday_part[0] * weekday_part[1] + weekend_part[0] * weekend_part[1]) / total
+        if stability < self.MIN_STABILITY:
+            return []
+        delta = (weekend_part[2] - weekday_part[2] + 720) % 1440 - 720
+        minute = (weekday_part[2] + delta * weekend_part[0] / total) % 1440
+        return [make("daily", (total, stability, minute), total)]
+
+    @staticmethod
+    def format_minute(minute):
+        """当天分钟数转换为 HH:MM"""
+        minute = int(minute) % 1440
+        return f"{minute // 60:02d}:{minute % 60:02d}"
+
+    def existing_rule_matches(self, user_id):
+        """用户已有的重复规则，返回 {(提醒类型, 重复类型): [提醒分钟数, ...]}"""
+        existing = {}
+        for row in self.db_manager.get_reminder_rules(user_id):
+            try:
+                rule = RecurrenceRule.from_row(row)
+            except ValueError:
+                continue
+            minute = rule.time_of_day.hour * 60 + rule.time_of_day.minute
+            existing.setdefault((row[2], rule.frequency), []).append(minute)
+        return existing
+
+    def filter_new(self, user_id, suggestions):
+        """去掉与已有规则时间相近（30分钟内）的推荐"""
+        existing = self.existing_rule_matches(user_id)
+        result = []
+        for suggestion in suggestions:
+            hour, minute = map(int, suggestion.time_of_day.split(":"))
+            value = hour * 60 + minute
+            minutes = existing.get((suggestion.reminder_type, suggestion.frequency), [])
+            if all(abs((value - other + 720) % 1440 - 720) > 30 for other in minutes):
+                result.append(suggestion)
+        return result
+
+    def apply(self, user_id, suggestions):
+        """
+        把推荐创建为重复提醒规则
+
+        返回:
+            成功创建的规则ID列表
+        """
+        start_date = datetime.date.today().strftime('%Y-%m-%d')
+        rule_ids = []
+        for suggestion in suggestions:
+            rule_id = self.db_manager.add_reminder_rule(
+                user_id, suggestion.reminder_type, suggestion.content, suggestion.frequency,
+                suggestion.time_of_day,
+                weekdays=suggestion.weekdays if suggestion.frequency == "weekly" else None,
+                start_date=start_date
+            )
+            if rule_id:
+                rule_ids.append(rule_id)
+        return rule_ids
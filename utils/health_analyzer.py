@@ -1,9 +1,128 @@
 import datetime
 import math
 
+import numpy as np
+
+# 每日数据的列，与 DatabaseManager.get_daily_trend_summary 返回的字段顺序一致
+DAILY_FIELDS = ("intake", "burned", "exercise", "sleep", "quality", "protein", "fat", "carbs")
+COLUMN = {field: index for index, field in enumerate(DAILY_FIELDS)}
+
+
+class DailyArrays:
+    """
+    按天对齐的健康数据
+
+    values 每行对应一天，列顺序见 DAILY_FIELDS，没有记录的位置为NaN；
+    dates 为每行对应的日期字符串。所有统计都在整列上一次完成，分析几年的数据与分析一周的写法相同
+    """
+
+    def __init__(self, dates, values):
+        self.dates = dates
+        self.values = values
+
+    @classmethod
+    def from_daily_rows(cls, rows, start_date, end_date):
+        """
+        由 get_daily_trend_summary 的结果构建，范围内的每一天占一行
+
+        参数:
+            rows: [(日期, 摄入热量, 消耗热量, 运动分钟, 睡眠分钟, 睡眠质量, 蛋白质, 脂肪, 碳水), ...]
+            start_date: 起始日期(YYYY-MM-DD 或 datetime.date)
+            end_date: 结束日期(YYYY-MM-DD 或 datetime.date)
+        """
+        start = np.datetime64(str(start_date), "D")
+        end = np.datetime64(str(end_date), "D")
+        dates = np.arange(start, end + 1, dtype="datetime64[D]")
+        values = np.full((len(dates), len(DAILY_FIELDS)), np.nan)
+
+        if rows:
+            offsets = (np.array([row[0] for row in rows], dtype="datetime64[D]") - start).astype(int)
+            data = np.array([row[1:1 + len(DAILY_FIELDS)] for row in rows], dtype=float)
+            inside = (offsets >= 0) & (offsets < len(dates))
+            values[offsets[inside]] = data[inside]
+
+        return cls(dates.astype(str), values)
+
+    @classmethod
+    def from_summaries(cls, exercise_data, diet_data, sleep_data):
+        """
+        由三份按天汇总的数据构建，只包含有记录的日期
+
+        参数:
+            exercise_data: [(日期, 总时长, 消耗卡路里), ...]
+            diet_data: [(日期, 总卡路里, 蛋白质, 脂肪, 碳水), ...]
+            sleep_data: [(日期, 平均时长, 平均质量), ...]
+        """
+        sources = (
+            (exercise_data, ("exercise", "burned")),
+            (diet_data, ("intake", "protein", "fat", "carbs")),
+            (sleep_data, ("sleep", "quality")),
+        )
+        dates = sorted({record[0] for data, _ in sources for record in data or []})
+        slot = {date: index for index, date in enumerate(dates)}
+        values = np.full((len(dates), len(DAILY_FIELDS)), np.nan)
+
+        for data, fields in sources:
+            if not data:
+                continue
+            rows = [slot[record[0]] for record in data]
+            columns = [COLUMN[field] for field in fields]
+            values[np.ix_(rows, columns)] = np.array([record[1:1 + len(fields)] for record in data], dtype=float)
+
+        return cls(np.array(dates, dtype=str), values)
+
+    def summarize(self):
+        """
+        一次求出各字段的合计和有记录的天数
+
+        返回:
+            {"total_days": 有任一记录的天数, "days": {字段: 天数}, "totals": {字段: 合计}, "dates": [有记录的日期, ...]}，
+            结构与 RollingStatsStore.get_summary 相同
+        """
+        present = ~np.isnan(self.values)
+        recorded = present.any(axis=1)
+        return {
+            "total_days": int(recorded.sum()),
+            "days": dict(zip(DAILY_FIELDS, present.sum(axis=0).tolist())),
+            "totals": dict(zip(DAILY_FIELDS, np.nansum(self.values, axis=0).tolist())),
+            "dates": self.dates[recorded].tolist(),
+        }
+
+    def series(self, fields=("intake", "burned", "sleep")):
+        """
+        绘制图表用的每日序列
+
+        返回:
+            {"dates": [日期, ...], 字段: [值或None, ...]}，没有记录的位置为None
+        """
+        series = {"dates": self.dates.tolist()}
+        for field in fields:
+            column = self.values[:, COLUMN[field]]
+            series[field] = [None if math.isnan(value) else _number(value) for value in column.tolist()]
+        return series
+
+
+def _number(value):
+    """NumPy标量转换为Python数值，整数值保持为int"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _ratio(part, whole, scale=1):
+    """按元素计算 part / whole * scale，分母为0的位置为0"""
+    part = np.asarray(part, dtype=float)
+    whole = np.broadcast_to(np.asarray(whole, dtype=float), part.shape)
+    result = np.zeros_like(part)
+    np.divide(part, whole, out=result, where=whole > 0)
+    return result * scale
+
+
 class HealthAnalyzer:
     """健康数据分析器，用于生成健康报告和建议"""
     
+    # 世界卫生组织推荐的每周中等强度运动时间（分钟）
+    WEEKLY_EXERCISE_MINUTES = 150
+    
     def __init__(self, user_profile=None):
         """初始化健康分析器
         
@@ -11,6 +130,8 @@ class HealthAnalyzer:
             user_profile: 用户资料，包含性别、年龄、身高、体重等信息
         """
         self.user_profile = user_profile or {}
+        # 建议文字中对分析时段的称呼
+        self.period = "本周"
         
     def analyze_weekly_data(self, exercise_data, diet_data, sleep_data, user_profile=None):
         """分析每周健康数据，生成报告和建议
@@ -24,23 +145,59 @@ class HealthAnalyzer:
         返回:
             包含分析结果和建议的字典
         """
+        daily = DailyArrays.from_summaries(exercise_data, diet_data, sleep_data)
+        return self.analyze(daily, 7, user_profile, "本周")
+        
+    def analyze_range(self, daily_rows, start_date, end_date, user_profile=None, period=None):
+        """分析任意日期范围的健康数据，从一周到数年用法相同
+        
+        参数:
+            daily_rows: DatabaseManager.get_daily_trend_summary 的结果
+            start_date: 起始日期(YYYY-MM-DD 或 datetime.date)
+            end_date: 结束日期(YYYY-MM-DD 或 datetime.date)
+            user_profile: 用户资料（可选）
+            period: 建议文字中对该时段的称呼，默认7天为"本周"，其余为"这段时间"
+            
+        返回:
+            与 analyze_weekly_data 相同结构的字典
+        """
+        daily = DailyArrays.from_daily_rows(daily_rows, start_date, end_date)
+        range_days = len(daily.dates)
+        if period is None:
+            period = "本周" if range_days == 7 else "这段时间"
+        return self.analyze(daily, range_days, user_profile, period)
+        
+    def analyze(self, daily, range_days, user_profile=None, period="本周"):
+        """分析按天对齐的数据
+        
+        参数:
+            daily: DailyArrays
+            range_days: 分析范围的天数，用于按比例换算每周运动目标
+            user_profile: 用户资料（可选）
+            period: 建议文字中对该时段的称呼
+        """
+        results = self.analyze_summary(daily.summarize(), range_days, user_profile, period)
+        results["series"] = daily.series()
+        return results
+        
+    def analyze_summary(self, summary, range_days, user_profile=None, period="本周"):
+        """根据各字段的合计和天数生成统计和建议
+        
+        参数:
+            summary: DailyArrays.summarize 或 RollingStatsStore.get_summary 的结果
+            range_days: 分析范围的天数，用于按比例换算每周运动目标
+            user_profile: 用户资料（可选）
+            period: 建议文字中对该时段的称呼
+        """
         # 如果提供了用户资料，则更新
         if user_profile:
             self.user_profile = user_profile
-            
-        # 对数据进行预处理，确保日期可比较
-        exercise_dict = {record[0]: (record[1], record[2]) for record in exercise_data} if exercise_data else {}
-        diet_dict = {record[0]: (record[1], record[2], record[3], record[4]) for record in diet_data} if diet_data else {}
-        sleep_dict = {record[0]: (record[1], record[2]) for record in sleep_data} if sleep_data else {}
-        
-        # 获取所有不同的日期
-        all_dates = set(exercise_dict.keys()).union(set(diet_dict.keys())).union(set(sleep_dict.keys()))
-        all_dates = sorted(all_dates)
+        self.period = period
         
         # 计算每个方面的统计数据
-        exercise_stats = self._analyze_exercise(exercise_dict, all_dates)
-        diet_stats = self._analyze_diet(diet_dict, all_dates)
-        sleep_stats = self._analyze_sleep(sleep_dict, all_dates)
+        exercise_stats = self._analyze_exercise(summary, range_days)
+        diet_stats = self._analyze_diet(summary)
+        sleep_stats = self._analyze_sleep(summary)
         
         # 生成健康建议
         exercise_advice = self._generate_exercise_advice(exercise_stats)
@@ -58,106 +215,103 @@ class HealthAnalyzer:
             "diet_advice": diet_advice,
             "sleep_advice": sleep_advice,
             "overall_advice": overall_advice,
-            "dates": list(all_dates)
+            "dates": summary.get("dates", [])
         }
         
-    def _analyze_exercise(self, exercise_dict, all_dates):
+    def _analyze_exercise(self, summary, range_days):
         """分析运动数据"""
-        total_days = len(all_dates)
-        exercise_days = len(exercise_dict)
-        total_duration = sum(record[0] for record in exercise_dict.values()) if exercise_dict else 0
-        total_calories = sum(record[1] for record in exercise_dict.values()) if exercise_dict else 0
+        total_days = summary["total_days"]
+        exercise_days = int(summary["days"]["exercise"])
+        total_duration = summary["totals"]["exercise"]
+        total_calories = summary["totals"]["burned"]
         
         # 计算平均值
-        avg_duration_per_day = total_duration / total_days if total_days > 0 else 0
-        avg_duration_per_exercise_day = total_duration / exercise_days if exercise_days > 0 else 0
-        avg_calories_per_day = total_calories / total_days if total_days > 0 else 0
+        avg_duration_per_day, avg_calories_per_day = _ratio([total_duration, total_calories], total_days)
+        avg_duration_per_exercise_day = _ratio(total_duration, exercise_days)
         
-        # 计算达标情况（每周至少150分钟中等强度运动）
-        weekly_recommendation = 150  # 分钟
-        target_percentage = (total_duration / weekly_recommendation) * 100 if weekly_recommendation > 0 else 0
+        # 计算达标情况（每周至少150分钟中等强度运动，按范围天数换算）
+        recommendation = self.WEEKLY_EXERCISE_MINUTES * range_days / 7
+        target_percentage = float(_ratio(total_duration, recommendation, 100))
         
         return {
             "total_days": total_days,
+            "range_days": range_days,
             "exercise_days": exercise_days,
-            "exercise_percentage": (exercise_days / total_days * 100) if total_days > 0 else 0,
-            "total_duration": total_duration,
-            "total_calories": total_calories,
-            "avg_duration_per_day": avg_duration_per_day,
-            "avg_duration_per_exercise_day": avg_duration_per_exercise_day,
-            "avg_calories_per_day": avg_calories_per_day,
+            "exercise_percentage": float(_ratio(exercise_days, total_days, 100)),
+            "total_duration": _number(total_duration),
+            "total_calories": _number(total_calories),
+            "avg_duration_per_day": float(avg_duration_per_day),
+            "avg_duration_per_exercise_day": float(avg_duration_per_exercise_day),
+            "avg_calories_per_day": float(avg_calories_per_day),
             "target_percentage": target_percentage,
             "meets_recommendation": target_percentage >= 100
         }
         
-    def _analyze_diet(self, diet_dict, all_dates):
+    def _analyze_diet(self, summary):
         """分析饮食数据"""
-        # 计算总摄入量
-        total_calories = sum(record[0] for record in diet_dict.values()) if diet_dict else 0
-        total_protein = sum(record[1] for record in diet_dict.values()) if diet_dict else 0
-        total_fat = sum(record[2] for record in diet_dict.values()) if diet_dict else 0
-        total_carbs = sum(record[3] for record in diet_dict.values()) if diet_dict else 0
-        
-        # 计算平均摄入量
-        total_days = len(all_dates)
-        avg_calories_per_day = total_calories / total_days if total_days > 0 else 0
-        avg_protein_per_day = total_protein / total_days if total_days > 0 else 0
-        avg_fat_per_day = total_fat / total_days if total_days > 0 else 0
-        avg_carbs_per_day = total_carbs / total_days if total_days > 0 else 0
+        total_days = summary["total_days"]
+        diet_days = int(summary["days"]["intake"])
+        
+        # 总摄入量和日均摄入量，四项一起计算
+        totals = np.array([summary["totals"][field] for field in ("intake", "protein", "fat", "carbs")])
+        averages = _ratio(totals, total_days)
         
         # 计算推荐摄入量（根据用户资料）
         recommended_calories = self._calculate_recommended_calories()
-        recommended_protein = self._calculate_recommended_protein()
-        recommended_fat = self._calculate_recommended_fat(recommended_calories)
-        recommended_carbs = self._calculate_recommended_carbs(recommended_calories)
-        
-        # 计算营养素比例
-        total_macros = total_protein * 4 + total_fat * 9 + total_carbs * 4  # 卡路里
-        protein_ratio = (total_protein * 4 / total_macros * 100) if total_macros > 0 else 0
-        fat_ratio = (total_fat * 9 / total_macros * 100) if total_macros > 0 else 0
-        carbs_ratio = (total_carbs * 4 / total_macros * 100) if total_macros > 0 else 0
+        recommended = np.array([
+            recommended_calories,
+            self._calculate_recommended_protein(),
+            self._calculate_recommended_fat(recommended_calories),
+            self._calculate_recommended_carbs(recommended_calories),
+        ])
+        percentages = _ratio(averages, recommended, 100)
+        
+        # 计算营养素比例（蛋白质、脂肪、碳水每克的卡路里）
+        macro_calories = totals[1:] * np.array([4, 9, 4])
+        ratios = _ratio(macro_calories, macro_calories.sum(), 100)
+        
+        total_calories, total_protein, total_fat, total_carbs = totals.tolist()
+        avg_calories, avg_protein, avg_fat, avg_carbs = averages.tolist()
+        protein_ratio, fat_ratio, carbs_ratio = ratios.tolist()
+        calories_percentage, protein_percentage, fat_percentage, carbs_percentage = percentages.tolist()
         
         return {
             "total_days": total_days,
-            "diet_days": len(diet_dict),
+            "diet_days": diet_days,
             "total_calories": total_calories,
             "total_protein": total_protein,
             "total_fat": total_fat,
             "total_carbs": total_carbs,
-            "avg_calories_per_day": avg_calories_per_day,
-            "avg_protein_per_day": avg_protein_per_day,
-            "avg_fat_per_day": avg_fat_per_day,
-            "avg_carbs_per_day": avg_carbs_per_day,
+            "avg_calories_per_day": avg_calories,
+            "avg_protein_per_day": avg_protein,
+            "avg_fat_per_day": avg_fat,
+            "avg_carbs_per_day": avg_carbs,
             "recommended_calories": recommended_calories,
-            "recommended_protein": recommended_protein,
-            "recommended_fat": recommended_fat,
-            "recommended_carbs": recommended_carbs,
+            "recommended_protein": int(recommended[1]),
+            "recommended_fat": int(recommended[2]),
+            "recommended_carbs": int(recommended[3]),
             "protein_ratio": protein_ratio,
             "fat_ratio": fat_ratio,
             "carbs_ratio": carbs_ratio,
-            "calories_percentage": (avg_calories_per_day / recommended_calories * 100) if recommended_calories > 0 else 0,
-            "protein_percentage": (avg_protein_per_day / recommended_protein * 100) if recommended_protein > 0 else 0,
-            "fat_percentage": (avg_fat_per_day / recommended_fat * 100) if recommended_fat > 0 else 0,
-            "carbs_percentage": (avg_carbs_per_day / recommended_carbs * 100) if recommended_carbs > 0 else 0
+            "calories_percentage": calories_percentage,
+            "protein_percentage": protein_percentage,
+            "fat_percentage": fat_percentage,
+            "carbs_percentage": carbs_percentage
         }
         
-    def _analyze_sleep(self, sleep_dict, all_dates):
+    def _analyze_sleep(self, summary):
         """分析睡眠数据"""
-        # 计算总睡眠时间和质量
-        total_duration = sum(record[0] for record in sleep_dict.values()) if sleep_dict else 0
+        total_days = summary["total_days"]
+        sleep_days = int(summary["days"]["sleep"])
+        total_duration = summary["totals"]["sleep"]
         
         # 计算平均值
-        total_days = len(all_dates)
-        sleep_days = len(sleep_dict)
-        avg_duration_per_day = total_duration / total_days if total_days > 0 else 0
-        avg_duration_per_sleep_day = total_duration / sleep_days if sleep_days > 0 else 0
-        
-        # 计算平均质量
-        if sleep_dict:
-            quality_values = [record[1] for record in sleep_dict.values() if record[1] is not None]
-            avg_quality = sum(quality_values) / len(quality_values) if quality_values else 0
-        else:
-            avg_quality = 0
+        avg_duration_per_day = float(_ratio(total_duration, total_days))
+        avg_duration_per_sleep_day = float(_ratio(total_duration, sleep_days))
+        
+        # 计算平均质量（只统计有评分的天）
+        rated_days = summary["days"]["quality"]
+        avg_quality = summary["totals"]["quality"] / rated_days if rated_days else 0
             
         # 计算推荐睡眠时间
         recommended_sleep = self._calculate_recommended_sleep()
@@ -165,8 +319,8 @@ class HealthAnalyzer:
         return {
             "total_days": total_days,
             "sleep_days": sleep_days,
-            "sleep_percentage": (sleep_days / total_days * 100) if total_days > 0 else 0,
-            "total_duration": total_duration,
+            "sleep_percentage": float(_ratio(sleep_days, total_days, 100)),
+            "total_duration": _number(total_duration),
             "avg_duration_per_day": avg_duration_per_day,
             "avg_duration_per_sleep_day": avg_duration_per_sleep_day,
             "avg_quality": avg_quality,
@@ -181,22 +335,22 @@ class HealthAnalyzer:
         
         # 检查是否达到每周150分钟中等强度运动的推荐
         if stats["meets_recommendation"]:
-            advice.append("您本周的运动时间达到了世界卫生组织推荐的每周至少150分钟中等强度运动的标准，请继续保持。")
+            advice.append(f"您{self.period}的运动时间达到了世界卫生组织推荐的每周至少150分钟中等强度运动的标准，请继续保持。")
         else:
             target_percentage = stats["target_percentage"]
             if target_percentage < 30:
-                advice.append("您本周的运动时间远低于推荐标准。建议逐步增加运动时间，可以从每天散步15-30分钟开始。")
+                advice.append(f"您{self.period}的运动时间远低于推荐标准。建议逐步增加运动时间，可以从每天散步15-30分钟开始。")
             elif target_percentage < 60:
-                advice.append("您本周的运动时间不足推荐标准的60%。建议增加运动频率，尝试每天安排一些中等强度的活动，如快走、骑车等。")
+                advice.append(f"您{self.period}的运动时间不足推荐标准的60%。建议增加运动频率，尝试每天安排一些中等强度的活动，如快走、骑车等。")
             else:
-                advice.append(f"您本周的运动时间已达到推荐标准的{target_percentage:.1f}%。再稍加努力，即可达到每周150分钟的推荐运动时间。")
+                advice.append(f"您{self.period}的运动时间已达到推荐标准的{target_percentage:.1f}%。再稍加努力，即可达到每周150分钟的推荐运动时间。")
         
         # 检查运动频率
         exercise_days = stats["exercise_days"]
         if exercise_days == 0:
-            advice.append("本周没有记录任何运动。建议每周至少进行3天的中等强度有氧运动，对心肺功能和整体健康有益。")
-        elif exercise_days < 3:
-            advice.append(f"本周仅有{exercise_days}天进行了运动。建议将运动分散到每周至少3-5天，有助于保持运动习惯和提高身体素质。")
+            advice.append(f"{self.period}没有记录任何运动。建议每周至少进行3天的中等强度有氧运动，对心肺功能和整体健康有益。")
+        elif exercise_days < 3 * max(stats["range_days"] / 7, 1):
+            advice.append(f"{self.period}仅有{exercise_days}天进行了运动。建议将运动分散到每周至少3-5天，有助于保持运动习惯和提高身体素质。")
         
         # 根据平均每天运动时间提供建议
         avg_duration_per_day = stats["avg_duration_per_day"]
@@ -214,7 +368,7 @@ class HealthAnalyzer:
         # 检查总热量摄入
         calories_percentage = stats["calories_percentage"]
         if calories_percentage == 0:
-            advice.append("本周没有记录任何饮食数据。建议记录您的日常饮食，以便更好地分析和调整饮食结构。")
+            advice.append(f"{self.period}没有记录任何饮食数据。建议记录您的日常饮食，以便更好地分析和调整饮食结构。")
             return advice
             
         if calories_percentage > 110:
@@ -259,7 +413,7 @@ class HealthAnalyzer:
         
         sleep_days = stats["sleep_days"]
         if sleep_days == 0:
-            advice.append("本周没有记录任何睡眠数据。建议每晚保持规律的睡眠习惯，这对身心健康至关重要。")
+            advice.append(f"{self.period}没有记录任何睡眠数据。建议每晚保持规律的睡眠习惯，这对身心健康至关重要。")
             return advice
             
         # 检查睡眠时长
@@ -285,7 +439,7 @@ class HealthAnalyzer:
         
         # 睡眠规律性建议
         if sleep_days < stats["total_days"] * 0.8:
-            advice.append(f"本周仅记录了{sleep_days}天的睡眠数据。保持规律的睡眠时间对健康十分重要，包括周末在内。")
+            advice.append(f"{self.period}仅记录了{sleep_days}天的睡眠数据。保持规律的睡眠时间对健康十分重要，包括周末在内。")
         
         return advice
         
@@ -332,6 +486,10 @@ class HealthAnalyzer:
         
         return advice
     
+    def get_recommended_calories(self):
+        """获取推荐的每日卡路里摄入量"""
+        return self._calculate_recommended_calories()
+    
     def _calculate_recommended_calories(self):
         """计算推荐的每日卡路里摄入量"""
         # 默认值
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+HTML健康报告
+使用预先编译的字符串模板生成单个HTML文件，图表为直接拼出的内联SVG，
+不依赖reportlab和matplotlib，导出只需几毫秒。内容与报告对话框、PDF报告来自同一份分析结果
+"""
+
+import datetime
+import html
+import math
+import os
+from string import Template
+
+from utils.report_text import (ADVICE_SECTIONS, TIPS, format_period, user_info_rows, trend_table,
+                               exercise_table, diet_table, nutrition_table, sleep_table)
+
+# 默认的报告输出目录，位于项目根目录下
+DEFAULT_REPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
+
+# 摄入与消耗图超过这个天数时用折线代替柱状图
+LINE_THRESHOLD = 62
+
+# 图表尺寸和边距（像素）
+CHART_WIDTH = 720
+CHART_HEIGHT = 240
+CHART_MARGIN = (40, 16, 28, 56)  # 上、右、下、左
+# 横轴最多标注的日期数
+MAX_LABELS = 12
+
+STYLE = """
+body { font-family: "Microsoft YaHei", "PingFang SC", "Noto Sans CJK SC", sans-serif; color: #2C3E50;
+       background: #F5F5F5; margin: 0; }
+main { max-width: 820px; margin: 24px auto; background: #FFFFFF; padding: 24px 40px; border: 1px solid #E0E0E0; }
+h1 { text-align: center; margin-bottom: 4px; }
+.period { text-align: center; color: #7F8C8D; margin-top: 0; }
+h2 { color: #2980B9; border-bottom: 1px solid #E0E0E0; padding-bottom: 4px; margin-top: 28px; }
+h3 { color: #27AE60; margin-bottom: 6px; }
+table { border-collapse: collapse; margin: 8px 0; }
+th, td { border: 1px solid #BDC3C7; padding: 5px 12px; text-align: center; font-size: 14px; }
+th { background: #ECF0F1; }
+ul { padding-left: 22px; line-height: 1.6; }
+svg { display: block; margin: 8px 0; }
+footer { text-align: center; color: #95A5A6; font-size: 12px; margin-top: 32px; }
+"""
+
+# 模板在导入模块时编译一次
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>$style</style>
+</head>
+<body>
+<main>
+<h1>$title</h1>
+<p class="period">$period</p>
+$sections
+<footer>长期舒适 - $generated</footer>
+</main>
+</body>
+</html>
+""")
+SECTION_TEMPLATE = Template("<section>\n<h2>$title</h2>\n$body</section>\n")
+SUBSECTION_TEMPLATE = Template("<h3>$title</h3>\n$body")
+TABLE_TEMPLATE = Template("<table>\n<thead>$head</thead>\n<tbody>\n$rows</tbody>\n</table>\n")
+LIST_TEMPLATE = Template("<ul>\n$items</ul>\n")
+CHART_TEMPLATE = Template(
+    '<svg xmlns="http://www.w3.org/2000/svg" width="$width" height="$height" viewBox="0 0 $width $height" '
+    'font-size="11" font-family="sans-serif">\n'
+    '<text x="$center" y="18" text-anchor="middle" font-size="14">$title</text>\n'
+    '$grid$series$axis$legend</svg>\n'
+)
+
+
+def escape(value):
+    return html.escape(str(value))
+
+
+def render_table(rows, header_column=False):
+    """表格的HTML，第一行为表头；header_column 为True时没有表头行，第一列为表头"""
+    if header_column:
+        body = "".join(
+            f"<tr><th>{escape(row[0])}</th>{''.join(f'<td>{escape(cell)}</td>' for cell in row[1:])}</tr>\n"
+            for row in rows
+        )
+        return TABLE_TEMPLATE.substitute(head="", rows=body)
+    head = "<tr>" + "".join(f"<th>{escape(cell)}</th>" for cell in rows[0]) + "</tr>"
+    body = "".join("<tr>" + "".join(f"<td>{escape(cell)}</td>" for cell in row) + "</tr>\n" for row in rows[1:])
+    return TABLE_TEMPLATE.substitute(head=head, rows=body)
+
+
+def render_list(items):
+    return LIST_TEMPLATE.substitute(items="".join(f"<li>{escape(item)}</li>\n" for item in items))
+
+
+def nice_ceiling(value):
+    """不小于 value 的整齐刻度上限"""
+    if value <= 0:
+        return 1
+    magnitude = 10 ** math.floor(math.log10(value))
+    for step in (1, 2, 2.5, 5, 10):
+        if value <= step * magnitude:
+            return step * magnitude
+    return 10 * magnitude
+
+
+def render_chart(title, dates, series, kind="bar", reference=None):
+    """
+    绘制一张内联SVG图表
+
+    参数:
+        title: 图表标题
+        dates: 日期字符串列表
+        series: [(图例, 颜色, [值或None, ...]), ...]
+        kind: "bar"（并排柱状图）或 "line"（折线图，None处断开）
+        reference: 参考线的数值（可选）
+    """
+    top, right, bottom, left = CHART_MARGIN
+    plot_width = CHART_WIDTH - left - right
+    plot_height = CHART_HEIGHT - top - bottom
+    count = len(dates)
+    values = [value for _, _, data in series for value in data if value is not None]
+    y_max = nice_ceiling(max(values + [reference or 0, 0]))
+    slot = plot_width / max(count, 1)
+
+    def x_at(index):
+        return left + slot * (index + 0.5)
+
+    def y_at(value):
+        return top + plot_height * (1 - value / y_max)
+
+    grid = []
+    for tick in range(5):
+        value = y_max * tick / 4
+        y = y_at(value)
+        grid.append(f'<line x1="{left}" y1="{y:.1f}" x2="{left + plot_width}" y2="{y:.1f}" stroke="#E0E0E0"/>'
+                    f'<text x="{left - 6}" y="{y + 4:.1f}" text-anchor="end">{value:g}</text>\n')
+
+    parts = []
+    if kind == "bar":
+        width = slot * 0.76 / max(len(series), 1)
+        for offset, (_, color, data) in enumerate(series):
+            rects = [
+                f'<rect x="{x_at(index) - slot * 0.38 + offset * width:.1f}" y="{y_at(value):.1f}" '
+                f'width="{width:.1f}" height="{y_at(0) - y_at(value):.1f}"/>'
+                for index, value in enumerate(data) if value
+            ]
+            parts.append(f'<g fill="{color}">{"".join(rects)}</g>\n')
+    else:
+        for _, color, data in series:
+            segments, points = [], []
+            for index, value in enumerate(data + [None]):
+                if value is None:
+                    if points:
+                        segments.append(points)
+                    points = []
+                else:
+                    points.append(f"{x_at(index):.1f},{y_at(value):.1f}")
+            lines = "".join(f'<polyline points="{" ".join(points)}"/>' for points in segments)
+            # 天数较多时只给孤立的点画圆点，否则这些天在图上看不到
+            dots = "".join(
+                f'<circle cx="{point.split(",")[0]}" cy="{point.split(",")[1]}" r="3"/>'
+                for points in segments if count <= LINE_THRESHOLD or len(points) == 1 for point in points
+            )
+            parts.append(f'<g stroke="{color}" stroke-width="1.5" fill="none">{lines}</g>'
+                         f'<g fill="{color}">{dots}</g>\n')
+    if reference is not None:
+        y = y_at(reference)
+        parts.append(f'<line x1="{left}" y1="{y:.1f}" x2="{left + plot_width}" y2="{y:.1f}" '
+                     f'stroke="#95A5A6" stroke-dasharray="5,4"/>\n')
+
+    # 日期较多时只标注部分日期，最多 MAX_LABELS 个
+    step = max(1, math.ceil(count / MAX_LABELS))
+    labels = "".join(
+        f'<text x="{x_at(index):.1f}" y="{top + plot_height + 16}" text-anchor="middle">{escape(dates[index][5:])}</text>'
+        for index in range(0, count, step)
+    )
+    axis = (f'<line x1="{left}" y1="{y_at(0):.1f}" x2="{left + plot_width}" y2="{y_at(0):.1f}" stroke="#2C3E50"/>'
+            f'{labels}\n')
+    legend = "".join(
+        f'<rect x="{left + plot_width - 80 * (len(series) - index)}" y="26" width="12" height="8" fill="{color}"/>'
+        f'<text x="{left + plot_width - 80 * (len(series) - index) + 16}" y="34">{escape(name)}</text>'
+        for index, (name, color, _) in enumerate(series)
+    )
+
+    return CHART_TEMPLATE.substitute(
+        width=CHART_WIDTH, height=CHART_HEIGHT, center=CHART_WIDTH / 2, title=escape(title),
+        grid="".join(grid), series="".join(parts), axis=axis, legend=legend + "\n",
+    )
+
+
+def render_charts(results):
+    """每日摄入与消耗热量、睡眠时长两张图，没有每日数据时为空字符串"""
+    series = results.get("series") or {}
+    dates = series.get("dates") or []
+    if not dates:
+        return ""
+    energy_kind = "line" if len(dates) > LINE_THRESHOLD else "bar"
+    sleep_hours = [None if value is None else value / 60 for value in series.get("sleep") or []]
+    return (
+        render_chart("每日摄入与消耗热量(千卡)", dates, [
+            ("摄入", "#E67E22", series.get("intake") or []),
+            ("消耗", "#27AE60", series.get("burned") or []),
+        ], energy_kind)
+        + render_chart("每日睡眠时长(小时)", dates, [("睡眠", "#2980B9", sleep_hours)], "line", reference=8)
+    )
+
+
+class HtmlReportGenerator:
+    """生成HTML格式的健康报告，参数与 WeeklyReportGenerator 相同"""
+
+    def __init__(self, analysis_results, user_info=None, output_dir=DEFAULT_REPORT_DIR,
+                 period=None, title="健康生活周报告", period_name="本周"):
+        """
+        参数:
+            analysis_results: 健康分析结果
+            user_info: 用户信息(可选)
+            output_dir: 输出目录
+            period: 报告时段 (起始日期, 结束日期)(可选)，默认为本周
+            title: 报告标题
+            period_name: 总结标题中对时段的称呼，如"本周"、"本月"
+        """
+        self.results = analysis_results
+        self.user_info = user_info or {}
+        self.output_dir = output_dir
+        self.period = period
+        self.title = title
+        self.period_name = period_name
+
+    def render(self):
+        """生成完整的HTML文本"""
+        if self.period:
+            period_start, period_end = self.period
+        else:
+            today = datetime.date.today()
+            period_start = today - datetime.timedelta(days=today.weekday())
+            period_end = period_start + datetime.timedelta(days=6)
+
+        sections = []
+        if self.user_info:
+            sections.append(SECTION_TEMPLATE.substitute(
+                title="个人信息", body=render_table(user_info_rows(self.user_info), header_column=True)))
+        sections.append(SECTION_TEMPLATE.substitute(
+            title=escape(f"{self.period_name}健康总结"), body=render_list(self.results.get("overall_advice", []))))
+
+        charts = render_charts(self.results)
+        if charts:
+            sections.append(SECTION_TEMPLATE.substitute(title="每日趋势", body=charts))
+
+        trend = trend_table(self.results)
+        if trend:
+            sections.append(SECTION_TEMPLATE.substitute(title=escape(trend[0]), body=render_table(trend[1])))
+
+        advice = dict(ADVICE_SECTIONS)
+        sections.append(SECTION_TEMPLATE.substitute(title="运动分析", body=(
+            render_table(exercise_table(self.results))
+            + SUBSECTION_TEMPLATE.substitute(title=advice["exercise_advice"],
+                                             body=render_list(self.results.get("exercise_advice", [])))
+        )))
+        sections.append(SECTION_TEMPLATE.substitute(title="饮食分析", body=(
+            render_table(diet_table(self.results))
+            + SUBSECTION_TEMPLATE.substitute(title="营养素比例", body=render_table(nutrition_table(self.results)))
+            + SUBSECTION_TEMPLATE.substitute(title=advice["diet_advice"],
+                                             body=render_list(self.results.get("diet_advice", [])))
+        )))
+        sections.append(SECTION_TEMPLATE.substitute(title="睡眠分析", body=(
+            render_table(sleep_table(self.results))
+            + SUBSECTION_TEMPLATE.substitute(title=advice["sleep_advice"],
+                                             body=render_list(self.results.get("sleep_advice", [])))
+        )))
+        sections.append(SECTION_TEMPLATE.substitute(title="温馨提示", body=render_list(TIPS)))
+
+        return PAGE_TEMPLATE.substitute(
+            title=escape(self.title),
+            style=STYLE,
+            period=escape(format_period(period_start, period_end)),
+            sections="".join(sections),
+            generated=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        )
+
+    def generate_html(self, filename=None):
+        """
+        生成HTML报告文件
+
+        参数:
+            filename: 输出文件名(可选)，如不提供将使用当前时间
+
+        返回:
+            生成的HTML文件路径
+        """
+        if not filename:
+            filename = f"健康周报_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+        if not filename.lower().endswith('.html'):
+            filename += '.html'
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        filepath = os.path.join(self.output_dir, filename)
+        temp_path = f"{filepath}.{os.getpid()}.{id(self)}.tmp"
+        try:
+            # 先写临时文件再替换，不会留下不完整的报告
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(temp_path, filepath)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return filepath
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+密码哈希
+使用 PBKDF2-HMAC-SHA256 或 scrypt 派生密码哈希，存储格式为 "算法$成本$哈希"，盐值仍存放在 salt 列；
+成本参数按本机速度校准后保存，提高成本后用户下次登录时自动重新哈希。
+哈希计算较慢，界面中通过 PasswordTask 在后台线程执行
+"""
+
+import hashlib
+import hmac
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+# 支持的算法及默认成本：PBKDF2为迭代次数，scrypt为N的以2为底的对数
+DEFAULT_COSTS = {
+    "pbkdf2_sha256": 600000,
+    "scrypt": 15,
+}
+
+# 默认使用PBKDF2，所有平台的hashlib都支持
+DEFAULT_SCHEME = "pbkdf2_sha256"
+
+# 校准目标：单次哈希耗时（毫秒）
+TARGET_MS = 250
+
+
+def derive(password, salt, scheme, cost):
+    """按算法和成本计算哈希，返回十六进制字符串"""
+    if scheme == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"), cost).hex()
+    if scheme == "scrypt":
+        n = 1 << cost
+        return hashlib.scrypt(password.encode("utf-8"), salt=salt.encode("utf-8"),
+                              n=n, r=8, p=1, maxmem=256 * n * 8 + 1024 * 1024).hex()
+    raise ValueError(f"不支持的密码哈希算法: {scheme}")
+
+
+class PasswordHasher:
+    """
+    可配置的密码哈希器
+
+    同时能验证旧版单次加盐SHA-256（不含"$"的十六进制串）和盐值为空的明文旧密码，这两种格式总是需要重新哈希；
+    明文旧密码通常由 database.migrations 在后台统一升级，迁移尚未处理到的用户登录时在这里验证
+    """
+
+    def __init__(self, scheme=None, cost=None):
+        self.scheme = scheme or DEFAULT_SCHEME
+        if self.scheme not in DEFAULT_COSTS:
+            raise ValueError(f"不支持的密码哈希算法: {self.scheme}")
+        if self.scheme == "scrypt" and not hasattr(hashlib, "scrypt"):
+            raise ValueError("当前Python不支持scrypt")
+        self.cost = int(cost or DEFAULT_COSTS[self.scheme])
+
+    def hash(self, password, salt):
+        """
+        哈希密码
+
+        返回:
+            存储到 password 列的字符串 "算法$成本$哈希"
+        """
+        return f"{self.scheme}${self.cost}${derive(password, salt, self.scheme, self.cost)}"
+
+    def verify(self, password, stored, salt):
+        """验证密码是否与存储的哈希匹配"""
+        if not salt:
+            # 明文旧密码
+            return hmac.compare_digest(password.encode("utf-8"), (stored or "").encode("utf-8"))
+        if "$" not in stored:
+            # 旧版单次加盐SHA-256
+            legacy = hashlib.sha256((password + salt).encode("utf-8")).hexdigest()
+            return hmac.compare_digest(legacy, stored)
+
+        try:
+            scheme, cost, expected = stored.split("$", 2)
+            return hmac.compare_digest(derive(password, salt, scheme, int(cost)), expected)
+        except ValueError as e:
+            print(f"无法解析存储的密码哈希: {str(e)}")
+            return False
+
+    def needs_rehash(self, stored, salt):
+        """存储的哈希是否需要按当前算法和成本重新计算"""
+        if not salt or "$" not in stored:
+            return True
+        scheme, cost = stored.split("$", 2)[:2]
+        return scheme != self.scheme or int(cost) < self.cost
+
+    def check(self, password, stored, salt, new_salt):
+        """
+        验证密码，需要升级时顺便用新盐值计算新哈希，供后台线程一次完成
+
+        返回:
+            (是否匹配, 新哈希或None)
+        """
+        if not salt:
+            # 明文比较几乎不耗时，不论是否匹配都计算一次新哈希，响应时间与其他用户相同
+            new_hash = self.hash(password, new_salt)
+            return (True, new_hash) if self.verify(password, stored, salt) else (False, None)
+        if not self.verify(password, stored, salt):
+            return False, None
+        if self.needs_rehash(stored, salt):
+            return True, self.hash(password, new_salt)
+        return True, None
+
+
+def calibrate_cost(scheme=None, target_ms=TARGET_MS):
+    """
+    测量本机速度，返回单次哈希耗时约为 target_ms 的成本参数，不低于默认成本的一半
+
+    参数:
+        scheme: 算法，默认为 DEFAULT_SCHEME
+        target_ms: 目标耗时（毫秒）
+    """
+    scheme = scheme or DEFAULT_SCHEME
+    minimum = DEFAULT_COSTS[scheme] // 2 if scheme == "pbkdf2_sha256" else DEFAULT_COSTS[scheme] - 1
+
+    if scheme == "pbkdf2_sha256":
+        # 迭代次数与耗时成正比，取三次测量中最快的一次按比例换算
+        probe = 50000
+        elapsed = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            derive("calibration", "calibration-salt", scheme, probe)
+            elapsed = min(elapsed, (time.perf_counter() - start) * 1000)
+        cost = int(probe * target_ms / max(elapsed, 0.001)) // 10000 * 10000
+        return max(cost, minimum)
+
+    # scrypt 的N每加倍耗时也加倍，逐级测量
+    cost = 12
+    while cost < 20:
+        start = time.perf_counter()
+        derive("calibration", "calibration-salt", scheme, cost)
+        if (time.perf_counter() - start) * 1000 >= target_ms:
+            break
+        cost += 1
+    return max(cost, minimum)
+
+
+class PasswordTask(QThread):
+    """
+    在后台线程执行一次耗时的密码计算
+
+    任务函数在线程中运行，结果通过 done 信号在界面线程返回，出错时结果为异常对象
+    """
+
+    done = pyqtSignal(object)
+
+    def __init__(self, func, *args, parent=None):
+        super().__init__(parent)
+        self.func = func
+        self.args = args
+
+    def run(self):
+        try:
+            result = self.func(*self.args)
+        except Exception as e:
+            print(f"密码计算出错: {str(e)}")
+            result = e
+        self.done.emit(result)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+报告文字的拼音转换
+没有中文字体时，报告中的中文需要转换为拼音。报告里的标签和建议句子在每份报告中反复出现，
+因此按整句做LRU缓存；句子按连续的汉字片段拆开转换，数字等非汉字部分原样保留，
+汉字片段的拼音保存在磁盘上的词表中，重启后和批量生成的工作进程中都可直接使用
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# 本进程中pypinyin是否可用，None表示尚未检查
+_has_pypinyin = None
+
+
+def has_pypinyin():
+    """检查是否安装了pypinyin，同一进程中只检查和提示一次"""
+    global _has_pypinyin
+    if _has_pypinyin is None:
+        try:
+            import pypinyin
+            _has_pypinyin = True
+        except ImportError:
+            print("\n警告: 未安装pypinyin库，无法将中文转换为拼音")
+            print("建议安装pypinyin以获得更好的PDF中文支持: pip install pypinyin\n")
+            _has_pypinyin = False
+    return _has_pypinyin
+
+
+def unicode_escape(text):
+    """没有pypinyin时，非ASCII字符用Unicode编码表示"""
+    return "".join(f"[U+{ord(char):04X}]" if ord(char) > 127 else char for char in text)
+
+
+class PinyinTranslator:
+    """
+    带缓存的中文转拼音
+
+    结果与 ' '.join(lazy_pinyin(text)) 相同：pypinyin本身就按连续的汉字片段分词，
+    非汉字部分整段保留，所以逐个片段转换再拼接不会改变结果
+    """
+
+    # 内存中缓存的整句数
+    MEMORY_SIZE = 2048
+    # 词表中最多保存的汉字片段数
+    TABLE_SIZE = 8192
+
+    def __init__(self, table_path=None, memory_size=None, table_size=None):
+        """
+        参数:
+            table_path: 词表文件路径，为None时词表只保存在内存中
+            memory_size: 内存中缓存的整句数，默认为 MEMORY_SIZE
+            table_size: 词表中最多保存的片段数，默认为 TABLE_SIZE
+        """
+        self.table_path = table_path
+        self.memory_size = memory_size or self.MEMORY_SIZE
+        self.table_size = table_size or self.TABLE_SIZE
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.splitter = None
+        self.table = {}
+        self.dirty = False
+        self.version = None
+        if has_pypinyin():
+            import pypinyin
+            from pypinyin.constants import RE_HANS
+            self.version = pypinyin.__version__
+            # RE_HANS 匹配整段汉字（^(...)+$），去掉首尾锚点后用于拆分句子
+            self.splitter = re.compile("(" + RE_HANS.pattern.lstrip("^").rstrip("$") + ")")
+            self.table = self.load_table()
+
+    def load_table(self):
+        """读取词表，pypinyin版本不同时丢弃"""
+        if not self.table_path:
+            return {}
+        try:
+            with open(self.table_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"读取拼音词表失败: {str(e)}")
+            return {}
+        if data.get("version") != self.version:
+            return {}
+        return data.get("table", {})
+
+    def save(self):
+        """词表有新增时保存到磁盘"""
+        if not self.table_path or not self.dirty:
+            return
+        with self.lock:
+            data = {"version": self.version, "table": dict(self.table)}
+            self.dirty = False
+        temp_path = f"{self.table_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.table_path), exist_ok=True)
+            # 先写临时文件再替换，多个进程同时保存时不会留下不完整的词表
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.table_path)
+        except OSError as e:
+            print(f"保存拼音词表失败: {str(e)}")
+
+    def translate(self, text):
+        """转换一段文字，没有非ASCII字符时原样返回"""
+        return self.translate_many([text])[0]
+
+    def translate_many(self, texts):
+        """
+        一次转换多段文字
+
+        先查整句缓存，未命中的句子拆成汉字片段后去重，词表中没有的片段统一转换一次
+
+        参数:
+            texts: 字符串列表，非字符串会先转为字符串
+
+        返回:
+            与 texts 一一对应的转换结果
+        """
+        texts = [text if isinstance(text, str) else str(text) for text in texts]
+        results = {}
+        missing = []
+        with self.lock:
+            for text in texts:
+                if text in results:
+                    continue
+                if text.isascii():
+                    results[text] = text
+                elif text in self.memory:
+                    self.memory.move_to_end(text)
+                    results[text] = self.memory[text]
+                else:
+                    results[text] = None
+                    missing.append(text)
+
+        if missing:
+            for text, result in zip(missing, self.convert(missing)):
+                results[text] = result
+            with self.lock:
+                for text in missing:
+                    self.memory[text] = results[text]
+                    self.memory.move_to_end(text)
+                while len(self.memory) > self.memory_size:
+                    self.memory.popitem(last=False)
+        return [results[text] for text in texts]
+
+    def convert(self, texts):
+        """转换缓存中没有的句子"""
+        if self.splitter is None:
+            return [unicode_escape(text) for text in texts]
+
+        from pypinyin import lazy_pinyin
+        pieces = [self.splitter.split(text) for text in texts]
+        with self.lock:
+            new_words = {piece for parts in pieces for piece in parts[1::2] if piece not in self.table}
+        syllables = {word: lazy_pinyin(word) for word in new_words}
+
+        with self.lock:
+            if syllables and len(self.table) + len(syllables) <= self.table_size:
+                self.table.update(syllables)
+                self.dirty = True
+            results = []
+            for parts in pieces:
+                items = []
+                # split 的结果中奇数位置是汉字片段，偶数位置是其间的其他字符
+                for index, part in enumerate(parts):
+                    if index % 2:
+                        items.extend(self.table.get(part) or syllables[part])
+                    elif part:
+                        items.append(part)
+                results.append(" ".join(items))
+        return results
+
+
+# 默认的词表文件，位于项目根目录下
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "cache", "pinyin", "table.json")
+
+# 进程内共享的转换器
+_pinyin_translator_instance = None
+
+def get_pinyin_translator():
+    """
+    获取进程内共享的拼音转换器
+
+    返回:
+        PinyinTranslator: 转换器实例，词表文件为 DEFAULT_TABLE_PATH
+    """
+    global _pinyin_translator_instance
+    if _pinyin_translator_instance is None:
+        _pinyin_translator_instance = PinyinTranslator(DEFAULT_TABLE_PATH)
+    return _pinyin_translator_instance
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+用户资料服务
+会话内缓存用户资料，体重、年龄、性别等读取不再访问数据库；
+资料保存后通过数据库变更通知自动失效
+"""
+
+
+class ProfileService:
+    """
+    用户资料缓存
+
+    每个用户的资料首次读取时用一次查询加载，之后直接返回缓存的副本，
+    update_user_profile 发出 "profile" 变更通知时清除对应用户的缓存
+    """
+
+    # 分析和报告使用的字段
+    ANALYSIS_FIELDS = ("gender", "age", "height", "weight", "diet_habit", "exercise_habit", "sleep_habit")
+
+    # 体重未填写时使用的默认值(kg)
+    DEFAULT_WEIGHT = 60
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        # 用户ID -> 资料字典
+        self.profiles = {}
+        db_manager.add_change_listener(self.on_data_changed)
+
+    def on_data_changed(self, kind, user_id, key):
+        """数据库变更的回调，资料变化时清除缓存"""
+        if kind == "profile":
+            self.invalidate(user_id)
+
+    def invalidate(self, user_id=None):
+        """清除一个用户的缓存，user_id为None时全部清除"""
+        if user_id is None:
+            self.profiles.clear()
+        else:
+            self.profiles.pop(user_id, None)
+
+    def load(self, user_id):
+        """返回缓存的资料字典（内部使用，不要修改）"""
+        profile = self.profiles.get(user_id)
+        if profile is None:
+            profile = self.db_manager.get_user_profile(user_id)
+            # 用户不存在时不缓存，避免注册后仍读到空资料
+            if profile.get("username"):
+                self.profiles[user_id] = profile
+        return profile
+
+    def get_profile(self, user_id):
+        """
+        获取完整资料
+
+        返回:
+            包含 id、username、gender、age、height、weight 和三项习惯的字典副本
+        """
+        return dict(self.load(user_id))
+
+    def get_analysis_profile(self, user_id):
+        """获取用于健康分析和报告的资料，用户不存在时返回None"""
+        profile = self.load(user_id)
+        if not profile.get("username"):
+            return None
+        return {field: profile.get(field) for field in self.ANALYSIS_FIELDS}
+
+    def get_weight(self, user_id, default=None):
+        """体重(kg)，未填写时返回默认值"""
+        weight = self.load(user_id).get("weight")
+        if weight and isinstance(weight, (int, float)):
+            return weight
+        return self.DEFAULT_WEIGHT if default is None else default
+
+    def get_age(self, user_id):
+        """年龄，未填写时返回None"""
+        return self.load(user_id).get("age")
+
+    def get_gender(self, user_id):
+        """性别，未填写时返回None"""
+        return self.load(user_id).get("gender")
+
+    def is_profile_complete(self, user_id):
+        """性别、年龄、身高和体重是否都已填写"""
+        profile = self.load(user_id)
+        values = [profile.get(field) for field in ("gender", "age", "height", "weight")]
+        return all(value not in (None, "", 0) for value in values)
+
+
+# 每个数据库管理器对应一个资料服务
+_profile_services = {}
+
+def get_profile_service(db_manager):
+    """
+    获取数据库管理器对应的资料服务，同一会话中的窗口和对话框共用
+
+    参数:
+        db_manager: 数据库管理器实例
+
+    返回:
+        ProfileService: 资料服务实例
+    """
+    service = _profile_services.get(db_manager)
+    if service is None:
+        service = ProfileService(db_manager)
+        _profile_services[db_manager] = service
+    return service
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+重复提醒规则
+规则只存储一次，由调度器按需展开为即将到来的提醒时间点，
+展开成本只与展开窗口内的次数有关，与规则已运行多久无关
+"""
+
+import datetime
+
+# 重复类型及显示名称
+FREQUENCIES = [
+    ("daily", "每天"),
+    ("weekdays", "工作日"),
+    ("weekly", "每周"),
+    ("hourly", "每隔N小时"),
+]
+
+WEEKDAY_NAMES = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+
+def parse_time(value):
+    """解析 HH:MM 或 HH:MM:SS 格式的时间"""
+    value = (value or "").strip()
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            return datetime.datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析时间: {value}")
+
+
+def minutes_of_day(value):
+    """
+    记录时间换算为当天的分钟数，兼容 "8:05"、"08:05:00" 和完整时间戳，无法解析时返回None
+    """
+    time_str = str(value or "").strip()
+    if " " in time_str:
+        time_str = time_str.split()[1]
+    try:
+        # 按冒号拆分，兼容不补零的时间
+        hour, minute = time_str.split(":")[:2]
+        hour, minute = int(hour), int(minute[:2])
+    except (ValueError, IndexError):
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour * 60 + minute
+
+
+class RecurrenceRule:
+    """
+    重复提醒规则
+
+    frequency:
+        daily:    每天 time_of_day
+        weekdays: 周一至周五 time_of_day
+        weekly:   每周 weekdays 中的各天 time_of_day（0为周一）
+        hourly:   每天从 time_of_day 到 window_end，每隔 interval_hours 小时一次
+    """
+
+    def __init__(self, rule_id, frequency, time_of_day, weekdays=None, interval_hours=None,
+                 window_end=None, start_date=None, end_date=None):
+        if frequency not in dict(FREQUENCIES):
+            raise ValueError(f"不支持的重复类型: {frequency}")
+        self.rule_id = rule_id
+        self.frequency = frequency
+        self.time_of_day = parse_time(time_of_day)
+        self.weekdays = sorted(set(weekdays or []))
+        self.interval_hours = max(int(interval_hours or 1), 1)
+        self.window_end = parse_time(window_end) if window_end else datetime.time(23, 59, 59)
+        self.start_date = start_date
+        self.end_date = end_date
+
+        if frequency == "weekly" and not self.weekdays:
+            raise ValueError("每周重复需要至少选择一天")
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        从数据库行创建规则
+
+        行结构: (id, user_id, reminder_type, content, frequency, time_of_day, weekdays,
+                 interval_hours, window_end, start_date, end_date, is_active, created_at)
+        """
+        weekdays = [int(day) for day in row[6].split(",") if day.strip()] if row[6] else []
+        start_date = datetime.datetime.strptime(row[9], "%Y-%m-%d").date() if row[9] else None
+        end_date = datetime.datetime.strptime(row[10], "%Y-%m-%d").date() if row[10] else None
+        return cls(row[0], row[4], row[5], weekdays, row[7], row[8], start_date, end_date)
+
+    def day_matches(self, day):
+        """判断某一天是否有提醒"""
+        if self.start_date and day < self.start_date:
+            return False
+        if self.end_date and day > self.end_date:
+            return False
+        if self.frequency == "weekdays":
+            return day.weekday() < 5
+        if self.frequency == "weekly":
+            return day.weekday() in self.weekdays
+        return True
+
+    def times_of_day(self, day):
+        """某一天内的全部提醒时间点"""
+        first = datetime.datetime.combine(day, self.time_of_day)
+        if self.frequency != "hourly":
+            return [first]
+
+        last = datetime.datetime.combine(day, self.window_end)
+        step = datetime.timedelta(hours=self.interval_hours)
+        times = []
+        current = first
+        while current <= last:
+            times.append(current)
+            current += step
+        return times
+
+    def occurrences(self, start, end):
+        """
+        展开 [start, end) 范围内的提醒时间点
+
+        参数:
+            start: 起始datetime
+            end: 结束datetime
+
+        返回:
+            按时间排序的datetime生成器
+        """
+        day = start.date()
+        if self.start_date and day < self.start_date:
+            day = self.start_date
+        while day <= end.date():
+            if self.end_date and day > self.end_date:
+                return
+            if self.day_matches(day):
+                for moment in self.times_of_day(day):
+                    if start <= moment < end:
+                        yield moment
+            day += datetime.timedelta(days=1)
+
+    def describe(self):
+        """规则的中文描述"""
+        time_text = self.time_of_day.strftime("%H:%M")
+        if self.frequency == "daily":
+            return f"每天 {time_text}"
+        if self.frequency == "weekdays":
+            return f"工作日 {time_text}"
+        if self.frequency == "weekly":
+            days = "、".join(WEEKDAY_NAMES[day] for day in self.weekdays)
+            return f"每周{days} {time_text}"
+        return f"{time_text}至{self.window_end.strftime('%H:%M')} 每隔{self.interval_hours}小时"
+
+
+def occurrence_key(rule_id, moment):
+    """重复提醒某次发生的标识，用于区分同一规则的不同次提醒"""
+    return ("rule", rule_id, moment.strftime("%Y-%m-%d %H:%M:%S"))
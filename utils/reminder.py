@@ -2,16 +2,19 @@
 # -*- coding: utf-8 -*-
 
 """
-提醒管理器模块
-负责后台检查并发送提醒通知
+提醒服务模块
+负责为所有已登录用户调度并发送提醒通知
 """
 
-import threading
-import time
 import datetime
+import time
+import queue
+import sqlite3
 import logging
-from PyQt5.QtWidgets import QApplication, QMessageBox, QDialog, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QCheckBox
-from PyQt5.QtCore import QObject, QTimer, QTime, QDateTime, pyqtSignal
+import threading
+from PyQt5.QtWidgets import (QApplication, QDialog, QVBoxLayout, QLabel, QPushButton, QHBoxLayout,
+                             QCheckBox, QScrollArea, QWidget)
+from PyQt5.QtCore import Qt, QObject, QThread, QTimer, pyqtSignal
 try:
     from plyer import notification
     PLYER_AVAILABLE = True
@@ -19,219 +22,446 @@ except ImportError:
     PLYER_AVAILABLE = False
     print("plyer库未安装，将使用替代通知方式")
 
+from database.db_manager import DatabaseManager
+from utils.recurrence import RecurrenceRule, occurrence_key
+from utils.timer_wheel import TimerWheel
+
 # 设置日志记录
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', filename='app.log')
-logger = logging.getLogger('ReminderManager')
+logger = logging.getLogger('ReminderService')
 
-class ReminderManager(QObject):
+class ReminderService(QObject):
     """
-    提醒管理器类，负责检查即将到来的提醒并发送通知
+    多用户提醒服务
+
+    一个进程只有一个服务实例，所有已登录用户的提醒共用一个分层时间轮和一个单次定时器。
+    每个用户登录时用带索引的查询加载一次未完成的提醒和重复规则，之后通过数据库变更通知增量更新；
+    到期的提醒先放入发件箱，短时间内到期的合并为一次通知分发给该用户注册的窗口，没有窗口时使用系统通知。
+    完成和延迟由后台线程批量写入数据库，提醒集中到期时界面线程也不会被阻塞。
+    每个到期提醒的处理成本为O(1)，与同时登录的用户数无关
     """
-    # 定义信号，当新提醒被触发时发送
-    reminder_triggered = pyqtSignal(str, str, int)  # 标题，内容，提醒ID
     
-    def __init__(self, db_manager, user_id, parent=None):
+    # 启动或修改时已过期不超过该秒数的提醒仍会立即触发
+    GRACE_SECONDS = 600
+    # 单次定时的最长间隔，防止系统休眠或调整时钟后长时间不触发
+    MAX_TIMER_MS = 3600 * 1000
+    # 重复提醒的展开窗口
+    HORIZON_HOURS = 24
+    # 到期时间相差不超过该毫秒数的提醒合并为一次通知
+    COALESCE_MS = 1000
+    
+    def __init__(self, db_manager, parent=None):
         """
-        初始化提醒管理器
+        初始化提醒服务
         
         参数:
             db_manager: 数据库管理器实例
-            user_id: 用户ID
             parent: 父对象
         """
         super().__init__(parent)
         self.db_manager = db_manager
-        self.user_id = user_id
-        self.timer = QTimer(self)
-        self.active_reminders = {}  # 记录活跃的提醒，防止重复提示
-        self.check_interval = 30000  # 默认30秒检查一次
         
-        # 连接定时器到检查函数
+        # 用户ID -> {"handlers": [...], "rules": {规则ID: RecurrenceRule}, "rule_info": {规则ID: (类型, 内容)}}
+        self.users = {}
+        # (用户ID, 提醒标识) -> (到期时间, (类型, 内容, 时间文本))
+        self.pending = {}
+        self.wheel = TimerWheel(time.time())
+        
+        now = datetime.datetime.now()
+        self.horizon_end = now + datetime.timedelta(hours=self.HORIZON_HOURS)
+        
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
         self.timer.timeout.connect(self.check_reminders)
         
-        # 初始化时启动定时器
-        self.start()
+        # 用户ID -> [(标题, 内容, 提醒标识)]，等待合并发送
+        self.outbox = {}
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush_outbox)
+        
+        # 完成和延迟的后台写入线程
+        self.writer = ReminderWriter(db_manager.db_path, self)
+        self.writer.batch_written.connect(self.on_batch_written)
+        self.writer.start()
         
-        print("提醒管理器已初始化，检查间隔：30秒")
+        # 对象销毁时注销监听器
+        callback = self.on_data_changed
+        db_manager.add_change_listener(callback)
+        self.destroyed.connect(lambda *args: db_manager.remove_change_listener(callback))
+        
+        print("提醒服务已初始化")
+    
+    def register(self, user_id, handler=None):
+        """
+        为用户注册提醒接收方，首次注册时加载该用户的提醒
+        
+        参数:
+            user_id: 用户ID
+            handler: 回调函数 handler(events)，events为 [(标题, 内容, 提醒标识), ...]，为None时使用系统通知
+        """
+        user = self.users.get(user_id)
+        if user is None:
+            user = {"handlers": [], "rules": {}, "rule_info": {}}
+            self.users[user_id] = user
+            self.load_user(user_id)
+        user["handlers"].append(handler)
+        self.arm_timer()
+        print(f"用户{user_id}已注册提醒服务，当前共{len(self.users)}个用户")
     
-    def start(self):
-        """启动提醒检查"""
-        self.timer.start(self.check_interval)
-        print("提醒检查已启动")
+    def unregister(self, user_id, handler=None):
+        """注销提醒接收方，用户没有接收方时移除其全部提醒"""
+        user = self.users.get(user_id)
+        if user is None:
+            return
+        if handler in user["handlers"]:
+            user["handlers"].remove(handler)
+        if not user["handlers"]:
+            self.drop_user(user_id)
+            del self.users[user_id]
+        self.arm_timer()
     
-    def stop(self):
-        """停止提醒检查"""
-        self.timer.stop()
-        print("提醒检查已停止")
+    @staticmethod
+    def parse_due(reminder):
+        """把提醒的日期和时间解析为datetime，无法解析时返回None"""
+        reminder_date = reminder[2]
+        reminder_time = (reminder[3] or "").strip()
+        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+            try:
+                return datetime.datetime.strptime(f"{reminder_date} {reminder_time}", fmt)
+            except (TypeError, ValueError):
+                continue
+        print(f"无法解析提醒时间: ID={reminder[0]}, {reminder_date} {reminder_time}")
+        return None
+    
+    def load_user(self, user_id):
+        """加载一个用户全部未完成的提醒和重复提醒规则"""
+        now = datetime.datetime.now()
+        window_start = now - datetime.timedelta(seconds=self.GRACE_SECONDS)
+        
+        for reminder in self.db_manager.get_pending_reminders(user_id, window_start.strftime("%Y-%m-%d")):
+            self.schedule(user_id, reminder, now)
+        
+        for row in self.db_manager.get_reminder_rules(user_id):
+            self.load_rule(user_id, row)
+        self.expand_rules(user_id, window_start, self.horizon_end)
     
-    def set_check_interval(self, milliseconds):
-        """设置检查间隔"""
-        self.check_interval = milliseconds
-        # 如果定时器在运行，重新设置间隔
-        if self.timer.isActive():
-            self.timer.start(self.check_interval)
-        print(f"提醒检查间隔已更新为：{milliseconds/1000}秒")
+    def drop_user(self, user_id):
+        """移除一个用户的全部待触发提醒"""
+        for pending_key in [k for k in self.pending if k[0] == user_id]:
+            self.unschedule(pending_key)
+    
+    def push(self, pending_key, due, info):
+        """加入或替换一个待触发条目"""
+        self.pending[pending_key] = (due, info)
+        self.wheel.add(pending_key, due.timestamp())
+    
+    def unschedule(self, pending_key):
+        """移除一个待触发条目"""
+        self.pending.pop(pending_key, None)
+        self.wheel.remove(pending_key)
+    
+    def schedule(self, user_id, reminder, now=None):
+        """加入或更新一个一次性提醒"""
+        pending_key = (user_id, reminder[0])
+        self.unschedule(pending_key)
+        
+        due = self.parse_due(reminder)
+        now = now or datetime.datetime.now()
+        if due is not None and not reminder[6] and (now - due).total_seconds() <= self.GRACE_SECONDS:
+            self.push(pending_key, due, (reminder[4], reminder[5], reminder[3]))
+    
+    def load_rule(self, user_id, row):
+        """解析并登记一条重复规则"""
+        try:
+            self.users[user_id]["rules"][row[0]] = RecurrenceRule.from_row(row)
+            self.users[user_id]["rule_info"][row[0]] = (row[2], row[3])
+        except ValueError as e:
+            print(f"无法解析重复提醒规则: ID={row[0]}, {str(e)}")
+    
+    def expand_rules(self, user_id, start, end, rule_id=None):
+        """
+        把用户的重复规则在 [start, end) 内的提醒时间点加入时间轮
+        
+        已完成的时间点跳过，已延迟的按延迟后的时间加入
+        """
+        user = self.users[user_id]
+        rule_ids = [rule_id] if rule_id is not None else list(user["rules"])
+        if not rule_ids:
+            return
+        
+        exceptions = {}
+        for exception in self.db_manager.get_reminder_exceptions(
+                user_id, start.strftime("%Y-%m-%d %H:%M:%S"),
+                end.strftime("%Y-%m-%d %H:%M:%S"), rule_id):
+            exceptions[("rule", exception[0], exception[1])] = exception
+        
+        for current_id in rule_ids:
+            rule = user["rules"].get(current_id)
+            if rule is None:
+                continue
+            reminder_type, content = user["rule_info"][current_id]
+            for moment in rule.occurrences(start, end):
+                key = occurrence_key(current_id, moment)
+                if key not in exceptions:
+                    self.push((user_id, key), moment, (reminder_type, content, moment.strftime("%H:%M")))
+        
+        # 延迟的时间点
+        for key, exception in exceptions.items():
+            if exception[2] != "snoozed" or not exception[3] or key[1] not in user["rules"]:
+                continue
+            due = datetime.datetime.strptime(exception[3], "%Y-%m-%d %H:%M:%S")
+            if start <= due < end:
+                reminder_type, content = user["rule_info"][key[1]]
+                self.push((user_id, key), due, (reminder_type, content, due.strftime("%H:%M")))
+    
+    def extend_horizon(self, now):
+        """展开窗口过半后向后延伸，每次只展开新增的时间段"""
+        if self.horizon_end - now > datetime.timedelta(hours=self.HORIZON_HOURS / 2):
+            return
+        new_end = now + datetime.timedelta(hours=self.HORIZON_HOURS)
+        # 系统休眠很久后恢复时，不补发宽限期之前的提醒
+        start = max(self.horizon_end, now - datetime.timedelta(seconds=self.GRACE_SECONDS))
+        for user_id in self.users:
+            self.expand_rules(user_id, start, new_end)
+        self.horizon_end = new_end
+    
+    def on_data_changed(self, kind, user_id, key):
+        """数据库提醒变化的回调，只处理发生变化的那一条"""
+        if kind not in ("reminder", "reminder_rule"):
+            return
+        if user_id is not None and user_id not in self.users:
+            return
+        
+        if key is None:
+            # 无法确定具体条目时重新加载相关用户
+            for current_id in ([user_id] if user_id is not None else list(self.users)):
+                self.drop_user(current_id)
+                self.users[current_id]["rules"] = {}
+                self.users[current_id]["rule_info"] = {}
+                self.load_user(current_id)
+        elif kind == "reminder":
+            self.on_reminder_changed(key)
+        else:
+            self.on_rule_changed(key)
+        self.arm_timer()
+    
+    def on_reminder_changed(self, reminder_id):
+        """一次性提醒发生变化"""
+        reminder = self.db_manager.get_reminder_by_id(reminder_id)
+        if reminder is None:
+            # 已删除，提醒ID全局唯一，逐个用户移除即可
+            for user_id in self.users:
+                self.unschedule((user_id, reminder_id))
+        elif reminder[1] in self.users:
+            self.schedule(reminder[1], reminder)
+    
+    def on_rule_changed(self, rule_id):
+        """重复规则或其例外发生变化：移除该规则的全部条目后从当前时间重新展开"""
+        row = self.db_manager.get_reminder_rule_by_id(rule_id)
+        for user_id, user in self.users.items():
+            if rule_id in user["rules"] or (row is not None and row[1] == user_id):
+                for pending_key in [k for k in self.pending
+                                    if k[0] == user_id and isinstance(k[1], tuple) and k[1][1] == rule_id]:
+                    self.unschedule(pending_key)
+                user["rules"].pop(rule_id, None)
+                user["rule_info"].pop(rule_id, None)
+        
+        # 从当前时间开始展开，已经触发过的时间点不会重复触发
+        if row is not None and row[1] in self.users and row[11]:
+            self.load_rule(row[1], row)
+            self.expand_rules(row[1], datetime.datetime.now(), self.horizon_end, rule_id)
+    
+    def arm_timer(self):
+        """为时间轮下一次需要推进的时间设置单次定时器"""
+        self.timer.stop()
+        next_expiry = self.wheel.next_expiry()
+        if next_expiry is None:
+            # 没有待触发的提醒时，仍需定期延伸重复提醒的展开窗口
+            if any(user["rules"] for user in self.users.values()):
+                self.timer.start(self.MAX_TIMER_MS)
+            return
+        
+        # 略微延后，保证定时器触发时已经进入目标秒
+        delay_ms = int((next_expiry - time.time()) * 1000) + 5
+        self.timer.start(max(0, min(delay_ms, self.MAX_TIMER_MS)))
     
     def check_reminders(self):
-        """检查是否有到期的提醒"""
+        """触发所有已到期的提醒，然后重新定时"""
         try:
-            # 获取当前时间
-            now = QDateTime.currentDateTime()
-            now_time = now.time()
-            now_date = now.date().toString("yyyy-MM-dd")
-            
-            # 检查前后15分钟内的提醒
-            start_time = now.addSecs(-900).toString("HH:mm:ss")  # 15分钟前
-            end_time = now.addSecs(900).toString("HH:mm:ss")    # 15分钟后
-            
-            print(f"当前检查提醒: 当前时间={now.toString('yyyy-MM-dd HH:mm:ss')}")
-            
-            # 查询数据库
-            reminders = self.db_manager.get_reminders_for_time_range(
-                self.user_id, 
-                (now_date, start_time), 
-                (now_date, end_time)
-            )
+            now = datetime.datetime.now()
+            self.extend_horizon(now)
             
-            if reminders:
-                print(f"检查到{len(reminders)}个在时间范围内的提醒")
-            
-            for reminder in reminders:
-                reminder_id = reminder[0]
-                reminder_date = reminder[2]
-                reminder_time = reminder[3]
-                reminder_type = reminder[4]
-                reminder_content = reminder[5]
-                is_completed = reminder[6]
-                
-                print(f"处理提醒: ID={reminder_id}, 日期={reminder_date}, 时间={reminder_time}, 类型={reminder_type}, 内容={reminder_content}, 完成={is_completed}")
-                
-                # 检查是否已完成或已提醒
-                if is_completed or reminder_id in self.active_reminders:
-                    print(f"  跳过提醒: 已完成={is_completed}, 在活跃列表中={(reminder_id in self.active_reminders)}")
-                    continue
-                
-                # 解析提醒时间 - 支持多种格式
-                reminder_datetime = QDateTime()
-                reminder_datetime.setDate(QDateTime.fromString(reminder_date, "yyyy-MM-dd").date())
-                
-                # 处理不同格式的时间字符串
-                time_obj = None
-                if ":" in reminder_time:
-                    # 尝试不同的时间格式
-                    formats = ["HH:mm:ss", "HH:mm", "h:mm:ss", "h:mm"]
-                    for fmt in formats:
-                        time_obj = QTime.fromString(reminder_time, fmt)
-                        if time_obj.isValid():
-                            print(f"  成功解析时间: {reminder_time} 使用格式 {fmt}")
-                            break
-                
-                if not time_obj or not time_obj.isValid():
-                    print(f"  无法解析时间: {reminder_time}")
-                    continue
-                    
-                reminder_datetime.setTime(time_obj)
-                
-                # 确保日期时间有效
-                if not reminder_datetime.isValid():
-                    print(f"  无效的日期时间: {reminder_date} {reminder_time}")
-                    continue
-                
-                # 计算时间差（秒）
-                seconds_diff = reminder_datetime.secsTo(now)
-                print(f"  时间差: {seconds_diff}秒")
-                
-                # 如果时间差在±10分钟内且未完成，触发提醒
-                if -600 <= seconds_diff <= 600:
-                    print(f"  准备触发提醒: 时间差在±10分钟内")
-                    # 将提醒添加到活跃列表，防止重复提醒
-                    self.active_reminders[reminder_id] = time.time()
-                    
-                    # 计算时间状态说明
-                    time_status = ""
-                    if seconds_diff < 0:
-                        time_status = f"还有{abs(seconds_diff)//60}分钟"
-                    elif seconds_diff > 0:
-                        time_status = f"已过{seconds_diff//60}分钟"
-                    else:
-                        time_status = "现在"
-                    
-                    # 触发提醒信号
-                    title = f"{reminder_type}提醒 ({time_status})"
-                    content = f"{reminder_content}\n时间：{reminder_time}"
-                    
-                    print(f"  发送提醒触发信号: {title}")
-                    self.reminder_triggered.emit(title, content, reminder_id)
-                    
-                    # 调用直接显示的方法，以防信号/槽机制出问题
-                    try:
-                        from PyQt5.QtWidgets import QApplication
-                        if parent := self.parent():
-                            self._direct_show_reminder(parent, title, content, reminder_id)
-                        else:
-                            # 尝试直接弹出消息框
-                            QMessageBox = QApplication.instance().findChild("QMessageBox")
-                            if QMessageBox:
-                                msgbox = QMessageBox()
-                                msgbox.setWindowTitle(title)
-                                msgbox.setText(content)
-                                msgbox.exec_()
-                                print(f"  直接弹出提醒对话框")
-                    except Exception as e:
-                        print(f"  直接显示提醒失败: {str(e)}")
-                    
-                    print(f"  提醒触发完成: {title} - {content}")
-            
-            # 清理过期的活跃提醒（超过30分钟）
-            current_time = time.time()
-            expired_reminders = []
-            for rid, timestamp in self.active_reminders.items():
-                if current_time - timestamp > 1800:  # 30分钟
-                    expired_reminders.append(rid)
-            
-            for rid in expired_reminders:
-                del self.active_reminders[rid]
+            for pending_key in self.wheel.advance(time.time()):
+                entry = self.pending.pop(pending_key, None)
+                if entry is not None:
+                    self.dispatch(pending_key[0], pending_key[1], entry[1], entry[0], now)
                 
         except Exception as e:
             print(f"检查提醒时出错: {str(e)}")
             import traceback
             traceback.print_exc()
+        finally:
+            self.arm_timer()
+    
+    def dispatch(self, user_id, key, info, due, now):
+        """把一个到期提醒放入发件箱，短时间内到期的提醒合并为一次通知"""
+        reminder_type, reminder_content, reminder_time = info
+        
+        # 计算时间状态说明
+        seconds_late = int((now - due).total_seconds())
+        if seconds_late >= 60:
+            time_status = f"已过{seconds_late // 60}分钟"
+        else:
+            time_status = "现在"
+        
+        title = f"{reminder_type}提醒 ({time_status})"
+        content = f"{reminder_content}\n时间：{reminder_time}"
+        print(f"发送提醒: 用户={user_id}, {key}, {title}")
+        
+        self.outbox.setdefault(user_id, []).append((title, content, key))
+        if not self.flush_timer.isActive():
+            self.flush_timer.start(self.COALESCE_MS)
+    
+    def flush_outbox(self):
+        """把发件箱中的提醒按用户分组发送，每个用户每批只通知一次"""
+        outbox, self.outbox = self.outbox, {}
+        for user_id, events in outbox.items():
+            handlers = self.users.get(user_id, {}).get("handlers", [])
+            for handler in [handler for handler in handlers if handler is not None]:
+                try:
+                    handler(list(events))
+                except Exception as e:
+                    print(f"提醒回调出错: {str(e)}")
+            if not any(handler is not None for handler in handlers):
+                if len(events) == 1:
+                    title, content = events[0][0], events[0][1]
+                else:
+                    title = f"{len(events)}条提醒"
+                    content = "\n".join(event[0] for event in events)
+                # 系统通知可能阻塞，放到后台线程发送
+                threading.Thread(target=self.notify_desktop, args=(title, content), daemon=True).start()
+    
+    def on_batch_written(self, changes):
+        """后台写入完成后在主线程发出变更通知，调度器和界面据此增量更新"""
+        for kind, key in changes:
+            self.db_manager.notify_change(kind, None, key)
+    
+    def shutdown(self):
+        """退出前写完队列中的更新并停止后台线程"""
+        self.flush_timer.stop()
+        self.timer.stop()
+        self.writer.stop()
+    
+    @staticmethod
+    def notify_desktop(title, content):
+        """没有窗口接收时使用系统通知"""
+        if PLYER_AVAILABLE:
+            try:
+                notification.notify(title=title, message=content, app_name="长期舒适", timeout=10)
+                return
+            except Exception as e:
+                print(f"系统通知失败: {str(e)}")
+        logger.info(f"{title}: {content}")
+
+
+class ReminderWriter(QThread):
+    """
+    提醒状态的后台写入线程
+    
+    完成和延迟操作先放入队列，由该线程使用独立的数据库连接攒批后在一个事务中写入，
+    界面线程不等待磁盘；每批写完后发出 batch_written 信号，由主线程发出变更通知
+    """
+    
+    batch_written = pyqtSignal(object)
+    
+    # 攒批等待时间(秒)和单批最大条数
+    BATCH_WINDOW = 0.2
+    BATCH_SIZE = 200
+    
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.queue = queue.Queue()
+    
+    def complete(self, key):
+        """标记提醒（或重复提醒的某一次）为已完成"""
+        self.queue.put(("complete", key, None))
+    
+    def snooze(self, key, until):
+        """把提醒延迟到指定的datetime"""
+        self.queue.put(("snooze", key, until))
     
-    def _direct_show_reminder(self, parent, title, content, reminder_id):
-        """直接显示提醒窗口，不依赖信号槽"""
+    def stop(self):
+        """写完已排队的更新后结束线程"""
+        if self.isRunning():
+            self.queue.put(None)
+            self.wait()
+    
+    def run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn.execute("PRAGMA foreign_keys=ON")
         try:
-            dialog = ReminderDialog(title, content, reminder_id, self.db_manager, parent)
-            dialog.show()  # 使用show而不是exec_
-            print(f"  直接显示提醒窗口")
-        except Exception as e:
-            print(f"  直接显示提醒窗口失败: {str(e)}")
+            running = True
+            while running:
+                item = self.queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.BATCH_WINDOW
+                while len(batch) < self.BATCH_SIZE:
+                    try:
+                        item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        running = False
+                        break
+                    batch.append(item)
+                
+                changes = DatabaseManager.write_reminder_updates(conn, batch)
+                print(f"已批量写入{len(batch)}条提醒状态")
+                if changes:
+                    self.batch_written.emit(changes)
+        finally:
+            conn.close()
+
 
 class ReminderDialog(QDialog):
-    """提醒对话框"""
+    """
+    提醒对话框
+    
+    非模态，同一批到期的提醒合并显示；对话框打开期间到期的提醒追加到列表中
+    """
     
-    def __init__(self, title, content, reminder_id, db_manager, parent=None):
+    def __init__(self, events, writer, parent=None):
+        """
+        参数:
+            events: [(标题, 内容, 提醒标识), ...]
+            writer: ReminderWriter，完成和延迟通过它在后台写入
+            parent: 父窗口
+        """
         super().__init__(parent)
-        self.title = title
-        self.content = content
-        self.reminder_id = reminder_id
-        self.db_manager = db_manager
+        self.writer = writer
+        self.rows = []  # [(提醒标识, 复选框)]
         
-        self.setWindowTitle(title)
+        self.setAttribute(Qt.WA_DeleteOnClose)
         self.init_ui()
+        self.add_events(events)
         
     def init_ui(self):
         """初始化用户界面"""
         layout = QVBoxLayout()
         
-        # 提醒内容
-        content_label = QLabel(self.content)
-        content_label.setWordWrap(True)
-        layout.addWidget(content_label)
+        # 提醒列表，条目较多时滚动显示
+        self.rows_widget = QWidget()
+        self.rows_layout = QVBoxLayout(self.rows_widget)
+        self.rows_layout.addStretch()
         
-        # 标记为已完成选项
-        self.complete_checkbox = QCheckBox("标记为已完成")
-        self.complete_checkbox.setChecked(True)
-        layout.addWidget(self.complete_checkbox)
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setWidget(self.rows_widget)
+        layout.addWidget(scroll_area)
         
         # 按钮区域
         button_layout = QHBoxLayout()
@@ -246,54 +476,73 @@ class ReminderDialog(QDialog):
         
         layout.addLayout(button_layout)
         self.setLayout(layout)
+    
+    def add_events(self, events):
+        """追加一批到期的提醒"""
+        for title, content, key in events:
+            content_label = QLabel(f"<b>{title}</b><br>{content}".replace("\n", "<br>"))
+            content_label.setWordWrap(True)
+            
+            # 标记为已完成选项
+            complete_checkbox = QCheckBox("标记为已完成")
+            complete_checkbox.setChecked(True)
+            
+            index = self.rows_layout.count() - 1
+            self.rows_layout.insertWidget(index, content_label)
+            self.rows_layout.insertWidget(index + 1, complete_checkbox)
+            self.rows.append((key, complete_checkbox))
         
+        if len(self.rows) == 1:
+            self.setWindowTitle(events[0][0] if events else "提醒")
+        else:
+            self.setWindowTitle(f"{len(self.rows)}条提醒")
+    
     def accept(self):
         """处理确定按钮"""
-        # 如果选中了标记为已完成，更新数据库
-        if self.complete_checkbox.isChecked():
-            self.db_manager.mark_reminder_completed(self.reminder_id)
-            print(f"提醒 #{self.reminder_id} 已标记为完成")
+        # 选中了标记为已完成的提醒交给后台写入
+        for key, checkbox in self.rows:
+            if checkbox.isChecked():
+                self.writer.complete(key)
+                print(f"提醒 #{key} 已标记为完成")
         
         super().accept()
     
     def snooze(self):
-        """延迟提醒"""
-        # 延迟15分钟
-        now = QDateTime.currentDateTime()
-        new_time = now.addSecs(15 * 60).time().toString("HH:mm:ss")
-        
-        # 更新提醒时间
-        self.db_manager.update_reminder(
-            self.reminder_id, 
-            time=new_time
-        )
-        
-        print(f"提醒 #{self.reminder_id} 已延迟到 {new_time}")
-        QMessageBox.information(self, "延迟提醒", f"提醒已延迟到 {new_time}")
+        """全部延迟15分钟，跨过午夜时日期一并更新"""
+        snoozed = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(minutes=15)
+        for key, _ in self.rows:
+            self.writer.snooze(key, snoozed)
+        
+        print(f"{len(self.rows)}条提醒已延迟到 {snoozed.strftime('%H:%M:%S')}")
         self.reject()
 
-def show_reminder(parent, db_manager, title, content, reminder_id):
-    """显示提醒对话框"""
-    dialog = ReminderDialog(title, content, reminder_id, db_manager, parent)
-    return dialog.exec_()
+def show_reminder(parent, writer, events):
+    """显示非模态的提醒对话框并返回它"""
+    dialog = ReminderDialog(events, writer, parent)
+    dialog.show()
+    dialog.raise_()
+    dialog.activateWindow()
+    return dialog
 
-# 单例模式
-_reminder_manager_instance = None
+# 进程内共享的提醒服务
+_reminder_service_instance = None
 
-def get_reminder_manager(db_manager=None, user_id=None):
+def get_reminder_service(db_manager=None):
     """
-    获取提醒管理器单例
+    获取进程内共享的提醒服务
     
     参数:
         db_manager: 数据库管理器实例，首次调用时必须提供
-        user_id: 用户ID，首次调用时必须提供
         
     返回:
-        ReminderManager: 提醒管理器实例
+        ReminderService: 提醒服务实例
     """
-    global _reminder_manager_instance
-    if _reminder_manager_instance is None:
-        if db_manager is None or user_id is None:
-            raise ValueError("首次获取提醒管理器时必须提供数据库管理器和用户ID")
-        _reminder_manager_instance = ReminderManager(db_manager, user_id)
-    return _reminder_manager_instance 
\ No newline at end of file
+    global _reminder_service_instance
+    if _reminder_service_instance is None:
+        if db_manager is None:
+            raise ValueError("首次获取提醒服务时必须提供数据库管理器")
+        app = QApplication.instance()
+        _reminder_service_instance = ReminderService(db_manager, app)
+        if app is not None:
+            app.aboutToQuit.connect(_reminder_service_instance.shutdown)
+    return _reminder_service_instance
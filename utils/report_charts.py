@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+报告图表
+用matplotlib的Agg后端在内存中绘制每日摄入/消耗热量和睡眠时长图表，不创建窗口，可在后台线程或工作进程中调用。
+绘制结果（PNG或SVG字节）按数据的哈希缓存在内存和磁盘中，报告对话框和PDF导出共用，
+同一周的数据未变化时不会重新绘制。界面中通过 ChartRenderTask 在后台线程绘制
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+
+# 绘图样式变化时递增，使旧的缓存失效
+CHART_VERSION = 2
+
+# 图表名称 -> (使用的序列, 中文标题, 英文标题)
+CHARTS = OrderedDict([
+    ("energy", (("intake", "burned"), "每日摄入与消耗热量(千卡)", "Daily intake / burned (kcal)")),
+    ("sleep", (("sleep",), "每日睡眠时长(小时)", "Daily sleep (hours)")),
+])
+
+# 序列 -> (中文图例, 英文图例, 颜色)
+SERIES_STYLE = {
+    "intake": ("摄入", "Intake", "#E67E22"),
+    "burned": ("消耗", "Burned", "#27AE60"),
+    "sleep": ("睡眠", "Sleep", "#2980B9"),
+}
+
+# 常见中文字体，按优先级排序；都没有时图表使用英文标签
+CHINESE_FONTS = ["Microsoft YaHei", "SimHei", "PingFang SC", "Noto Sans CJK SC", "Source Han Sans SC",
+                 "WenQuanYi Micro Hei", "Arial Unicode MS"]
+
+# 摄入与消耗图超过这个天数时用折线代替柱状图
+LINE_THRESHOLD = 62
+
+# 图表尺寸（英寸）和分辨率
+FIGURE_SIZE = (8, 3)
+DPI = 150
+
+# matplotlib的字体缓存和绘图状态不是线程安全的，同一进程中的绘制串行进行
+_render_lock = threading.Lock()
+
+# 本进程中可用的中文字体，""表示没有，None表示尚未查找
+_chart_font = None
+
+
+def _get_chart_font():
+    """查找matplotlib可用的中文字体，同一进程中只查找一次"""
+    global _chart_font
+    if _chart_font is None:
+        from matplotlib import font_manager
+        installed = {font.name for font in font_manager.fontManager.ttflist}
+        _chart_font = next((name for name in CHINESE_FONTS if name in installed), "")
+    return _chart_font
+
+
+def chart_series(results):
+    """
+    从分析结果中取出绘图用的每日序列
+
+    参数:
+        results: HealthAnalyzer 的分析结果
+
+    返回:
+        {"dates", "intake", "burned", "sleep"}，没有每日数据时返回None
+    """
+    series = results.get("series") if results else None
+    if not series or not series.get("dates"):
+        return None
+    return series
+
+
+def series_digest(name, series, fmt):
+    """一张图表的缓存键：图表名称、格式、样式版本、字体和所用数据的哈希"""
+    fields = CHARTS[name][0]
+    payload = {
+        "version": CHART_VERSION,
+        "chart": name,
+        "format": fmt,
+        "font": _get_chart_font(),
+        "dates": list(series["dates"]),
+        "values": {field: list(series.get(field) or []) for field in fields},
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def render_chart(name, series, fmt="png"):
+    """
+    绘制一张图表
+
+    参数:
+        name: CHARTS 中的图表名称
+        series: chart_series 的结果
+        fmt: "png" 或 "svg"
+
+    返回:
+        图像文件的字节
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fields, title_zh, title_en = CHARTS[name]
+    font = _get_chart_font()
+    chinese = bool(font)
+    labels = [date[5:] for date in series["dates"]]
+    positions = list(range(len(labels)))
+
+    figure = Figure(figsize=FIGURE_SIZE, dpi=DPI)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(1, 1, 1)
+    text_props = {"family": font} if chinese else {}
+
+    if name == "energy" and len(labels) > LINE_THRESHOLD:
+        # 天数较多时柱子太细，改用折线，绘制也快得多
+        for field in fields:
+            values = [float("nan") if value is None else value for value in series.get(field) or []]
+            label_zh, label_en, color = SERIES_STYLE[field]
+            axes.plot(positions, values, color=color, linewidth=1, label=label_zh if chinese else label_en)
+    elif name == "energy":
+        width = 0.38
+        for offset, field in zip((-width / 2, width / 2), fields):
+            values = [value or 0 for value in series.get(field) or []]
+            label_zh, label_en, color = SERIES_STYLE[field]
+            axes.bar([x + offset for x in positions], values, width,
+                     label=label_zh if chinese else label_en, color=color)
+    else:
+        field = fields[0]
+        # 睡眠以分钟保存，图中换算为小时；没有记录的天画成断点
+        values = [None if value is None else value / 60 for value in series.get(field) or []]
+        label_zh, label_en, color = SERIES_STYLE[field]
+        axes.plot(positions, [float("nan") if value is None else value for value in values],
+                  marker="o" if len(labels) <= LINE_THRESHOLD else None,
+                  linewidth=1.5 if len(labels) <= LINE_THRESHOLD else 1,
+                  color=color, label=label_zh if chinese else label_en)
+        axes.axhline(8, color="#95A5A6", linestyle="--", linewidth=1)
+
+    axes.set_title(title_zh if chinese else title_en, fontsize=11, **text_props)
+    # 超过一个月时只标注部分日期，刻度太多时绘制很慢
+    step = (len(labels) + 29) // 30 if len(labels) > 31 else 1
+    axes.set_xticks(positions[::step])
+    axes.set_xticklabels(labels[::step], fontsize=8, rotation=45 if len(labels) > 14 else 0)
+    axes.tick_params(axis="y", labelsize=8)
+    axes.grid(axis="y", color="#E0E0E0", linewidth=0.8)
+    axes.set_axisbelow(True)
+    for side in ("top", "right"):
+        axes.spines[side].set_visible(False)
+    axes.legend(loc="upper right", frameon=False, prop=dict(text_props, size=8))
+    figure.tight_layout()
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class ChartCache:
+    """
+    按数据哈希缓存图表图像的LRU缓存
+
+    内存中保存最近使用的图像，磁盘上的图像文件以哈希命名，重启后仍可命中
+    """
+
+    # 内存和磁盘中最多保留的图像数
+    MEMORY_SIZE = 32
+    DISK_SIZE = 512
+
+    def __init__(self, disk_dir=None, memory_size=None, disk_size=None):
+        """
+        参数:
+            disk_dir: 磁盘缓存目录，为None时只缓存在内存中
+            memory_size: 内存中保留的图像数，默认为 MEMORY_SIZE
+            disk_size: 磁盘上保留的图像数，默认为 DISK_SIZE
+        """
+        self.disk_dir = disk_dir
+        self.memory_size = memory_size or self.MEMORY_SIZE
+        self.disk_size = disk_size or self.DISK_SIZE
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get_images(self, series, fmt="png"):
+        """
+        获取所有图表的图像，缓存中没有的才绘制
+
+        参数:
+            series: chart_series 的结果
+            fmt: "png" 或 "svg"
+
+        返回:
+            OrderedDict {图表名称: 图像字节}
+        """
+        images = OrderedDict()
+        for name in CHARTS:
+            digest = series_digest(name, series, fmt)
+            data = self.get(digest, fmt)
+            if data is None:
+                with _render_lock:
+                    data = render_chart(name, series, fmt)
+                self.put(digest, fmt, data)
+            images[name] = data
+        return images
+
+    def get(self, digest, fmt):
+        """依次查找内存和磁盘，未命中返回None"""
+        key = (digest, fmt)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+
+        data = self.read_disk(digest, fmt)
+        if data is not None:
+            self.remember(key, data)
+        return data
+
+    def put(self, digest, fmt, data):
+        """保存图像到内存和磁盘"""
+        self.remember((digest, fmt), data)
+        self.write_disk(digest, fmt, data)
+
+    def remember(self, key, data):
+        with self.lock:
+            self.memory[key] = data
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_size:
+                self.memory.popitem(last=False)
+
+    def disk_path(self, digest, fmt):
+        return os.path.join(self.disk_dir, f"{digest}.{fmt}")
+
+    def read_disk(self, digest, fmt):
+        if not self.disk_dir:
+            return None
+        path = self.disk_path(digest, fmt)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"读取图表缓存失败: {str(e)}")
+            return None
+        # 更新访问时间，磁盘淘汰按访问时间进行
+        os.utime(path)
+        return data
+
+    def write_disk(self, digest, fmt, data):
+        if not self.disk_dir:
+            return
+        path = self.disk_path(digest, fmt)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            # 先写临时文件再替换，中途退出或并发写入不会留下不完整的图像
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            self.evict_disk()
+        except OSError as e:
+            print(f"写入图表缓存失败: {str(e)}")
+
+    def evict_disk(self):
+        """磁盘上的图像超过上限时删除最久未访问的"""
+        entries = [entry for entry in os.scandir(self.disk_dir) if entry.name.endswith((".png", ".svg"))]
+        if len(entries) <= self.disk_size:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.disk_size]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        with self.lock:
+            self.memory.clear()
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith((".png", ".svg")):
+                    os.remove(entry.path)
+
+
+# 默认的磁盘缓存目录，位于项目根目录下
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "charts")
+
+# 进程内共享的图表缓存
+_chart_cache_instance = None
+
+def get_chart_cache():
+    """
+    获取进程内共享的图表缓存
+
+    返回:
+        ChartCache: 缓存实例，磁盘缓存目录为 DEFAULT_CACHE_DIR
+    """
+    global _chart_cache_instance
+    if _chart_cache_instance is None:
+        _chart_cache_instance = ChartCache(DEFAULT_CACHE_DIR)
+    return _chart_cache_instance
+
+
+def get_chart_images(results, fmt="png"):
+    """
+    获取分析结果对应的图表图像
+
+    参数:
+        results: HealthAnalyzer 的分析结果
+        fmt: "png" 或 "svg"
+
+    返回:
+        OrderedDict {图表名称: 图像字节}，没有每日数据时为空
+    """
+    series = chart_series(results)
+    if series is None:
+        return OrderedDict()
+    return get_chart_cache().get_images(series, fmt)
+
+
+class ChartRenderTask(QThread):
+    """
+    在后台线程获取报告图表
+
+    结果通过 done 信号在界面线程返回，为 {图表名称: PNG字节}，出错时为空字典
+    """
+
+    done = pyqtSignal(object)
+
+    def __init__(self, results, parent=None):
+        super().__init__(parent)
+        self.results = results
+        # 退出程序时等待绘制结束，避免线程仍在运行时被销毁
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.wait)
+
+    def run(self):
+        try:
+            images = get_chart_images(self.results)
+        except Exception as e:
+            print(f"绘制报告图表出错: {str(e)}")
+            images = OrderedDict()
+        self.done.emit(images)
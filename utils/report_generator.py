@@ -1,3 +1,4 @@
+import io
 import os
 import datetime
 from reportlab.lib import colors
@@ -7,10 +8,25 @@ from reportlab.lib.units import cm, inch
 from reportlab.pdfgen import canvas
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 
+from utils.report_charts import get_chart_images, FIGURE_SIZE
+from utils.pinyin_text import has_pypinyin, get_pinyin_translator
+from utils.report_text import (TIPS, user_info_rows, trend_table, exercise_table, diet_table,
+                               nutrition_table, sleep_table)
+
+
+class ReportCancelled(Exception):
+    """报告生成被取消"""
+
+
+# 本进程已注册的字体 (字体名, 是否支持中文)，字体目录只扫描一次
+_registered_font = None
+
+
 class WeeklyReportGenerator:
     """生成健康周报的工具类，支持导出为PDF格式"""
     
-    def __init__(self, analysis_results, user_info=None, output_dir="reports"):
+    def __init__(self, analysis_results, user_info=None, output_dir="reports",
+                 period=None, title="健康生活周报告", period_name="本周", include_charts=True):
         """
         初始化周报生成器
         
@@ -18,73 +34,65 @@ class WeeklyReportGenerator:
             analysis_results: 健康分析结果，包含统计数据和建议
             user_info: 用户信息(可选)
             output_dir: 输出目录
+            period: 报告时段 (起始日期, 结束日期)(可选)，默认为本周
+            title: 报告标题
+            period_name: 总结标题中对时段的称呼，如"本周"、"本月"
+            include_charts: 是否插入每日趋势图表，分析结果中没有每日序列时不插入
         """
         self.results = analysis_results
         self.user_info = user_info or {}
         self.output_dir = output_dir
+        self.period = period
+        self.title = title
+        self.period_name = period_name
+        self.include_charts = include_charts
         self.has_chinese_support = False  # 是否支持中文
         
         # 确保输出目录存在
         os.makedirs(output_dir, exist_ok=True)
         
-        # 检查是否安装了pypinyin
-        self.has_pinyin = self._check_pypinyin()
-        
-    def _check_pypinyin(self):
-        """检查是否安装了pypinyin，如果没有则提示安装"""
-        try:
-            import pypinyin
-            return True
-        except ImportError:
-            print("\n警告: 未安装pypinyin库，无法将中文转换为拼音")
-            print("建议安装pypinyin以获得更好的PDF中文支持: pip install pypinyin\n")
-            return False
+        # 检查是否安装了pypinyin，同一进程中只检查一次
+        self.has_pinyin = has_pypinyin()
         
     def _translate_chinese_to_ascii(self, text):
         """将中文转换为拼音或ASCII表示，用于在没有中文字体时使用"""
-        if not isinstance(text, str):
-            return str(text)
-            
         try:
-            # 检查是否有中文字符
-            has_chinese = False
-            for char in text:
-                if ord(char) > 127:  # 非ASCII字符
-                    has_chinese = True
-                    break
-                    
-            if not has_chinese:
-                return text  # 如果没有中文，直接返回原文本
-                
-            # 尝试使用pypinyin将中文转为拼音
-            if self.has_pinyin:
-                try:
-                    from pypinyin import lazy_pinyin
-                    result = ' '.join(lazy_pinyin(text))
-                    return result
-                except Exception as e:
-                    print(f"拼音转换失败: {e}")
-                
-            # 如果无法转为拼音，使用Unicode编码方式表示
-            result = ""
-            for char in text:
-                if ord(char) > 127:  # 非ASCII字符
-                    result += f"[U+{ord(char):04X}]"  # 使用Unicode编码表示
-                else:
-                    result += char
-            return result
+            return get_pinyin_translator().translate(text)
         except Exception as e:
             print(f"转换中文失败: {e}")
             return str(text)  # 确保返回字符串
         
+    def _prepare_fallback_text(self):
+        """没有中文字体时，把建议和用户信息一次批量转换为拼音，之后逐段转换时直接命中缓存"""
+        texts = [advice for key in ("overall_advice", "exercise_advice", "diet_advice", "sleep_advice")
+                 for advice in self.results.get(key, [])]
+        texts += [str(value) for value in self.user_info.values()]
+        try:
+            get_pinyin_translator().translate_many(texts)
+        except Exception as e:
+            print(f"转换中文失败: {e}")
+        
     def _convert_text_if_needed(self, text):
         """如果需要，转换文本为ASCII格式"""
         if not self.has_chinese_support:
             return self._translate_chinese_to_ascii(text)
         return text
         
+    def _convert_rows(self, rows):
+        """转换表格中的每个单元格"""
+        return [[self._convert_text_if_needed(cell) for cell in row] for row in rows]
+        
     def _get_available_font(self):
-        """获取可用的中文字体"""
+        """获取可用的中文字体，同一进程中只查找和注册一次"""
+        global _registered_font
+        if _registered_font is None:
+            font_name = self._register_font()
+            _registered_font = (font_name, self.has_chinese_support)
+        font_name, self.has_chinese_support = _registered_font
+        return font_name
+        
+    def _register_font(self):
+        """查找并注册可用的中文字体"""
         # 常见中文字体列表，按优先级排序
         chinese_fonts = ['SimSun', 'Microsoft YaHei', 'SimHei', 'KaiTi', 'NSimSun', 'STSong', 'Arial Unicode MS']
         
@@ -170,16 +178,24 @@ class WeeklyReportGenerator:
             self.has_chinese_support = False
             return 'Helvetica'  # 返回默认字体
     
-    def generate_pdf(self, filename=None):
+    def generate_pdf(self, filename=None, progress=None, should_stop=None):
         """
         生成PDF格式的健康周报
         
         参数:
             filename: 输出文件名(可选)，如不提供将使用当前日期
+            progress: 进度回调 progress(百分比, 说明)(可选)
+            should_stop: 返回True时取消生成(可选)，取消时抛出 ReportCancelled
         
         返回:
             生成的PDF文件路径
         """
+        def checkpoint(percent, message):
+            if should_stop and should_stop():
+                raise ReportCancelled()
+            if progress:
+                progress(percent, message)
+        
         # 设置文件名
         if not filename:
             today = datetime.datetime.now()
@@ -189,11 +205,16 @@ class WeeklyReportGenerator:
         if not filename.lower().endswith('.pdf'):
             filename += '.pdf'
         
-        # 完整的文件路径
+        # 完整的文件路径，先写入同目录的临时文件，完成后再替换，不会留下不完整的PDF
         filepath = os.path.join(self.output_dir, filename)
+        temp_path = f"{filepath}.{os.getpid()}.{id(self)}.tmp"
         
         # 获取字体
+        checkpoint(5, "正在加载字体")
         font_name = self._get_available_font()
+        if not self.has_chinese_support:
+            self._prepare_fallback_text()
+        checkpoint(15, "正在生成报告内容")
         
         # 添加中文支持
         from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
@@ -205,7 +226,7 @@ class WeeklyReportGenerator:
         
         # 创建PDF文档
         doc = SimpleDocTemplate(
-            filepath,
+            temp_path,
             pagesize=A4,
             rightMargin=1.5*cm,
             leftMargin=1.5*cm,
@@ -258,26 +279,22 @@ class WeeklyReportGenerator:
         
         # 标题和日期
         today = datetime.datetime.now()
-        week_start = datetime.datetime.now() - datetime.timedelta(days=today.weekday())
-        week_end = week_start + datetime.timedelta(days=6)
-        
-        title_text = self._convert_text_if_needed("健康生活周报告")
+        if self.period:
+            period_start, period_end = (str(value)[:10] for value in self.period)
+        else:
+            week_start = datetime.datetime.now() - datetime.timedelta(days=today.weekday())
+            week_end = week_start + datetime.timedelta(days=6)
+            period_start, period_end = week_start.strftime('%Y-%m-%d'), week_end.strftime('%Y-%m-%d')
+        
+        title_text = self._convert_text_if_needed(self.title)
         story.append(Paragraph(title_text, title_style))
         
-        date_text = self._convert_text_if_needed(
-            f"{week_start.strftime('%Y-%m-%d')} 至 {week_end.strftime('%Y-%m-%d')}"
-        )
+        date_text = self._convert_text_if_needed(f"{period_start} 至 {period_end}")
         story.append(Paragraph(date_text, subtitle_style))
         
         # 用户信息
         if self.user_info:
-            user_info_data = [
-                [self._convert_text_if_needed("姓名"), self._convert_text_if_needed(self.user_info.get("username", ""))],
-                [self._convert_text_if_needed("性别"), self._convert_text_if_needed(self.user_info.get("gender", ""))],
-                [self._convert_text_if_needed("年龄"), self._convert_text_if_needed(str(self.user_info.get("age", "")))],
-                [self._convert_text_if_needed("身高"), self._convert_text_if_needed(f"{self.user_info.get('height', '')}厘米")],
-                [self._convert_text_if_needed("体重"), self._convert_text_if_needed(f"{self.user_info.get('weight', '')}公斤")]
-            ]
+            user_info_data = self._convert_rows(user_info_rows(self.user_info))
             
             # 用户表格样式
             user_table = Table(
@@ -299,25 +316,58 @@ class WeeklyReportGenerator:
             story.append(Spacer(1, 0.5*cm))
         
         # 总体健康建议
-        story.append(Paragraph(self._convert_text_if_needed("本周健康总结"), section_title_style))
+        checkpoint(25, "正在生成健康总结")
+        story.append(Paragraph(self._convert_text_if_needed(f"{self.period_name}健康总结"), section_title_style))
         for advice in self.results.get("overall_advice", []):
             story.append(Paragraph(self._convert_text_if_needed(advice), advice_style))
         story.append(Spacer(1, 0.5*cm))
         
+        # 每日趋势图表，数据未变化时直接使用缓存的图像
+        checkpoint(30, "正在绘制图表")
+        chart_images = get_chart_images(self.results) if self.include_charts else {}
+        if chart_images:
+            story.append(Paragraph(self._convert_text_if_needed("每日趋势"), section_title_style))
+            chart_width = 17*cm
+            chart_height = chart_width * FIGURE_SIZE[1] / FIGURE_SIZE[0]
+            for image_data in chart_images.values():
+                story.append(Image(io.BytesIO(image_data), width=chart_width, height=chart_height))
+                story.append(Spacer(1, 0.3*cm))
+            story.append(Spacer(1, 0.2*cm))
+        
+        # 按周或按月的趋势和环比
+        trend = trend_table(self.results)
+        if trend:
+            trend_title, trend_rows = trend
+            trend_data = self._convert_rows(trend_rows)
+            
+            trend_pdf_table = Table(
+                trend_data, 
+                colWidths=[3*cm, 2*cm, 4*cm, 3.5*cm, 3.5*cm],
+                repeatRows=1,
+                style=TableStyle([
+                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                    ('FONTNAME', (0, 0), (-1, -1), font_name),
+                    ('FONTSIZE', (0, 0), (-1, -1), 9),
+                    ('PADDING', (0, 0), (-1, -1), 4)
+                ])
+            )
+            
+            story.append(Paragraph(self._convert_text_if_needed(trend_title), section_title_style))
+            story.append(trend_pdf_table)
+            story.append(Spacer(1, 0.5*cm))
+        
         # 运动部分
+        checkpoint(35, "正在生成运动分析")
         exercise_stats = self.results.get("exercise_stats", {})
         story.append(Paragraph(self._convert_text_if_needed("运动分析"), section_title_style))
         
         # 运动数据统计
-        exercise_data = [
-            [self._convert_text_if_needed("指标"), self._convert_text_if_needed("数值"), self._convert_text_if_needed("建议值"), self._convert_text_if_needed("达标情况")],
-            [self._convert_text_if_needed("运动天数"), self._convert_text_if_needed(f"{exercise_stats.get('exercise_days', 0)}天"), self._convert_text_if_needed("≥3天/周"), self._convert_text_if_needed("达标" if exercise_stats.get('exercise_days', 0) >= 3 else "未达标")],
-            [self._convert_text_if_needed("总运动时间"), self._convert_text_if_needed(f"{exercise_stats.get('total_duration', 0)}分钟"), self._convert_text_if_needed("≥150分钟/周"), self._convert_text_if_needed("达标" if exercise_stats.get('meets_recommendation', False) else "未达标")],
-            [self._convert_text_if_needed("平均每天运动"), self._convert_text_if_needed(f"{exercise_stats.get('avg_duration_per_day', 0):.1f}分钟"), self._convert_text_if_needed("≥30分钟/天"), self._convert_text_if_needed("达标" if exercise_stats.get('avg_duration_per_day', 0) >= 30 else "未达标")],
-            [self._convert_text_if_needed("总消耗卡路里"), self._convert_text_if_needed(f"{exercise_stats.get('total_calories', 0)}卡路里"), "-", "-"]
-        ]
-        
-        exercise_table = Table(
+        exercise_data = self._convert_rows(exercise_table(self.results))
+        
+        exercise_pdf_table = Table(
             exercise_data, 
             colWidths=[3*cm, 3*cm, 3*cm, 2*cm],
             style=TableStyle([
@@ -331,7 +381,7 @@ class WeeklyReportGenerator:
             ])
         )
         
-        story.append(exercise_table)
+        story.append(exercise_pdf_table)
         story.append(Spacer(1, 0.3*cm))
         
         # 运动建议
@@ -341,19 +391,14 @@ class WeeklyReportGenerator:
         story.append(Spacer(1, 0.5*cm))
         
         # 饮食部分
+        checkpoint(50, "正在生成饮食分析")
         diet_stats = self.results.get("diet_stats", {})
         story.append(Paragraph(self._convert_text_if_needed("饮食分析"), section_title_style))
         
         # 饮食数据统计
-        diet_data = [
-            [self._convert_text_if_needed("指标"), self._convert_text_if_needed("日均摄入"), self._convert_text_if_needed("推荐值"), self._convert_text_if_needed("达标比例")],
-            [self._convert_text_if_needed("总热量"), self._convert_text_if_needed(f"{diet_stats.get('avg_calories_per_day', 0):.1f}卡路里"), self._convert_text_if_needed(f"{diet_stats.get('recommended_calories', 0)}卡路里"), self._convert_text_if_needed(f"{diet_stats.get('calories_percentage', 0):.1f}%")],
-            [self._convert_text_if_needed("蛋白质"), self._convert_text_if_needed(f"{diet_stats.get('avg_protein_per_day', 0):.1f}克"), self._convert_text_if_needed(f"{diet_stats.get('recommended_protein', 0)}克"), self._convert_text_if_needed(f"{diet_stats.get('protein_percentage', 0):.1f}%")],
-            [self._convert_text_if_needed("脂肪"), self._convert_text_if_needed(f"{diet_stats.get('avg_fat_per_day', 0):.1f}克"), self._convert_text_if_needed(f"{diet_stats.get('recommended_fat', 0)}克"), self._convert_text_if_needed(f"{diet_stats.get('fat_percentage', 0):.1f}%")],
-            [self._convert_text_if_needed("碳水化合物"), self._convert_text_if_needed(f"{diet_stats.get('avg_carbs_per_day', 0):.1f}克"), self._convert_text_if_needed(f"{diet_stats.get('recommended_carbs', 0)}克"), self._convert_text_if_needed(f"{diet_stats.get('carbs_percentage', 0):.1f}%")]
-        ]
-        
-        diet_table = Table(
+        diet_data = self._convert_rows(diet_table(self.results))
+        
+        diet_pdf_table = Table(
             diet_data, 
             colWidths=[3*cm, 3*cm, 3*cm, 2*cm],
             style=TableStyle([
@@ -367,18 +412,13 @@ class WeeklyReportGenerator:
             ])
         )
         
-        story.append(diet_table)
+        story.append(diet_pdf_table)
         story.append(Spacer(1, 0.3*cm))
         
         # 营养比例
-        nutrition_ratio = [
-            [self._convert_text_if_needed("营养素"), self._convert_text_if_needed("占比"), self._convert_text_if_needed("推荐范围")],
-            [self._convert_text_if_needed("蛋白质"), self._convert_text_if_needed(f"{diet_stats.get('protein_ratio', 0):.1f}%"), self._convert_text_if_needed("10-35%")],
-            [self._convert_text_if_needed("脂肪"), self._convert_text_if_needed(f"{diet_stats.get('fat_ratio', 0):.1f}%"), self._convert_text_if_needed("20-35%")],
-            [self._convert_text_if_needed("碳水化合物"), self._convert_text_if_needed(f"{diet_stats.get('carbs_ratio', 0):.1f}%"), self._convert_text_if_needed("45-65%")]
-        ]
-        
-        nutrition_table = Table(
+        nutrition_ratio = self._convert_rows(nutrition_table(self.results))
+        
+        nutrition_pdf_table = Table(
             nutrition_ratio, 
             colWidths=[4*cm, 3*cm, 4*cm],
             style=TableStyle([
@@ -393,7 +433,7 @@ class WeeklyReportGenerator:
         )
         
         story.append(Paragraph(self._convert_text_if_needed("营养素比例"), subsection_title_style))
-        story.append(nutrition_table)
+        story.append(nutrition_pdf_table)
         story.append(Spacer(1, 0.3*cm))
         
         # 饮食建议
@@ -403,18 +443,14 @@ class WeeklyReportGenerator:
         story.append(Spacer(1, 0.5*cm))
         
         # 睡眠部分
+        checkpoint(65, "正在生成睡眠分析")
         sleep_stats = self.results.get("sleep_stats", {})
         story.append(Paragraph(self._convert_text_if_needed("睡眠分析"), section_title_style))
         
         # 睡眠数据统计
-        sleep_data = [
-            [self._convert_text_if_needed("指标"), self._convert_text_if_needed("数值"), self._convert_text_if_needed("建议值"), self._convert_text_if_needed("达标情况")],
-            [self._convert_text_if_needed("睡眠天数"), self._convert_text_if_needed(f"{sleep_stats.get('sleep_days', 0)}天"), self._convert_text_if_needed(f"{sleep_stats.get('total_days', 7)}天"), self._convert_text_if_needed("达标" if sleep_stats.get('sleep_days', 0) >= sleep_stats.get('total_days', 7) else "未达标")],
-            [self._convert_text_if_needed("平均睡眠时长"), self._convert_text_if_needed(f"{sleep_stats.get('avg_duration_per_day', 0) / 60:.1f}小时"), self._convert_text_if_needed(f"{sleep_stats.get('recommended_sleep', 8)}小时"), self._convert_text_if_needed("达标" if sleep_stats.get('meets_recommendation', False) else "未达标")],
-            [self._convert_text_if_needed("平均睡眠质量"), self._convert_text_if_needed(f"{sleep_stats.get('avg_quality', 0):.1f}分"), self._convert_text_if_needed("≥3.5分"), self._convert_text_if_needed("达标" if sleep_stats.get('avg_quality', 0) >= 3.5 else "未达标")]
-        ]
-        
-        sleep_table = Table(
+        sleep_data = self._convert_rows(sleep_table(self.results))
+        
+        sleep_pdf_table = Table(
             sleep_data, 
             colWidths=[3*cm, 3*cm, 3*cm, 2*cm],
             style=TableStyle([
@@ -428,7 +464,7 @@ class WeeklyReportGenerator:
             ])
         )
         
-        story.append(sleep_table)
+        story.append(sleep_pdf_table)
         story.append(Spacer(1, 0.3*cm))
         
         # 睡眠建议
@@ -439,9 +475,8 @@ class WeeklyReportGenerator:
         
         # 注意事项
         story.append(Paragraph(self._convert_text_if_needed("温馨提示"), section_title_style))
-        story.append(Paragraph(self._convert_text_if_needed("1. 本报告基于您记录的数据生成，数据越完整分析越准确。"), advice_style))
-        story.append(Paragraph(self._convert_text_if_needed("2. 健康建议仅供参考，如有特殊健康问题请咨询专业医生。"), advice_style))
-        story.append(Paragraph(self._convert_text_if_needed("3. 建议定期生成并对比周报告，观察健康状况变化趋势。"), advice_style))
+        for tip in TIPS:
+            story.append(Paragraph(self._convert_text_if_needed(tip), advice_style))
         
         # 页脚
         footer_style = ParagraphStyle(
@@ -455,7 +490,36 @@ class WeeklyReportGenerator:
         story.append(Spacer(1, 2*cm))
         story.append(Paragraph(self._convert_text_if_needed(f"长期舒适 - {today.strftime('%Y-%m-%d %H:%M:%S')}"), footer_style))
         
-        # 构建PDF
-        doc.build(story)
+        # 构建PDF，每排完一页检查一次是否取消
+        checkpoint(75, "正在排版")
+        pages = []
         
-        return filepath 
\ No newline at end of file
+        def on_page(page_canvas, page_doc):
+            pages.append(page_doc.page)
+            checkpoint(min(75 + 5 * len(pages), 95), f"正在排版第{len(pages)}页")
+        
+        try:
+            doc.build(story, onFirstPage=on_page, onLaterPages=on_page)
+            os.replace(temp_path, filepath)
+            if not self.has_chinese_support:
+                # 保存本次新转换的汉字片段
+                get_pinyin_translator().save()
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        if progress:
+            progress(100, "报告已生成")
+        return filepath
+
+
+def register_report_font():
+    """
+    在当前进程中预先注册报告字体，供批量生成的工作进程初始化时调用
+    
+    返回:
+        (字体名, 是否支持中文)
+    """
+    WeeklyReportGenerator({}, output_dir=os.getcwd())._get_available_font()
+    return _registered_font
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+报告导出任务
+PDF报告在后台线程中生成，进度、完成、失败和取消都通过Qt信号通知界面；
+多个导出任务排队执行，同时最多运行 MAX_CONCURRENT 个，界面线程不会被阻塞
+"""
+
+import copy
+import itertools
+import os
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+
+from utils.report_generator import WeeklyReportGenerator, ReportCancelled
+
+# 默认的报告输出目录，位于项目根目录下
+DEFAULT_REPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
+
+
+class ReportJob(QThread):
+    """
+    一个报告导出任务
+
+    结果保存在 status（finished/failed/cancelled）、path 和 error 中，线程结束后由 ReportJobService 读取
+    """
+
+    progress = pyqtSignal(int, str)
+
+    def __init__(self, job_id, analysis_results, user_info, filename, output_dir, options=None, parent=None):
+        super().__init__(parent)
+        self.job_id = job_id
+        self.analysis_results = analysis_results
+        self.user_info = user_info
+        # 传给 WeeklyReportGenerator 的其他参数，如报告时段和标题
+        self.options = options or {}
+        self.filename = filename
+        self.output_dir = output_dir
+        self.cancelled = False
+        self.status = None
+        self.path = None
+        self.error = None
+
+    @property
+    def target(self):
+        """输出文件的完整路径"""
+        filename = self.filename if self.filename.lower().endswith(".pdf") else self.filename + ".pdf"
+        return os.path.join(self.output_dir, filename)
+
+    def cancel(self):
+        """请求取消，在下一个进度检查点生效"""
+        self.cancelled = True
+
+    def run(self):
+        try:
+            generator = WeeklyReportGenerator(self.analysis_results, self.user_info, output_dir=self.output_dir,
+                                              **self.options)
+            self.path = generator.generate_pdf(self.filename, self.progress.emit, lambda: self.cancelled)
+            self.status = "finished"
+        except ReportCancelled:
+            self.status = "cancelled"
+        except Exception as e:
+            print(f"生成报告出错: {str(e)}")
+            self.status = "failed"
+            self.error = str(e)
+
+
+class ReportJobService(QObject):
+    """
+    报告导出任务队列
+
+    submit 返回任务ID，之后的进度和结果通过信号按任务ID通知；
+    同一个输出文件已在排队或生成时不会重复提交
+    """
+
+    # 同时运行的任务数
+    MAX_CONCURRENT = 2
+
+    # (任务ID, 百分比, 说明)
+    job_progress = pyqtSignal(int, int, str)
+    # (任务ID, 文件路径)
+    job_finished = pyqtSignal(int, str)
+    # (任务ID, 错误信息)
+    job_failed = pyqtSignal(int, str)
+    # 任务ID
+    job_cancelled = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.ids = itertools.count(1)
+        self.pending = []
+        self.running = {}
+
+    def submit(self, analysis_results, user_info, filename, output_dir=None, options=None):
+        """
+        提交一个PDF导出任务
+
+        参数:
+            analysis_results: 健康分析结果，提交时复制一份，之后修改原对象不影响任务
+            user_info: 用户信息
+            filename: 输出文件名
+            output_dir: 输出目录，默认为 DEFAULT_REPORT_DIR
+            options: 传给 WeeklyReportGenerator 的其他参数（可选），如 period、title、period_name
+
+        返回:
+            任务ID
+        """
+        job = ReportJob(None, copy.deepcopy(analysis_results), dict(user_info or {}), filename,
+                        output_dir or DEFAULT_REPORT_DIR, dict(options or {}), self)
+        for existing in self.pending + list(self.running.values()):
+            if existing.target == job.target and not existing.cancelled:
+                job.deleteLater()
+                return existing.job_id
+
+        job.job_id = next(self.ids)
+        job.progress.connect(lambda percent, message, job_id=job.job_id: self.job_progress.emit(job_id, percent, message))
+        job.finished.connect(lambda job=job: self.on_job_done(job))
+        self.pending.append(job)
+        self.job_progress.emit(job.job_id, 0, "等待导出")
+        self.start_next()
+        return job.job_id
+
+    def cancel(self, job_id):
+        """取消排队或正在运行的任务"""
+        for job in self.pending:
+            if job.job_id == job_id:
+                self.pending.remove(job)
+                job.deleteLater()
+                self.job_cancelled.emit(job_id)
+                return
+        job = self.running.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def start_next(self):
+        while self.pending and len(self.running) < self.MAX_CONCURRENT:
+            job = self.pending.pop(0)
+            self.running[job.job_id] = job
+            job.start()
+
+    def on_job_done(self, job):
+        """任务线程结束，发出结果信号并启动下一个任务"""
+        self.running.pop(job.job_id, None)
+        if job.status == "finished":
+            self.job_finished.emit(job.job_id, job.path)
+        elif job.status == "cancelled":
+            self.job_cancelled.emit(job.job_id)
+        else:
+            self.job_failed.emit(job.job_id, job.error or "未知错误")
+        job.deleteLater()
+        self.start_next()
+
+    def shutdown(self):
+        """取消所有任务并等待正在运行的线程结束"""
+        for job in self.pending:
+            job.deleteLater()
+        self.pending.clear()
+        for job in list(self.running.values()):
+            job.cancel()
+            job.wait()
+
+
+# 进程内共享的报告任务服务
+_report_job_service_instance = None
+
+def get_report_job_service():
+    """
+    获取进程内共享的报告任务服务
+
+    返回:
+        ReportJobService: 任务服务实例
+    """
+    global _report_job_service_instance
+    if _report_job_service_instance is None:
+        app = QApplication.instance()
+        _report_job_service_instance = ReportJobService(app)
+        if app is not None:
+            app.aboutToQuit.connect(_report_job_service_instance.shutdown)
+    return _report_job_service_instance
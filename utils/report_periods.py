@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+报告周期
+周报、月报、季报和年报的时段划分与分析。每份报告只需要两次查询：
+按天聚合的汇总交给 HealthAnalyzer 做整段分析，按周或按月的汇总及环比由数据库用窗口函数一次算出，
+因此年报的耗时与周报相近
+"""
+
+import datetime
+from collections import OrderedDict
+
+from utils.health_analyzer import HealthAnalyzer
+
+# 报告类型 -> (名称, 报告标题, 建议中对时段的称呼, 环比的时段粒度)
+PERIODS = OrderedDict([
+    ("weekly", ("周报", "健康生活周报告", "本周", "week")),
+    ("monthly", ("月报", "健康生活月报告", "本月", "week")),
+    ("quarterly", ("季报", "健康生活季度报告", "本季度", "month")),
+    ("yearly", ("年报", "健康生活年度报告", "本年", "month")),
+])
+
+# 环比的时段粒度 -> 时段名称
+GRAIN_NAMES = {"week": "周", "month": "月"}
+
+# 每种报告类型一个周期包含的月数，周报除外
+PERIOD_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+
+
+def add_months(day, months):
+    """某月1日之后 months 个月的1日"""
+    index = day.year * 12 + day.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def period_ranges(kind, start, count):
+    """
+    从包含 start 的周期开始，依次返回 count 个周期的起止日期
+
+    参数:
+        kind: PERIODS 中的报告类型，周报为周一至周日，其余为自然月、季度和年
+        start: datetime.date
+        count: 周期数
+
+    返回:
+        [(起始日期, 结束日期), ...]，均为datetime.date
+    """
+    ranges = []
+    if kind == "weekly":
+        first = start - datetime.timedelta(days=start.weekday())
+        for index in range(count):
+            period_start = first + datetime.timedelta(days=7 * index)
+            ranges.append((period_start, period_start + datetime.timedelta(days=6)))
+        return ranges
+
+    months = PERIOD_MONTHS[kind]
+    period_start = datetime.date(start.year, (start.month - 1) // months * months + 1, 1)
+    for _ in range(count):
+        next_start = add_months(period_start, months)
+        ranges.append((period_start, next_start - datetime.timedelta(days=1)))
+        period_start = next_start
+    return ranges
+
+
+def current_range(kind, today=None):
+    """包含今天的周期"""
+    return period_ranges(kind, today or datetime.date.today(), 1)[0]
+
+
+def default_start(kind, today=None):
+    """上一个完整周期中的一天"""
+    return current_range(kind, today)[0] - datetime.timedelta(days=1)
+
+
+def trend_start(kind, start):
+    """
+    环比需要读取的最早日期：第一个环比时段的上一时段的起始日期
+
+    分析结果的缓存范围应从这一天开始，上一时段的数据变化时环比也会更新
+    """
+    if PERIODS[kind][3] == "week":
+        return start - datetime.timedelta(days=start.weekday() + 7)
+    return add_months(start.replace(day=1), -1)
+
+
+def period_of(day, grain):
+    """日期所在时段的起始日期：周一或每月1日"""
+    if grain == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def summarize_periods(daily_rows, start, end, grain):
+    """
+    由每日汇总计算按周或按月的汇总及环比，结果与 DatabaseManager.get_period_trend_summary 相同
+
+    批量生成报告时每日汇总已一次取出，在此计算，不必为每个用户和周期分别查询
+
+    参数:
+        daily_rows: 每日汇总 [(日期, 摄入热量, 消耗热量, 运动分钟, 睡眠分钟, 睡眠质量, ...), ...]，
+                    应包含 trend_start 至 end 的数据，范围外的行会被忽略
+        start: 起始日期(datetime.date)
+        end: 结束日期(datetime.date)
+        grain: "week" 或 "month"
+
+    返回:
+        [(时段起始日期, 有记录的天数, 日均摄入热量, 消耗热量, 运动分钟, 平均睡眠分钟, 平均睡眠质量,
+          日均摄入变化, 运动分钟变化, 平均睡眠分钟变化), ...]
+    """
+    def average(values):
+        values = [value for value in values if value is not None]
+        return sum(values) / len(values) if values else None
+
+    def difference(current, previous):
+        return None if current is None or previous is None else current - previous
+
+    first_period = period_of(start, grain)
+    first_day = first_period - datetime.timedelta(days=7) if grain == "week" else add_months(first_period, -1)
+    groups = {}
+    for row in daily_rows:
+        day = datetime.date.fromisoformat(str(row[0])[:10])
+        if first_day <= day <= end:
+            groups.setdefault(period_of(day, grain), []).append(row)
+
+    rows = []
+    previous = None
+    for period, group in sorted(groups.items()):
+        burned = [row[2] for row in group if row[2] is not None]
+        current = (
+            period, len(group), average(row[1] for row in group), sum(burned) if burned else None,
+            sum(row[3] for row in group if row[3] is not None), average(row[4] for row in group),
+            average(row[5] for row in group),
+        )
+        previous_period = period - datetime.timedelta(days=7) if grain == "week" else add_months(period, -1)
+        if previous is not None and previous[0] == previous_period:
+            changes = (difference(current[2], previous[2]), current[4] - previous[4],
+                       difference(current[5], previous[5]))
+        else:
+            changes = (None, None, None)
+        if period >= first_period:
+            rows.append((period.isoformat(),) + current[1:] + changes)
+        previous = current
+    return rows
+
+
+def build_trend(rows, grain):
+    """
+    把 get_period_trend_summary 的结果转换为报告使用的结构
+
+    返回:
+        {"grain": 粒度, "rows": [{"period", "days", "intake", "exercise", "sleep",
+                                   "intake_change", "exercise_change", "sleep_change"}, ...]}
+    """
+    return {
+        "grain": grain,
+        "rows": [
+            {
+                "period": period,
+                "days": days,
+                "intake": intake,
+                "exercise": exercise,
+                "sleep": sleep,
+                "intake_change": intake_change,
+                "exercise_change": exercise_change,
+                "sleep_change": sleep_change,
+            }
+            for (period, days, intake, _, exercise, sleep, _, intake_change, exercise_change, sleep_change) in rows
+        ],
+    }
+
+
+def build_period_results(kind, start, end, daily_rows, trend_rows, profile=None):
+    """
+    由已查询的数据生成一份报告的分析结果，批量生成时在工作进程中调用
+
+    参数:
+        kind: 报告类型
+        start: 起始日期(datetime.date)
+        end: 结束日期(datetime.date)
+        daily_rows: get_daily_trend_summary 的结果
+        trend_rows: get_period_trend_summary 的结果
+        profile: 用户资料（可选）
+
+    返回:
+        HealthAnalyzer 的分析结果，另含 "trend"
+    """
+    _, _, period_name, grain = PERIODS[kind]
+    results = HealthAnalyzer().analyze_range(daily_rows, start.isoformat(), end.isoformat(), profile, period_name)
+    results["trend"] = build_trend(trend_rows, grain)
+    return results
+
+
+def analyze_period(db_manager, user_id, kind, start, end, profile=None):
+    """
+    查询并分析一份报告的数据
+
+    参数:
+        db_manager: 数据库管理器实例
+        user_id: 用户ID
+        kind: 报告类型
+        start: 起始日期(datetime.date)
+        end: 结束日期(datetime.date)
+        profile: 用户资料（可选）
+    """
+    daily_rows = db_manager.get_daily_trend_summary(user_id, start.isoformat(), end.isoformat())
+    trend_rows = db_manager.get_period_trend_summary(user_id, start.isoformat(), end.isoformat(), PERIODS[kind][3])
+    return build_period_results(kind, start, end, daily_rows, trend_rows, profile)
+
+
+def format_change(value, digits=0, scale=1):
+    """环比变化的文字，如 "+120"，没有上一时段时为空字符串"""
+    if value is None:
+        return ""
+    return f"{value / scale:+.{digits}f}"
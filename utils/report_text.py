@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+报告文字
+由同一份分析结果生成报告对话框的摘要和详情文字，以及PDF和HTML报告共用的表格和提示，
+各种报告形式的内容保持一致，只需分析一次
+"""
+
+from utils.report_periods import PERIODS, GRAIN_NAMES, format_change
+
+# 建议类别 -> 标题
+ADVICE_SECTIONS = (
+    ("exercise_advice", "运动建议"),
+    ("diet_advice", "饮食建议"),
+    ("sleep_advice", "睡眠建议"),
+    ("overall_advice", "整体健康建议"),
+)
+
+# 报告末尾的温馨提示
+TIPS = (
+    "1. 本报告基于您记录的数据生成，数据越完整分析越准确。",
+    "2. 健康建议仅供参考，如有特殊健康问题请咨询专业医生。",
+    "3. 建议定期生成并对比周报告，观察健康状况变化趋势。",
+)
+
+
+def format_period(start, end):
+    """报告时段，如 "2025-03-03 至 2025-03-09" """
+    return f"{str(start)[:10]} 至 {str(end)[:10]}"
+
+
+def trend_change(value, digits=0, scale=1):
+    """摘要中的环比变化，如 "(+120)"，没有上一时段时为空"""
+    change = format_change(value, digits, scale)
+    return f"({change})" if change else ""
+
+
+def build_summary_text(results, start, end, kind="weekly"):
+    """
+    报告对话框中的摘要文字
+
+    参数:
+        results: 分析结果
+        start: 起始日期
+        end: 结束日期
+        kind: 报告类型
+    """
+    exercise_stats = results.get("exercise_stats", {})
+    diet_stats = results.get("diet_stats", {})
+    sleep_stats = results.get("sleep_stats", {})
+
+    summary = f"健康{PERIODS[kind][0]} ({format_period(start, end)})\n\n"
+    total_days = exercise_stats.get('range_days', 7)
+
+    # 运动摘要
+    summary += "【运动情况】\n"
+    summary += f"- 运动天数: {exercise_stats.get('exercise_days', 0)}/{total_days}天\n"
+    summary += f"- 总运动时间: {exercise_stats.get('total_duration', 0)}分钟\n"
+    summary += f"- 总消耗卡路里: {exercise_stats.get('total_calories', 0)}卡路里\n"
+
+    # 饮食摘要
+    summary += "\n【饮食情况】\n"
+    summary += f"- 平均每日摄入热量: {diet_stats.get('avg_calories_per_day', 0):.1f}卡路里\n"
+    summary += f"- 蛋白质摄入比例: {diet_stats.get('protein_ratio', 0):.1f}%\n"
+    summary += f"- 脂肪摄入比例: {diet_stats.get('fat_ratio', 0):.1f}%\n"
+    summary += f"- 碳水摄入比例: {diet_stats.get('carbs_ratio', 0):.1f}%\n"
+
+    # 睡眠摘要
+    summary += "\n【睡眠情况】\n"
+    summary += f"- 睡眠记录天数: {sleep_stats.get('sleep_days', 0)}/{total_days}天\n"
+    summary += f"- 平均睡眠时长: {sleep_stats.get('avg_duration_per_day', 0) / 60:.1f}小时\n"
+    summary += f"- 平均睡眠质量: {sleep_stats.get('avg_quality', 0):.1f}/5分\n"
+
+    # 按周或按月的趋势和环比
+    trend = results.get("trend") or {}
+    if trend.get("rows"):
+        grain_name = GRAIN_NAMES.get(trend.get("grain"), "周")
+        summary += f"\n【每{grain_name}趋势（括号内为与上{grain_name}相比）】\n"
+        for row in trend["rows"]:
+            parts = []
+            if row["intake"] is not None:
+                parts.append(f"日均摄入{row['intake']:.0f}千卡{trend_change(row['intake_change'])}")
+            parts.append(f"运动{row['exercise']:.0f}分钟{trend_change(row['exercise_change'])}")
+            if row["sleep"] is not None:
+                parts.append(f"睡眠{row['sleep'] / 60:.1f}小时{trend_change(row['sleep_change'], 1, 60)}")
+            summary += f"- {row['period']}起: {', '.join(parts)}\n"
+
+    # 主要健康建议
+    summary += "\n【主要健康建议】\n"
+    if results.get("overall_advice"):
+        for i, advice in enumerate(results.get("overall_advice")[:3], 1):
+            summary += f"{i}. {advice}\n"
+    else:
+        summary += "暂无建议\n"
+
+    summary += "\n点击\"显示详情\"查看完整分析，或导出PDF、HTML报告获取更详细的内容。"
+    return summary
+
+
+def build_detailed_text(results):
+    """报告对话框中的详细建议文字"""
+    text = "详细健康分析报告\n"
+    for key, title in ADVICE_SECTIONS:
+        text += f"\n【{title}】\n"
+        if results.get(key):
+            for advice in results.get(key):
+                text += f"- {advice}\n"
+        else:
+            text += f"暂无{title}\n"
+    return text
+
+
+def user_info_rows(user_info):
+    """个人信息表格的行"""
+    return [
+        ["姓名", str(user_info.get("username", ""))],
+        ["性别", str(user_info.get("gender", ""))],
+        ["年龄", str(user_info.get("age", ""))],
+        ["身高", f"{user_info.get('height', '')}厘米"],
+        ["体重", f"{user_info.get('weight', '')}公斤"],
+    ]
+
+
+def trend_table(results):
+    """
+    趋势和环比表格
+
+    返回:
+        (标题, 表格行)，第一行为表头；没有趋势数据时返回None
+    """
+    trend = results.get("trend") or {}
+    if not trend.get("rows"):
+        return None
+    grain_name = GRAIN_NAMES.get(trend.get("grain"), "周")
+    rows = [[f"{grain_name}起始", "记录天数", "日均摄入(千卡)", "运动(分钟)", "平均睡眠(小时)"]]
+    for row in trend["rows"]:
+        intake = "-" if row["intake"] is None else f"{row['intake']:.0f}"
+        sleep = "-" if row["sleep"] is None else f"{row['sleep'] / 60:.1f}"
+        exercise = f"{row['exercise']:.0f}"
+        intake_change = format_change(row["intake_change"])
+        exercise_change = format_change(row["exercise_change"])
+        sleep_change = format_change(row["sleep_change"], 1, 60)
+        rows.append([
+            row["period"],
+            str(row["days"]),
+            f"{intake} ({intake_change})" if intake_change else intake,
+            f"{exercise} ({exercise_change})" if exercise_change else exercise,
+            f"{sleep} ({sleep_change})" if sleep_change else sleep,
+        ])
+    return f"每{grain_name}趋势（括号内为与上{grain_name}相比的变化）", rows
+
+
+def exercise_table(results):
+    """运动数据表格，第一行为表头"""
+    stats = results.get("exercise_stats", {})
+    exercise_days = stats.get('exercise_days', 0)
+    return [
+        ["指标", "数值", "建议值", "达标情况"],
+        ["运动天数", f"{exercise_days}天", "≥3天/周",
+         "达标" if exercise_days >= 3 * max(stats.get('range_days', 7) / 7, 1) else "未达标"],
+        ["总运动时间", f"{stats.get('total_duration', 0)}分钟", "≥150分钟/周",
+         "达标" if stats.get('meets_recommendation', False) else "未达标"],
+        ["平均每天运动", f"{stats.get('avg_duration_per_day', 0):.1f}分钟", "≥30分钟/天",
+         "达标" if stats.get('avg_duration_per_day', 0) >= 30 else "未达标"],
+        ["总消耗卡路里", f"{stats.get('total_calories', 0)}卡路里", "-", "-"],
+    ]
+
+
+def diet_table(results):
+    """饮食数据表格，第一行为表头"""
+    stats = results.get("diet_stats", {})
+    return [
+        ["指标", "日均摄入", "推荐值", "达标比例"],
+        ["总热量", f"{stats.get('avg_calories_per_day', 0):.1f}卡路里",
+         f"{stats.get('recommended_calories', 0)}卡路里", f"{stats.get('calories_percentage', 0):.1f}%"],
+        ["蛋白质", f"{stats.get('avg_protein_per_day', 0):.1f}克",
+         f"{stats.get('recommended_protein', 0)}克", f"{stats.get('protein_percentage', 0):.1f}%"],
+        ["脂肪", f"{stats.get('avg_fat_per_day', 0):.1f}克",
+         f"{stats.get('recommended_fat', 0)}克", f"{stats.get('fat_percentage', 0):.1f}%"],
+        ["碳水化合物", f"{stats.get('avg_carbs_per_day', 0):.1f}克",
+         f"{stats.get('recommended_carbs', 0)}克", f"{stats.get('carbs_percentage', 0):.1f}%"],
+    ]
+
+
+def nutrition_table(results):
+    """营养素比例表格，第一行为表头"""
+    stats = results.get("diet_stats", {})
+    return [
+        ["营养素", "占比", "推荐范围"],
+        ["蛋白质", f"{stats.get('protein_ratio', 0):.1f}%", "10-35%"],
+        ["脂肪", f"{stats.get('fat_ratio', 0):.1f}%", "20-35%"],
+        ["碳水化合物", f"{stats.get('carbs_ratio', 0):.1f}%", "45-65%"],
+    ]
+
+
+def sleep_table(results):
+    """睡眠数据表格，第一行为表头"""
+    stats = results.get("sleep_stats", {})
+    sleep_days = stats.get('sleep_days', 0)
+    total_days = stats.get('total_days', 7)
+    return [
+        ["指标", "数值", "建议值", "达标情况"],
+        ["睡眠天数", f"{sleep_days}天", f"{total_days}天", "达标" if sleep_days >= total_days else "未达标"],
+        ["平均睡眠时长", f"{stats.get('avg_duration_per_day', 0) / 60:.1f}小时",
+         f"{stats.get('recommended_sleep', 8)}小时", "达标" if stats.get('meets_recommendation', False) else "未达标"],
+        ["平均睡眠质量", f"{stats.get('avg_quality', 0):.1f}分", "≥3.5分",
+         "达标" if stats.get('avg_quality', 0) >= 3.5 else "未达标"],
+    ]
@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+滚动健康统计
+按用户维护最近7/30/90天每项每日数据的合计、天数以及Welford均值和方差。
+记录增删改时只重新汇总受影响的那一天，把这一天的新旧值之差作用到包含它的窗口上，
+耗时与历史记录的多少无关；状态保存在数据库中，重启后直接读取
+"""
+
+import datetime
+import math
+
+from utils.health_analyzer import DAILY_FIELDS
+
+# 统计的窗口天数
+WINDOWS = (7, 30, 90)
+
+# 除每日字段外，"recorded" 统计有任一记录的天（当天取值为1）
+STAT_FIELDS = DAILY_FIELDS + ("recorded",)
+
+
+class RunningStat:
+    """可增删单个值的Welford统计"""
+
+    __slots__ = ("count", "total", "mean", "m2")
+
+    def __init__(self, count=0, total=0.0, mean=0.0, m2=0.0):
+        self.count = count
+        self.total = total
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value):
+        if self.count <= 1:
+            self.count, self.total, self.mean, self.m2 = 0, 0.0, 0.0, 0.0
+            return
+        old_mean = self.mean
+        self.count -= 1
+        self.total -= value
+        self.mean = (old_mean * (self.count + 1) - value) / self.count
+        # 浮点误差可能使M2略小于0
+        self.m2 = max(self.m2 - (value - old_mean) * (value - self.mean), 0.0)
+
+    @property
+    def variance(self):
+        """样本方差，少于两个值时为0"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+def day_values(row):
+    """
+    把 get_daily_trend_summary 的一行转换为 {字段: 值}，没有记录的字段为None
+
+    参数:
+        row: (日期, 摄入热量, 消耗热量, 运动分钟, 睡眠分钟, 睡眠质量, 蛋白质, 脂肪, 碳水)，当天没有记录时为None
+    """
+    values = dict.fromkeys(STAT_FIELDS)
+    if row:
+        for field, value in zip(DAILY_FIELDS, row[1:]):
+            values[field] = None if value is None else float(value)
+    if any(values[field] is not None for field in DAILY_FIELDS):
+        values["recorded"] = 1.0
+    return values
+
+
+def to_date(value):
+    """日期字符串或datetime转换为datetime.date"""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+class RollingStatsStore:
+    """
+    最近N天的滚动统计
+
+    作为数据库变更监听器，在饮食、运动、睡眠记录变化时更新；
+    日期变化后窗口向前滑动，移出和移入的天从 daily_rollups 读取。
+    某个用户第一次使用时从全部记录重建一次
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        # 用户ID -> {"anchor": 窗口最后一天, "stats": {窗口天数: {字段: RunningStat}}}
+        self.states = {}
+        db_manager.add_change_listener(self.on_data_changed)
+
+    def on_data_changed(self, kind, user_id, key):
+        """数据库变更的回调"""
+        if kind not in ("diet", "exercise", "sleep"):
+            return
+        if user_id is None:
+            # 数据库只在要修改的记录不存在时不带用户通知，此时没有数据变化
+            return
+        if key is None:
+            # 无法确定受影响的天，只重建这个用户
+            if user_id in self.states:
+                self.rebuild(user_id)
+            return
+        self.update_day(user_id, key)
+
+    def load(self, user_id, today=None):
+        """获取用户的统计状态，必要时读取、重建或滑动到今天"""
+        today = today or datetime.date.today()
+        state = self.states.get(user_id)
+        if state is None:
+            state = self.read_state(user_id)
+            if state is None:
+                return self.rebuild(user_id, today)
+            self.states[user_id] = state
+        if state["anchor"] != today:
+            self.advance(user_id, state, today)
+        return state
+
+    def read_state(self, user_id):
+        """从数据库读取保存的状态，没有或不完整时返回None"""
+        rows = self.db_manager.get_rolling_stats(user_id)
+        if len(rows) != len(WINDOWS) * len(STAT_FIELDS):
+            return None
+        stats = {window: {} for window in WINDOWS}
+        anchors = set()
+        for window, field, anchor, count, total, mean, m2 in rows:
+            if window not in stats or field not in STAT_FIELDS:
+                return None
+            stats[window][field] = RunningStat(count, total, mean, m2)
+            anchors.add(anchor)
+        if len(anchors) != 1:
+            return None
+        return {"anchor": to_date(anchors.pop()), "stats": stats}
+
+    def rebuild(self, user_id, today=None):
+        """从全部记录重新生成每日汇总和滚动统计"""
+        today = today or datetime.date.today()
+        rows = self.db_manager.get_daily_trend_summary(user_id, "0001-01-01", "9999-12-31")
+        self.db_manager.replace_daily_rollups(user_id, rows)
+
+        start = today - datetime.timedelta(days=max(WINDOWS) - 1)
+        days = {to_date(row[0]): day_values(row) for row in rows if start <= to_date(row[0]) <= today}
+        stats = {window: {field: RunningStat() for field in STAT_FIELDS} for window in WINDOWS}
+        for day, values in days.items():
+            for window in WINDOWS:
+                if (today - day).days < window:
+                    self.apply(stats[window], None, values)
+
+        state = {"anchor": today, "stats": stats}
+        self.states[user_id] = state
+        self.save(user_id, state)
+        return state
+
+    def advance(self, user_id, state, today):
+        """把窗口滑动到今天，只处理移出和移入的天"""
+        anchor = state["anchor"]
+        steps = (today - anchor).days
+        if steps <= 0 or steps >= max(WINDOWS):
+            # 日期回拨或间隔超过最大窗口时直接重建窗口
+            self.rebuild_windows(user_id, state, today)
+            return
+
+        first = anchor - datetime.timedelta(days=max(WINDOWS) - 1)
+        rows = self.db_manager.get_daily_rollups(user_id, first.isoformat(), today.isoformat())
+        days = {to_date(row[0]): day_values(row) for row in rows}
+        for window, stats in state["stats"].items():
+            for step in range(1, steps + 1):
+                leaving = anchor + datetime.timedelta(days=step - window)
+                entering = anchor + datetime.timedelta(days=step)
+                if leaving in days:
+                    self.apply(stats, days[leaving], None)
+                if entering in days:
+                    self.apply(stats, None, days[entering])
+        state["anchor"] = today
+        self.save(user_id, state)
+
+    def rebuild_windows(self, user_id, state, today):
+        """由保存的每日汇总重新计算所有窗口"""
+        first = today - datetime.timedelta(days=max(WINDOWS) - 1)
+        rows = self.db_manager.get_daily_rollups(user_id, first.isoformat(), today.isoformat())
+        stats = {window: {field: RunningStat() for field in STAT_FIELDS} for window in WINDOWS}
+        for row in rows:
+            day = to_date(row[0])
+            values = day_values(row)
+            for window in WINDOWS:
+                if (today - day).days < window:
+                    self.apply(stats[window], None, values)
+        state["anchor"] = today
+        state["stats"] = stats
+        self.save(user_id, state)
+
+    def update_day(self, user_id, day):
+        """某天的记录发生变化后，重新汇总这一天并更新包含它的窗口"""
+        day = to_date(day)
+        state = self.load(user_id)
+        key = day.isoformat()
+
+        rows = self.db_manager.get_daily_trend_summary(user_id, key, key)
+        new_row = tuple(rows[0]) if rows else (key,) + (None,) * len(DAILY_FIELDS)
+        saved = self.db_manager.get_daily_rollups(user_id, key, key)
+        old_values = day_values(saved[0] if saved else None)
+        new_values = day_values(new_row)
+        if old_values == new_values:
+            return
+
+        age = (state["anchor"] - day).days
+        for window, stats in state["stats"].items():
+            if 0 <= age < window:
+                self.apply(stats, old_values, new_values)
+        self.save(user_id, state, [(key,) + tuple(new_row[1:])])
+
+    @staticmethod
+    def apply(stats, old_values, new_values):
+        """从一个窗口中移除某天的旧值并加入新值，None表示没有"""
+        for field, stat in stats.items():
+            if old_values and old_values[field] is not None:
+                stat.remove(old_values[field])
+            if new_values and new_values[field] is not None:
+                stat.add(new_values[field])
+
+    def save(self, user_id, state, rollups=()):
+        """保存状态和变化的每日汇总"""
+        rows = [
+            (window, field, stat.count, stat.total, stat.mean, stat.m2)
+            for window, stats in state["stats"].items()
+            for field, stat in stats.items()
+        ]
+        self.db_manager.save_rolling_stats(user_id, state["anchor"].isoformat(), rows, rollups)
+
+    def get_summary(self, user_id, window=7):
+        """
+        获取最近 window 天的统计
+
+        返回:
+            {"window", "start_date", "end_date", "total_days": 有记录的天数,
+             "days": {字段: 天数}, "totals": {字段: 合计}, "means": {字段: 日均值}, "stds": {字段: 标准差}}，
+            可直接传给 HealthAnalyzer.analyze_summary
+        """
+        if window not in WINDOWS:
+            raise ValueError(f"不支持的统计窗口: {window}")
+        state = self.load(user_id)
+        stats = state["stats"][window]
+        end = state["anchor"]
+        return {
+            "window": window,
+            "start_date": (end - datetime.timedelta(days=window - 1)).isoformat(),
+            "end_date": end.isoformat(),
+            "total_days": stats["recorded"].count,
+            "days": {field: stats[field].count for field in DAILY_FIELDS},
+            "totals": {field: stats[field].total for field in DAILY_FIELDS},
+            "means": {field: stats[field].mean for field in DAILY_FIELDS},
+            "stds": {field: stats[field].std for field in DAILY_FIELDS},
+        }
+
+
+# 每个数据库管理器对应一个统计存储
+_rolling_stats_stores = {}
+
+def get_rolling_stats_store(db_manager):
+    """
+    获取数据库管理器对应的滚动统计存储，同一会话中共用
+
+    参数:
+        db_manager: 数据库管理器实例
+
+    返回:
+        RollingStatsStore: 统计存储实例
+    """
+    store = _rolling_stats_stores.get(db_manager)
+    if store is None:
+        store = RollingStatsStore(db_manager)
+        _rolling_stats_stores[db_manager] = store
+    return store
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分层时间轮
+秒、分、时三层时间轮加一个溢出堆，插入、删除和到期处理都是O(1)，
+适合同时为多个用户调度大量提醒
+"""
+
+import heapq
+import math
+
+
+class TimerWheel:
+    """
+    分层时间轮
+
+    第0层: 60个槽，每槽1秒，存放60秒内到期的条目
+    第1层: 60个槽，每槽1分钟，存放1小时内到期的条目
+    第2层: 24个槽，每槽1小时，存放1天内到期的条目
+    更远的条目放在按到期时间排序的溢出堆中
+
+    时间推进到某分钟（小时）的起点时，把上一层对应槽中的条目下放到更低层，
+    删除采用惰性方式：条目到期时与 deadlines 中的最新到期时间比对，不一致则丢弃
+    """
+
+    LEVELS = ((1, 60), (60, 60), (3600, 24))  # (每槽秒数, 槽数)
+
+    # 时间一次性跳过超过该秒数时（如系统休眠后恢复），直接重建时间轮而不逐秒推进
+    REBUILD_GAP = 3600
+
+    def __init__(self, now):
+        """
+        参数:
+            now: 当前时间戳(秒)
+        """
+        self.now = int(now)
+        self.wheels = [[[] for _ in range(slots)] for _, slots in self.LEVELS]
+        self.overflow = []
+        self.deadlines = {}  # key -> 到期时间戳，以此为准
+        self.expired = []    # 加入时已经到期的条目
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def __contains__(self, key):
+        return key in self.deadlines
+
+    def add(self, key, expires):
+        """
+        加入或重新设置一个条目
+
+        参数:
+            key: 条目标识（可哈希）
+            expires: 到期时间戳(秒)，向上取整到整秒
+        """
+        expires = int(math.ceil(expires))
+        self.deadlines[key] = expires
+        self.place(key, expires)
+
+    def remove(self, key):
+        """移除条目，不存在时忽略"""
+        self.deadlines.pop(key, None)
+
+    def place(self, key, expires):
+        """按距当前时间的长短把条目放到对应层"""
+        delta = expires - self.now
+        if delta <= 0:
+            self.expired.append((expires, key))
+            return
+        for level, (size, slots) in enumerate(self.LEVELS):
+            if delta < size * slots:
+                self.wheels[level][(expires // size) % slots].append((expires, key))
+                return
+        heapq.heappush(self.overflow, (expires, id(key), key))
+
+    def cascade(self, level):
+        """把第level层当前槽中的条目下放到更低的层"""
+        size, slots = self.LEVELS[level]
+        index = (self.now // size) % slots
+        entries = self.wheels[level][index]
+        self.wheels[level][index] = []
+        for expires, key in entries:
+            if self.deadlines.get(key) == expires:
+                self.place(key, expires)
+
+    def refill_from_overflow(self):
+        """把一天内到期的溢出条目放回时间轮"""
+        horizon = self.now + self.LEVELS[-1][0] * self.LEVELS[-1][1]
+        while self.overflow and self.overflow[0][0] < horizon:
+            expires, _, key = heapq.heappop(self.overflow)
+            if self.deadlines.get(key) == expires:
+                self.place(key, expires)
+
+    def collect(self, entries, due):
+        """从条目列表中取出仍然有效的到期条目"""
+        for expires, key in entries:
+            if self.deadlines.get(key) == expires:
+                del self.deadlines[key]
+                due.append(key)
+
+    def advance(self, now):
+        """
+        把时间推进到now，返回期间到期的条目标识（按到期先后）
+
+        参数:
+            now: 当前时间戳(秒)
+        """
+        target = int(now)
+        due = []
+
+        expired, self.expired = self.expired, []
+        self.collect(sorted(expired, key=lambda entry: entry[0]), due)
+
+        if target - self.now > self.REBUILD_GAP:
+            self.rebuild(target, due)
+            return due
+
+        while self.now < target:
+            self.now += 1
+            if self.now % 60 == 0:
+                if self.now % 3600 == 0:
+                    self.refill_from_overflow()
+                    self.cascade(2)
+                self.cascade(1)
+                # 下放时恰好到期的条目（整分、整点到期）在本次推进中一并取出
+                expired, self.expired = self.expired, []
+                self.collect(expired, due)
+            slot = self.now % 60
+            entries, self.wheels[0][slot] = self.wheels[0][slot], []
+            self.collect(entries, due)
+
+        return due
+
+    def rebuild(self, target, due):
+        """时间大幅跳跃后，收集全部已到期条目并按新的当前时间重新放置其余条目"""
+        entries = sorted((expires, key) for key, expires in self.deadlines.items())
+        self.now = target
+        self.wheels = [[[] for _ in range(slots)] for _, slots in self.LEVELS]
+        self.overflow = []
+        for expires, key in entries:
+            if expires <= target:
+                del self.deadlines[key]
+                due.append(key)
+            else:
+                self.place(key, expires)
+
+    def next_expiry(self):
+        """
+        下一次需要推进时间轮的时间戳，没有条目时返回None
+
+        第0层取最近条目的到期时间；更高层取对应槽开始下放的时间，
+        届时推进一次即可把条目放到更精确的层；溢出堆取放回时间轮的时间，返回其中最早的一个。
+        最多检查 60+60+24 个槽
+        """
+        if self.expired:
+            return self.now
+        if not self.deadlines:
+            return None
+
+        candidates = []
+        for offset in range(1, 61):
+            second = self.now + offset
+            if any(expires == second and self.deadlines.get(key) == expires
+                   for expires, key in self.wheels[0][second % 60]):
+                candidates.append(second)
+                break
+
+        for level in (1, 2):
+            size, slots = self.LEVELS[level]
+            start = self.now // size
+            for offset in range(1, slots + 1):
+                if self.wheels[level][(start + offset) % slots]:
+                    candidates.append((start + offset) * size)
+                    break
+        if self.overflow:
+            # 溢出条目在进入一天范围前的整点被放回时间轮
+            horizon = self.LEVELS[-1][0] * self.LEVELS[-1][1]
+            refill = ((self.overflow[0][0] - horizon) // 3600 + 1) * 3600
+            candidates.append(max(refill, (self.now // 3600 + 1) * 3600))
+        return min(candidates) if candidates else None
@@ -1,14 +1,17 @@
 import random
+import secrets
 import time
 import re
 from PIL import Image, ImageDraw, ImageFont
-from io import BytesIO
-from PyQt5.QtGui import QPixmap
+from PyQt5.QtGui import QImage, QPixmap
+from functools import lru_cache
+import numpy as np
 import os
 import math
-import hashlib
 import string
 
+from utils.password_hasher import PasswordHasher
+
 def validate_phone_number(phone):
     """验证手机号格式是否正确（中国大陆手机号）"""
     pattern = r'^1[3-9]\d{9}$'
@@ -39,30 +42,28 @@ def generate_salt(length=16):
         随机盐值字符串
     """
     salt_chars = string.ascii_letters + string.digits
-    return ''.join(random.choice(salt_chars) for _ in range(length))
+    return ''.join(secrets.choice(salt_chars) for _ in range(length))
 
-def hash_password(password, salt=None):
-    """使用SHA-256算法和盐值哈希密码
+def hash_password(password, salt=None, hasher=None):
+    """使用可配置的密钥派生算法和盐值哈希密码
     
     参数:
         password: 原始密码
         salt: 盐值，如果未提供则自动生成
+        hasher: PasswordHasher实例，默认使用默认算法和成本
         
     返回:
-        (hashed_password, salt) 元组，包含哈希后的密码和使用的盐值
+        (hashed_password, salt) 元组，哈希格式为 "算法$成本$哈希"
     """
     if salt is None:
         salt = generate_salt()
         
-    # 将密码和盐值组合并进行哈希
-    salted_password = password + salt
-    hash_obj = hashlib.sha256(salted_password.encode('utf-8'))
-    hashed_password = hash_obj.hexdigest()
+    hashed_password = (hasher or PasswordHasher()).hash(password, salt)
     
     return hashed_password, salt
 
 def verify_password(password, stored_hash, salt):
-    """验证密码是否与存储的哈希值匹配
+    """验证密码是否与存储的哈希值匹配，兼容旧版单次SHA-256哈希
     
     参数:
         password: 需要验证的密码
@@ -72,11 +73,7 @@ def verify_password(password, stored_hash, salt):
     返回:
         布尔值，密码是否匹配
     """
-    # 使用相同盐值计算哈希
-    calculated_hash, _ = hash_password(password, salt)
-    
-    # 比较计算出的哈希值与存储的哈希值
-    return calculated_hash == stored_hash
+    return PasswordHasher().verify(password, stored_hash, salt)
 
 
 def generate_captcha_text(length=4):
@@ -85,34 +82,59 @@ def generate_captcha_text(length=4):
     characters = '23456789ABCDEFGHJKLMNPQRSTUVWXYZ'
     return ''.join(random.choices(characters, k=length))
 
-def generate_captcha_image(text, width=160, height=60):
-    """生成验证码图片，增加适度干扰但保持可读性"""
-    # 使用随机浅色背景
+# 验证码字体的候选路径
+CAPTCHA_FONT_PATHS = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',  # Linux
+    '/System/Library/Fonts/Tahoma.ttf',  # macOS
+    'C:/Windows/Fonts/Arial.ttf',  # Windows
+    'C:/Windows/Fonts/Georgia.ttf',  # Windows
+]
+
+@lru_cache(maxsize=1)
+def find_captcha_font_path():
+    """查找可用的验证码字体，只在首次调用时探测文件系统"""
+    for path in CAPTCHA_FONT_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+@lru_cache(maxsize=16)
+def load_captcha_font(font_size):
+    """加载并缓存指定字号的验证码字体"""
+    font_path = find_captcha_font_path()
+    try:
+        return ImageFont.truetype(font_path, font_size) if font_path else ImageFont.load_default()
+    except Exception:
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=512)
+def render_glyph_mask(char, font_size, box_width, box_height):
+    """绘制单个字符的灰度蒙版，同一字符和字号只绘制一次"""
+    mask = Image.new('L', (box_width, box_height), 0)
+    ImageDraw.Draw(mask).text((5, 5), char, font=load_captcha_font(font_size), fill=255)
+    return mask
+
+def render_captcha_image(text, width=160, height=60):
+    """
+    渲染验证码图片，返回QImage
+    
+    背景、干扰点和波形扭曲都用NumPy数组一次完成，字符用缓存的灰度蒙版旋转后按颜色粘贴，
+    结果直接交给QImage，不经过PNG编解码；QImage可以在非界面线程中创建
+    """
+    # 使用随机浅色背景，加入随机颜色的干扰点
     bg_color = (random.randint(230, 245), random.randint(230, 245), random.randint(230, 245))
-    image = Image.new('RGB', (width, height), color=bg_color)
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[:] = bg_color
+    noise_y = np.random.randint(0, height, 60)
+    noise_x = np.random.randint(0, width, 60)
+    pixels[noise_y, noise_x] = np.random.randint(160, 221, (60, 3))
+    image = Image.fromarray(pixels, 'RGB')
     
     # 创建绘图对象
     draw = ImageDraw.Draw(image)
     
-    # 尝试加载字体
-    try:
-        font_paths = [
-            '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',  # Linux
-            '/System/Library/Fonts/Tahoma.ttf',  # macOS
-            'C:/Windows/Fonts/Arial.ttf',  # Windows
-            'C:/Windows/Fonts/Georgia.ttf',  # Windows
-        ]
-        
-        font_path = None
-        for path in font_paths:
-            if os.path.exists(path):
-                font_path = path
-                break
-                
-        font_size = random.randint(32, 38)  # 稍微随机字体大小
-        font = ImageFont.truetype(font_path, font_size) if font_path else ImageFont.load_default()
-    except Exception:
-        font = ImageFont.load_default()
+    font_size = random.randint(32, 38)  # 稍微随机字体大小
+    font = load_captcha_font(font_size)
     
     # 计算文本总宽度以便居中显示
     try:
@@ -128,13 +150,6 @@ def generate_captcha_image(text, width=160, height=60):
         x = 10  # 确保不靠得太左
     y = (height - text_height) // 2
     
-    # 添加背景干扰点
-    for _ in range(60):  # 增加干扰点数量
-        draw.point(
-            (random.randint(0, width), random.randint(0, height)),
-            fill=(random.randint(160, 220), random.randint(160, 220), random.randint(160, 220))
-        )
-    
     # 添加干扰线
     for _ in range(3):  # 3条干扰线
         start = (random.randint(0, width//4), random.randint(0, height))
@@ -142,7 +157,7 @@ def generate_captcha_image(text, width=160, height=60):
         color = (random.randint(100, 180), random.randint(100, 180), random.randint(100, 180))
         draw.line([start, end], fill=color, width=1)
     
-    # 绘制文字 - 每个字符单独绘制，使用不同颜色和轻微旋转
+    # 绘制文字 - 每个字符使用不同颜色和轻微旋转
     char_width = text_width // len(text)
     for i, char in enumerate(text):
         # 随机深色
@@ -156,32 +171,22 @@ def generate_captcha_image(text, width=160, height=60):
         char_x = x + i * char_width + random.randint(-3, 3)
         char_y = y + random.randint(-3, 3)
         
-        # 创建单个字符图像用于旋转
-        char_img = Image.new('RGBA', (char_width + 10, text_height + 10), (0, 0, 0, 0))
-        char_draw = ImageDraw.Draw(char_img)
-        
-        # 绘制字符
-        char_draw.text((5, 5), char, font=font, fill=color)
-        
-        # 轻微旋转（角度较小）
-        angle = random.randint(-10, 10)  # 较小的旋转角度
-        rotated = char_img.rotate(angle, expand=1, resample=Image.BICUBIC)
-        
-        # 粘贴到主图像
-        image.paste(rotated, (char_x, char_y), rotated)
+        # 轻微旋转（角度较小）后以蒙版粘贴纯色
+        mask = render_glyph_mask(char, font_size, char_width + 10, text_height + 10)
+        angle = random.randint(-10, 10)
+        rotated = mask.rotate(angle, expand=1, resample=Image.BICUBIC)
+        image.paste(color, (char_x, char_y, char_x + rotated.width, char_y + rotated.height), rotated)
     
     # 添加波形扭曲（程度较轻）
-    image = apply_wave_distortion(image, amplitude=2.0)  # 使用较小的振幅
-    
-    # 将PIL图像转换为QPixmap
-    buffer = BytesIO()
-    image.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    pixmap = QPixmap()
-    pixmap.loadFromData(buffer.read())
+    pixels = apply_wave_distortion(np.asarray(image), amplitude=2.0)  # 使用较小的振幅
     
-    return pixmap, text
+    # 复制一份，让QImage持有自己的像素数据
+    qimage = QImage(pixels.data, width, height, width * 3, QImage.Format_RGB888)
+    return qimage.copy()
+
+def generate_captcha_image(text, width=160, height=60):
+    """生成验证码图片，增加适度干扰但保持可读性"""
+    return QPixmap.fromImage(render_captcha_image(text, width, height)), text
 
 def random_light_color():
     """生成随机浅色"""
@@ -197,22 +202,33 @@ def random_dark_color():
     b = random.randint(0, 100)
     return (r, g, b)
 
+@lru_cache(maxsize=8)
+def wave_source_indices(width, height, amplitude):
+    """波形扭曲中每个目标像素对应的源像素坐标，按尺寸和振幅缓存"""
+    # 水平波动随行变化，垂直波动随列变化；int截断与逐像素实现保持一致
+    offset_x = (amplitude * np.sin(np.arange(height) / height * 2 * math.pi)).astype(int)
+    offset_y = (amplitude * np.cos(np.arange(width) / width * 2 * math.pi)).astype(int)
+    
+    src_x = np.clip(np.arange(width)[None, :] + offset_x[:, None], 0, width - 1)
+    src_y = np.clip(np.arange(height)[:, None] + offset_y[None, :], 0, height - 1)
+    return src_y, src_x
+
 def apply_wave_distortion(image, amplitude=2.0):
-    """应用轻微的波浪扭曲效果"""
-    width, height = image.size
-    new_img = Image.new('RGB', (width, height))
-    
-    for i in range(width):
-        for j in range(height):
-            # 水平波动
-            offset_x = int(amplitude * math.sin(j / height * 2 * math.pi))
-            # 垂直波动
-            offset_y = int(amplitude * math.cos(i / width * 2 * math.pi))
-            
-            src_x = min(max(i + offset_x, 0), width - 1)
-            src_y = min(max(j + offset_y, 0), height - 1)
-                
-            # 复制像素
-            new_img.putpixel((i, j), image.getpixel((src_x, src_y)))
-            
-    return new_img 
\ No newline at end of file
+    """
+    应用轻微的波浪扭曲效果
+    
+    参数:
+        image: PIL图像或形状为 (高, 宽, 通道) 的NumPy数组
+        amplitude: 振幅（像素）
+        
+    返回:
+        与输入类型相同的扭曲后图像
+    """
+    is_pil = isinstance(image, Image.Image)
+    pixels = np.asarray(image.convert('RGB')) if is_pil else np.asarray(image)
+    height, width = pixels.shape[:2]
+    
+    src_y, src_x = wave_source_indices(width, height, float(amplitude))
+    distorted = np.ascontiguousarray(pixels[src_y, src_x])
+    
+    return Image.fromarray(distorted, 'RGB') if is_pil else distorted